@@ -0,0 +1,162 @@
+import random
+import threading
+import time as py_time
+
+# --- AGENDAMENTO ADAPTATIVO DAS CONSULTAS À API (por estação) ---
+# O intervalo até a próxima consulta de cada estação depende da última leitura:
+# - perto de um limite de decisão (Delta T 2/8/10 °C, vento 3/12 km/h) cai linearmente até `intervalo_min`;
+# - longe dos limites e com leituras estáveis em sequência, cresce de `fator_estavel` em `fator_estavel` até `intervalo_max`;
+# - sem ninguém olhando a estação (nenhuma sessão nos últimos `janela_visualizacao` s) é multiplicado por
+#   `fator_ocioso`, até `intervalo_ocioso`; voltar a olhar vale na hora, sem esperar o intervalo longo.
+# Falhas seguidas esperam em backoff exponencial com jitter (metade fixa, metade aleatória), até `backoff_max`.
+LIMIARES_DELTA_T = (2.0, 8.0, 10.0)
+LIMIARES_VENTO = (3.0, 12.0)
+MARGEM_DELTA_T = 1.0 # °C: a esta distância (ou mais) de todos os limites, o intervalo é o normal
+MARGEM_VENTO = 2.0   # km/h
+VARIACAO_ESTAVEL_DELTA_T = 0.3
+VARIACAO_ESTAVEL_VENTO = 1.0
+
+# Só medições numéricas contam: a API pode mandar "--" ou outro texto no lugar de um valor (ver mapear_dados_ecowitt)
+def _numero(valor):
+    return valor if isinstance(valor, (int, float)) and not isinstance(valor, bool) and valor == valor else None
+
+class _EstadoEstacao:
+    def __init__(self):
+        self.ultima_tentativa = None # time.monotonic()
+        self.intervalo = None        # Intervalo calculado na última leitura bem-sucedida
+        self.falhas = 0
+        self.espera_falha = 0.0
+        self.adiado_ate = 0.0        # Ex.: sem saldo de requisições
+        self.estaveis = 0
+        self.anterior = None
+        self.visto_em = None
+
+class AgendadorAdaptativo:
+    def __init__(self, intervalo_base=300, intervalo_min=60, intervalo_max=900, fator_estavel=1.5,
+                 fator_ocioso=3, intervalo_ocioso=900, janela_visualizacao=120, backoff_base=30, backoff_max=900):
+        self.intervalo_base = intervalo_base
+        self.intervalo_min = min(intervalo_min, intervalo_base)
+        self.intervalo_max = max(intervalo_max, intervalo_base)
+        self.fator_estavel = fator_estavel
+        self.fator_ocioso = fator_ocioso
+        self.intervalo_ocioso = intervalo_ocioso
+        self.janela_visualizacao = janela_visualizacao
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._estados = {}
+        self._lock = threading.Lock()
+
+    def _estado(self, estacao_id):
+        estado = self._estados.get(estacao_id)
+        if estado is None: estado = self._estados[estacao_id] = _EstadoEstacao()
+        return estado
+
+    # 0 = em cima de um limite, 1 = a uma margem ou mais de todos eles
+    @staticmethod
+    def proximidade_limites(registro):
+        proximidade = 1.0
+        delta_t, vento = _numero(registro.get("delta_t_c")), _numero(registro.get("wind_speed_kmh"))
+        if delta_t is not None: proximidade = min(proximidade, min(abs(delta_t - l) for l in LIMIARES_DELTA_T) / MARGEM_DELTA_T)
+        if vento is not None: proximidade = min(proximidade, min(abs(vento - l) for l in LIMIARES_VENTO) / MARGEM_VENTO)
+        return max(0.0, proximidade)
+
+    @staticmethod
+    def _estavel(registro, anterior):
+        if anterior is None: return False
+        for chave, limite in (("delta_t_c", VARIACAO_ESTAVEL_DELTA_T), ("wind_speed_kmh", VARIACAO_ESTAVEL_VENTO)):
+            atual, antes = _numero(registro.get(chave)), _numero(anterior.get(chave))
+            if atual is None or antes is None or abs(atual - antes) >= limite: return False
+        return True
+
+    def registrar_sucesso(self, estacao_id, registro, agora=None):
+        agora = py_time.monotonic() if agora is None else agora
+        with self._lock:
+            estado = self._estado(estacao_id)
+            estado.estaveis = estado.estaveis + 1 if self._estavel(registro, estado.anterior) else 0
+            proximidade = self.proximidade_limites(registro)
+            if proximidade < 1.0:
+                intervalo = self.intervalo_min + (self.intervalo_base - self.intervalo_min) * proximidade
+            else:
+                intervalo = min(self.intervalo_base * self.fator_estavel ** estado.estaveis, self.intervalo_max)
+            estado.intervalo, estado.anterior = intervalo, registro
+            estado.ultima_tentativa, estado.falhas, estado.espera_falha = agora, 0, 0.0
+            return intervalo
+
+    def registrar_falha(self, estacao_id, agora=None):
+        agora = py_time.monotonic() if agora is None else agora
+        with self._lock:
+            estado = self._estado(estacao_id)
+            estado.falhas += 1
+            espera = min(self.backoff_base * 2 ** (estado.falhas - 1), self.backoff_max)
+            estado.espera_falha = espera / 2 + random.uniform(0, espera / 2)
+            estado.ultima_tentativa = agora
+            return estado.espera_falha
+
+    def adiar(self, estacao_id, ate):
+        with self._lock:
+            self._estado(estacao_id).adiado_ate = ate
+
+    # Devolve True quando a estação estava ociosa: quem chama acorda o poller para reagendá-la
+    def registrar_visualizacao(self, estacao_id, agora=None):
+        agora = py_time.monotonic() if agora is None else agora
+        with self._lock:
+            estado = self._estado(estacao_id)
+            estava_ociosa = not self._observada(estado, agora)
+            estado.visto_em = agora
+            return estava_ociosa
+
+    def _observada(self, estado, agora):
+        return estado.visto_em is not None and agora - estado.visto_em <= self.janela_visualizacao
+
+    def _vencimento(self, estado, agora):
+        if estado.ultima_tentativa is None: vencimento = 0.0 # Nunca consultada: agora
+        elif estado.falhas: vencimento = estado.ultima_tentativa + estado.espera_falha
+        else:
+            intervalo = estado.intervalo
+            if not self._observada(estado, agora): intervalo = max(intervalo, min(intervalo * self.fator_ocioso, self.intervalo_ocioso))
+            vencimento = estado.ultima_tentativa + intervalo
+        return max(vencimento, estado.adiado_ate)
+
+    def devidas(self, estacoes_ids, agora=None):
+        agora = py_time.monotonic() if agora is None else agora
+        with self._lock:
+            return [e for e in estacoes_ids if self._vencimento(self._estado(e), agora) <= agora]
+
+    def segundos_ate_proxima(self, estacoes_ids, agora=None):
+        agora = py_time.monotonic() if agora is None else agora
+        with self._lock:
+            return max(0.0, min((self._vencimento(self._estado(e), agora) for e in estacoes_ids), default=self.intervalo_base) - agora)
+
+    def segundos_ate(self, estacao_id, agora=None):
+        agora = py_time.monotonic() if agora is None else agora
+        with self._lock:
+            return max(0.0, self._vencimento(self._estado(estacao_id), agora) - agora)
+
+# --- ORÇAMENTO DE REQUISIÇÕES (balde de fichas, um por chave da API) ---
+# Repõe `por_minuto` fichas por minuto, acumulando até `rajada`. Vale para o processo: réplicas do
+# servidor usando a mesma chave precisam dividir o limite entre si (ORCAMENTO_REQUISICOES_MINUTO).
+class OrcamentoRequisicoes:
+    def __init__(self, por_minuto, rajada=None, agora=None):
+        self.taxa = por_minuto / 60.0
+        self.rajada = float(rajada if rajada is not None else max(1, por_minuto))
+        self._saldo = self.rajada
+        self._atualizado = py_time.monotonic() if agora is None else agora
+        self._lock = threading.Lock()
+
+    def _repor(self, agora):
+        self._saldo = min(self.rajada, self._saldo + (agora - self._atualizado) * self.taxa)
+        self._atualizado = agora
+
+    # 0 quando a ficha foi consumida; senão, segundos até haver saldo (nada é consumido)
+    def consumir(self, fichas=1, agora=None):
+        with self._lock:
+            self._repor(py_time.monotonic() if agora is None else agora)
+            if self._saldo >= fichas:
+                self._saldo -= fichas
+                return 0.0
+            return (fichas - self._saldo) / self.taxa if self.taxa > 0 else float("inf")
+
+    def saldo(self, agora=None):
+        with self._lock:
+            self._repor(py_time.monotonic() if agora is None else agora)
+            return self._saldo
@@ -0,0 +1,253 @@
+import argparse
+import json
+import queue
+import threading
+import time as py_time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytz
+import requests
+
+from calculos import CONDICOES_DELTA_T, CONDICOES_VENTO, avaliar_inversao, classificar_vento, codigo_condicao_delta_t
+from config import APP_TIMEZONE_STR, ler_segredo
+from estacoes import carregar_estacoes
+from historico import CAMINHO_PADRAO, ESTACAO_PADRAO, HistoricoEstacao
+from metricas import METRICAS
+
+# --- MOTOR DE ALERTAS (avaliação contínua de cada leitura nova, fora da página) ---
+# O poller e a ingestão local entregam cada leitura a MotorAlertas.processar assim que ela chega, com ou sem alguém
+# olhando o painel. Para cada estação e regra há uma pequena máquina de estados (estado confirmado + candidato e
+# desde quando): uma leitura custa uma consulta a dicionário e uma classificação por regra, sem reler o histórico.
+# - Histerese: numa regra por faixas, sair da condição atual exige passar do limite por `histerese` (ex.: Delta T
+#   ADEQUADA só vira ATENÇÃO acima de 8,5 °C e só volta abaixo de 7,5 °C), para a leitura oscilando em cima do
+#   limite não gerar uma troca a cada consulta.
+# - Duração mínima: a nova condição só é confirmada depois de se manter por `duracao_min` segundos (horário das
+#   leituras, não do relógio). Um buraco maior que `lacuna_max` entre leituras reinicia a contagem.
+# Cada transição confirmada vai para os notificadores numa thread própria: um webhook lento não atrasa o poller.
+# A primeira condição de cada estação após o início do processo vale na hora e só é notificada se for de alerta
+# (nesse caso, depois da duração mínima).
+#   python alertas.py --receber --porta 8084   (webhook local que só imprime o que recebe, para testes)
+#   python alertas.py --reprocessar --estacao principal --desde 2024-06-01   (regras sobre o histórico, só no log)
+DURACAO_MINIMA_PADRAO = 600
+LACUNA_MAXIMA_PADRAO = 1800
+
+def _codigo_vento(valor): return CONDICOES_VENTO.index(classificar_vento(valor)[0])
+
+# Condição por faixas de um único valor do registro; `classificar` devolve o índice em `estados` (crescente com o valor)
+class RegraFaixas:
+    def __init__(self, nome, campo, classificar, estados, alertas, histerese=0.0, duracao_min=DURACAO_MINIMA_PADRAO):
+        self.nome = nome
+        self.campo = campo
+        self.classificar = classificar
+        self.estados = tuple(estados)
+        self.alertas = frozenset(alertas)
+        self.histerese = histerese
+        self.duracao_min = duracao_min
+        self._indices = {estado: i for i, estado in enumerate(self.estados)}
+
+    def valor(self, registro):
+        return registro.get(self.campo)
+
+    # A histerese conta a partir da condição confirmada `atual`: a candidata só aparece depois de passar da margem
+    def estado(self, registro, atual):
+        valor = registro.get(self.campo)
+        if valor is None: return None
+        novo = self.classificar(valor)
+        if novo < 0: return None
+        i = self._indices.get(atual)
+        if i is not None and novo != i and self.histerese:
+            novo = max(i, self.classificar(valor - self.histerese)) if novo > i else min(i, self.classificar(valor + self.histerese))
+        return self.estados[novo]
+
+# Condição calculada por uma função do registro inteiro (None = dados insuficientes); sem histerese
+class RegraCategorica:
+    def __init__(self, nome, avaliar, alertas, campos=(), duracao_min=DURACAO_MINIMA_PADRAO):
+        self.nome = nome
+        self.avaliar = avaliar
+        self.alertas = frozenset(alertas)
+        self.campos = tuple(campos)
+        self.duracao_min = duracao_min
+
+    def valor(self, registro):
+        return {campo: registro.get(campo) for campo in self.campos}
+
+    def estado(self, registro, atual):
+        return self.avaliar(registro)
+
+def _estado_inversao(registro):
+    estado = avaliar_inversao(registro.get("temperature_c"), registro.get("temperature_superior_c"), registro.get("wind_speed_kmh"))[0]
+    return None if estado == "Aguardando..." else estado
+
+# Mesmas regras do painel de condições atuais
+def regras_padrao(duracao_min=DURACAO_MINIMA_PADRAO, histerese_delta_t=0.5, histerese_vento=1.0):
+    return [
+        RegraFaixas("delta_t", "delta_t_c", codigo_condicao_delta_t, CONDICOES_DELTA_T, ("INADEQUADA", "ATENÇÃO", "ARRISCADA"), histerese_delta_t, duracao_min),
+        RegraFaixas("vento", "wind_speed_kmh", _codigo_vento, CONDICOES_VENTO, ("INADEQUADO", "PERIGOSO"), histerese_vento, duracao_min),
+        RegraCategorica("inversao", _estado_inversao, ("INVERSÃO TÉRMICA", "CUIDADO!"),
+                        ("temperature_c", "temperature_superior_c", "wind_speed_kmh"), duracao_min),
+    ]
+
+class _EstadoRegra:
+    __slots__ = ("confirmado", "candidato", "candidato_desde")
+
+    def __init__(self):
+        self.confirmado = None
+        self.candidato = None
+        self.candidato_desde = None
+
+class MotorAlertas:
+    def __init__(self, regras=None, notificadores=(), lacuna_max=LACUNA_MAXIMA_PADRAO, max_fila=1000):
+        self.regras = list(regras if regras is not None else regras_padrao())
+        self.notificadores = list(notificadores)
+        self.lacuna_max = lacuna_max
+        self._estados = {}      # (estação, regra) -> _EstadoRegra
+        self._ultimo_ts = {}    # estação -> horário da última leitura avaliada
+        self._lock = threading.Lock()
+        self._fila = queue.Queue(maxsize=max_fila)
+        if self.notificadores:
+            threading.Thread(target=self._despachar, name="alertas-notificacao", daemon=True).start()
+
+    # Avalia uma leitura (registro de montar_dados_completos) e devolve as transições confirmadas por ela
+    def processar(self, registro, estacao=ESTACAO_PADRAO):
+        horario = datetime.fromisoformat(registro["timestamp"])
+        ts = horario.timestamp()
+        transicoes = []
+        with self._lock:
+            anterior_ts = self._ultimo_ts.get(estacao)
+            if anterior_ts is not None and ts <= anterior_ts: return transicoes # Repetida ou fora de ordem
+            self._ultimo_ts[estacao] = ts
+            lacuna = anterior_ts is not None and ts - anterior_ts > self.lacuna_max
+            for regra in self.regras:
+                chave = (estacao, regra.nome)
+                estado = self._estados.get(chave)
+                if estado is None: estado = self._estados[chave] = _EstadoRegra()
+                novo = regra.estado(registro, estado.confirmado)
+                if novo is None: continue
+                if novo == estado.confirmado:
+                    estado.candidato = estado.candidato_desde = None
+                    continue
+                if estado.confirmado is None and novo not in regra.alertas: # Condição inicial sem alerta: vale na hora, sem notificar
+                    estado.confirmado, estado.candidato, estado.candidato_desde = novo, None, None
+                    continue
+                if novo != estado.candidato or lacuna:
+                    estado.candidato, estado.candidato_desde = novo, ts
+                if ts - estado.candidato_desde < regra.duracao_min: continue
+                anterior, estado.confirmado = estado.confirmado, novo
+                estado.candidato = estado.candidato_desde = None
+                transicoes.append({
+                    "estacao": estacao, "regra": regra.nome, "de": anterior, "para": novo,
+                    "nivel": "alerta" if novo in regra.alertas else "normalizado", "horario": horario.isoformat(),
+                    "valor": regra.valor(registro),
+                })
+        for transicao in transicoes:
+            METRICAS.contar("alertas_transicoes_total", regra=transicao["regra"], nivel=transicao["nivel"])
+            if not self.notificadores: continue
+            try: self._fila.put_nowait(transicao)
+            except queue.Full: METRICAS.contar("alertas_descartados_total") # Notificadores parados: não trava quem chamou
+        return transicoes
+
+    # Regras da estação em alerta confirmado (regra -> condição), para exibição
+    def alertas_ativos(self, estacao=ESTACAO_PADRAO):
+        with self._lock:
+            return {regra.nome: estado.confirmado for regra in self.regras
+                    if (estado := self._estados.get((estacao, regra.nome))) is not None and estado.confirmado in regra.alertas}
+
+    def _despachar(self):
+        while True:
+            transicao = self._fila.get()
+            for notificador in self.notificadores:
+                try:
+                    with METRICAS.medir("alerta_notificacao", notificador=type(notificador).__name__):
+                        notificador.notificar(transicao)
+                except Exception as e: # Um notificador com problema não impede os outros
+                    METRICAS.contar("alertas_notificacao_erros_total", notificador=type(notificador).__name__)
+                    print(f"Erro ao notificar alerta via {type(notificador).__name__}: {e}")
+
+# --- NOTIFICADORES (qualquer objeto com notificar(transicao)) ---
+def descrever_transicao(transicao):
+    icone = "🔴" if transicao["nivel"] == "alerta" else "🟢"
+    origem = f"{transicao['de']} -> " if transicao["de"] else ""
+    return f"{icone} [{transicao['estacao']}] {transicao['regra']}: {origem}{transicao['para']} ({transicao['horario']})"
+
+class NotificadorLog:
+    def notificar(self, transicao):
+        print(f"ALERTA {descrever_transicao(transicao)}")
+
+# POST do JSON da transição; tenta de novo com espera crescente antes de desistir
+class NotificadorWebhook:
+    def __init__(self, url, timeout=10, tentativas=3, espera=2.0):
+        self.url = url
+        self.timeout = timeout
+        self.tentativas = tentativas
+        self.espera = espera
+        self._sessao = requests.Session()
+
+    def notificar(self, transicao):
+        for tentativa in range(self.tentativas):
+            try:
+                resposta = self._sessao.post(self.url, json={**transicao, "texto": descrever_transicao(transicao)}, timeout=self.timeout)
+                resposta.raise_for_status()
+                return
+            except requests.exceptions.RequestException:
+                if tentativa == self.tentativas - 1: raise
+                py_time.sleep(self.espera * 2 ** tentativa)
+
+# Regras e notificadores do secrets.toml (usados pelo app e pela ingestão avulsa)
+def regras_configuradas():
+    return regras_padrao(duracao_min=float(ler_segredo("ALERTAS_DURACAO_MINIMA_SEGUNDOS", DURACAO_MINIMA_PADRAO)),
+                         histerese_delta_t=float(ler_segredo("ALERTAS_HISTERESE_DELTA_T", 0.5)),
+                         histerese_vento=float(ler_segredo("ALERTAS_HISTERESE_VENTO", 1.0)))
+
+def motor_alertas_configurado():
+    notificadores = []
+    if str(ler_segredo("ALERTAS_LOG", "true")).lower() in ("1", "true"): notificadores.append(NotificadorLog())
+    if ler_segredo("ALERTAS_WEBHOOK_URL"): notificadores.append(NotificadorWebhook(ler_segredo("ALERTAS_WEBHOOK_URL")))
+    return MotorAlertas(regras_configuradas(), notificadores)
+
+# --- WEBHOOK LOCAL (recebe e imprime as notificações, no lugar de um serviço real) ---
+def criar_receptor_webhook(porta, host="127.0.0.1"):
+    class ManipuladorWebhook(BaseHTTPRequestHandler):
+        def do_POST(self):
+            corpo = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            try: print(json.loads(corpo).get("texto", corpo.decode("utf-8", "replace")))
+            except ValueError: print(corpo.decode("utf-8", "replace"))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, formato, *args): pass
+
+    return ThreadingHTTPServer((host, porta), ManipuladorWebhook)
+
+# Histórico -> registros no formato do poller, em ordem
+def _registros(historico, estacao, inicio_ts):
+    for df in historico.consultar_em_lotes(inicio_ts, None, estacao):
+        for horario, linha in zip(df.index, df.to_dict("records")):
+            yield {**{chave: (None if valor != valor else valor) for chave, valor in linha.items()}, "timestamp": horario.isoformat()} # NaN -> None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Motor de alertas: webhook local de teste ou reprocessamento do histórico.")
+    parser.add_argument("--receber", action="store_true", help="Sobe um webhook local que imprime as notificações recebidas")
+    parser.add_argument("--porta", type=int, default=8084)
+    parser.add_argument("--reprocessar", action="store_true", help="Passa o histórico pelas regras e imprime as transições")
+    parser.add_argument("--estacao", action="append", help="Id da estação (repita para várias; padrão: todas)")
+    parser.add_argument("--desde", help="Primeiro dia reprocessado (AAAA-MM-DD, horário local)")
+    parser.add_argument("--banco", default=ler_segredo("HISTORICO_DB_PATH", CAMINHO_PADRAO))
+    args = parser.parse_args()
+
+    if args.receber:
+        print(f"Webhook de alertas em http://127.0.0.1:{args.porta}/")
+        criar_receptor_webhook(args.porta).serve_forever()
+    elif args.reprocessar:
+        timezone = pytz.timezone(APP_TIMEZONE_STR)
+        historico = HistoricoEstacao(args.banco, timezone)
+        inicio_ts = int(timezone.localize(datetime.fromisoformat(args.desde)).timestamp()) if args.desde else None
+        motor = MotorAlertas(regras_configuradas()) # Sem notificadores: só imprime, não chama o webhook configurado
+        inicio, leituras = py_time.perf_counter(), 0
+        for estacao in args.estacao or [e["id"] for e in carregar_estacoes()]:
+            for registro in _registros(historico, estacao, inicio_ts):
+                for transicao in motor.processar(registro, estacao): print(descrever_transicao(transicao))
+                leituras += 1
+        print(f"{leituras} leituras em {py_time.perf_counter() - inicio:.1f} s")
+    else:
+        parser.print_help()
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+# --- REDUÇÃO DE PONTOS PARA OS GRÁFICOS (feita no servidor, antes de serializar para o navegador) ---
+
+# Largest-Triangle-Three-Buckets: escolhe `n_saida` amostras reais que preservam o formato da série.
+# Devolve os índices posicionais escolhidos (sempre inclui o primeiro e o último ponto).
+def lttb(x, y, n_saida):
+    n = len(x)
+    if n_saida >= n or n_saida < 3: return np.arange(n)
+    x = np.asarray(x, dtype=np.float64); y = np.asarray(y, dtype=np.float64)
+    indices = np.empty(n_saida, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    limites = np.linspace(1, n - 1, n_saida - 1).astype(np.int64) # n_saida-2 baldes entre o primeiro e o último ponto
+    a = 0
+    for i in range(n_saida - 2):
+        ini, fim = limites[i], limites[i + 1]
+        prox_fim = limites[i + 2] if i + 2 < len(limites) else n
+        media_x, media_y = x[fim:prox_fim].mean(), y[fim:prox_fim].mean()
+        area = np.abs((x[a] - media_x) * (y[ini:fim] - y[a]) - (x[a] - x[ini:fim]) * (media_y - y[a]))
+        a = ini + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+# Linhas do DataFrame (índice DatetimeIndex) escolhidas pelo LTTB para a coluna; as demais colunas vêm junto
+def reduzir_lttb(df, coluna, max_pontos):
+    df = df.dropna(subset=[coluna])
+    if len(df) <= max_pontos: return df
+    return df.iloc[lttb(df.index.asi8, df[coluna].to_numpy(dtype=np.float64), max_pontos)]
+
+# Divide o período em `max_pontos` baldes de tempo iguais e devolve mínimo, média e máximo de cada um
+# (colunas `<coluna>_min`, `<coluna>`, `<coluna>_max`), com o horário da primeira leitura do balde.
+def agregar_em_baldes(df, coluna, max_pontos):
+    serie = df[coluna].dropna()
+    if serie.empty: return pd.DataFrame(columns=[f"{coluna}_min", coluna, f"{coluna}_max"])
+    ts = serie.index.asi8
+    largura = max((ts[-1] - ts[0]) // max_pontos + 1, 1)
+    balde = (ts - ts[0]) // largura
+    grupos = serie.groupby(balde)
+    agregado = pd.DataFrame({f"{coluna}_min": grupos.min(), coluna: grupos.mean(), f"{coluna}_max": grupos.max()})
+    agregado.index = serie.index[np.searchsorted(balde, agregado.index.to_numpy())]
+    return agregado
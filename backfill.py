@@ -0,0 +1,246 @@
+import argparse
+import json
+import math
+import os
+import threading
+import time as py_time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+import pytz
+import requests
+from requests.adapters import HTTPAdapter
+
+from calculos import calcular_delta_t_dataframe
+from config import APP_TIMEZONE_STR, ler_segredo
+from ecowitt import URL_API_PADRAO, mapear_dados_ecowitt
+from estacoes import carregar_estacoes
+from historico import CAMINHO_PADRAO, HistoricoEstacao
+
+# --- BACKFILL DO HISTÓRICO (API de histórico da Ecowitt) ---
+# Preenche o histórico de um período (ex.: depois de uma queda do servidor ou ao cadastrar uma estação)
+# com poucas requisições: o período é dividido em blocos de tempo (padrão: 1 dia, 288 leituras de 5 min
+# por requisição) buscados em paralelo com limite de conexões. Cada bloco passa pelo mesmo mapeamento da
+# consulta em tempo real (mapear_dados_ecowitt), tem Delta T e derivados calculados em lote
+# (calcular_delta_t_dataframe) e é gravado com um único executemany (salvar_lote).
+# Blocos concluídos ficam num checkpoint JSON por estação: rodar de novo retoma de onde parou.
+# Por padrão só entram leituras sem outra gravada a menos de meio ciclo (lacunas); --sobrescrever grava tudo.
+#   python backfill.py --inicio 2025-03-01 --fim 2025-05-31
+#   python backfill.py --inicio 2025-05-01 --api-local    (servidor local que imita a API, para testes)
+CICLOS_SEGUNDOS = {"5min": 300, "30min": 1800, "4hour": 14400, "1day": 86400}
+BLOCOS_API = "outdoor,indoor,wind,pressure,solar_and_uvi"
+FORMATO_DATA_API = "%Y-%m-%d %H:%M:%S"
+DIR_CHECKPOINTS_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados", "backfill")
+
+class ErroBackfill(Exception):
+    pass
+
+def dividir_periodo(inicio, fim, bloco):
+    blocos = []
+    atual = inicio
+    while atual < fim:
+        blocos.append((atual, min(atual + bloco, fim)))
+        atual += bloco
+    return blocos
+
+# --- Requisição de um bloco, com novas tentativas e espera exponencial ---
+def buscar_bloco(sessao, api_url, credenciais, mac, inicio, fim, ciclo, tentativas=4, timeout=60):
+    params = {
+        "application_key": credenciais["app_key"], "api_key": credenciais["api_key"], "mac": mac,
+        "start_date": inicio.strftime(FORMATO_DATA_API), "end_date": fim.strftime(FORMATO_DATA_API),
+        "cycle_type": ciclo, "call_back": BLOCOS_API,
+        "temp_unitid": "1", "pressure_unitid": "3", "wind_speed_unitid": "7", "rainfall_unitid": "12",
+    }
+    url = api_url.rstrip("/") + "/device/history"
+    erro = None
+    for tentativa in range(tentativas):
+        if tentativa: py_time.sleep(min(2 ** tentativa, 30))
+        try:
+            resposta = sessao.get(url, params=params, timeout=timeout)
+            resposta.raise_for_status()
+            api_data = resposta.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            erro = f"Erro de conexão com a API Ecowitt: {e}"; continue
+        if api_data.get("code") == 0:
+            return api_data.get("data") or {} # Período sem leituras vem como lista vazia
+        erro = f"Erro da API Ecowitt: {api_data.get('msg', 'Resposta inválida')} (Código: {api_data.get('code', 'N/A')})"
+    raise ErroBackfill(erro)
+
+# A API de histórico devolve, por campo, {"list": {"<ts>": "<valor>", ...}}. As séries são remontadas
+# por instante no formato da consulta em tempo real ({"value": ...}) e passam pelo mesmo mapeamento.
+def leituras_do_historico(device_data):
+    por_ts = defaultdict(dict)
+    for nome_bloco, bloco in (device_data.items() if isinstance(device_data, dict) else []):
+        if not isinstance(bloco, dict): continue
+        for campo, serie in bloco.items():
+            lista = serie.get("list") if isinstance(serie, dict) else None
+            if not isinstance(lista, dict): continue
+            for ts, valor in lista.items():
+                por_ts[int(ts)].setdefault(nome_bloco, {})[campo] = {"value": valor}
+    if not por_ts: return pd.DataFrame(columns=["ts"])
+    df = pd.DataFrame([dict(mapear_dados_ecowitt(dados), ts=ts) for ts, dados in sorted(por_ts.items())])
+    derivados = calcular_delta_t_dataframe(df).drop(columns="condition_code")
+    return pd.concat([df, derivados], axis=1)
+
+# Descarta leituras com outra já gravada a menos de `tolerancia_s` (busca binária nos instantes existentes)
+def filtrar_lacunas(df, existentes, tolerancia_s):
+    if df.empty or not existentes: return df
+    existentes = np.asarray(existentes, dtype=np.int64)
+    ts = df["ts"].to_numpy(dtype=np.int64)
+    pos = np.searchsorted(existentes, ts)
+    anterior = existentes[np.clip(pos - 1, 0, len(existentes) - 1)]
+    seguinte = existentes[np.clip(pos, 0, len(existentes) - 1)]
+    distancia = np.minimum(np.abs(ts - anterior), np.abs(seguinte - ts))
+    return df[distancia >= tolerancia_s]
+
+# --- Checkpoint: blocos já importados (início do bloco em segundos epoch -> leituras gravadas) ---
+class Checkpoint:
+    def __init__(self, caminho, parametros, recomecar=False):
+        self.caminho = caminho
+        self.parametros = parametros
+        self.concluidos = {}
+        self._lock = threading.Lock()
+        if not recomecar and os.path.exists(caminho):
+            with open(caminho, encoding="utf-8") as f: salvo = json.load(f)
+            if salvo.get("parametros") == parametros: # Outro ciclo ou tamanho de bloco começa do zero
+                self.concluidos = {int(k): v for k, v in salvo.get("concluidos", {}).items()}
+
+    def concluido(self, inicio_ts):
+        return inicio_ts in self.concluidos
+
+    def marcar(self, inicio_ts, gravadas):
+        with self._lock:
+            self.concluidos[inicio_ts] = gravadas
+            pasta = os.path.dirname(self.caminho)
+            if pasta: os.makedirs(pasta, exist_ok=True)
+            temporario = self.caminho + ".tmp"
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump({"parametros": self.parametros, "concluidos": {str(k): v for k, v in sorted(self.concluidos.items())}}, f)
+            os.replace(temporario, self.caminho) # Uma interrupção no meio da escrita não corrompe o checkpoint
+
+def executar_backfill(historico, estacao_id, mac, inicio, fim, credenciais, api_url=None, ciclo="5min",
+                      bloco=timedelta(days=1), paralelo=4, dir_checkpoints=DIR_CHECKPOINTS_PADRAO,
+                      recomecar=False, sobrescrever=False, reportar=print):
+    if ciclo not in CICLOS_SEGUNDOS: raise ErroBackfill(f"Ciclo desconhecido: {ciclo} (use {', '.join(CICLOS_SEGUNDOS)})")
+    api_url = api_url or ler_segredo("ECOWITT_API_URL", URL_API_PADRAO)
+    checkpoint = Checkpoint(os.path.join(dir_checkpoints, f"{estacao_id}.json"),
+                            {"mac": mac, "ciclo": ciclo, "bloco_s": int(bloco.total_seconds())}, recomecar)
+    agora_ts = datetime.now(historico.timezone).timestamp()
+    pendentes = [(a, b) for a, b in dividir_periodo(inicio, fim, bloco) if not checkpoint.concluido(int(a.timestamp()))]
+    reportar(f"{estacao_id}: {len(pendentes)} bloco(s) a importar de {inicio:%d/%m/%Y %H:%M} a {fim:%d/%m/%Y %H:%M}")
+
+    sessao = requests.Session()
+    sessao.mount("http://", HTTPAdapter(pool_maxsize=paralelo))
+    sessao.mount("https://", HTTPAdapter(pool_maxsize=paralelo))
+    total, falhas = 0, 0
+    def processar(a, b): # Rede, mapeamento e Delta T em paralelo; a gravação fica na thread principal
+        return leituras_do_historico(buscar_bloco(sessao, api_url, credenciais, mac, a, b, ciclo))
+    with ThreadPoolExecutor(max_workers=max(1, paralelo), thread_name_prefix="backfill") as executor:
+        futuros = {executor.submit(processar, a, b): (a, b) for a, b in pendentes}
+        for futuro in as_completed(futuros):
+            a, b = futuros[futuro]
+            try:
+                df = futuro.result()
+            except Exception as e: # API, resposta malformada ou mapeamento: só este bloco falha, os demais seguem
+                falhas += 1
+                reportar(f"{estacao_id}: bloco {a:%d/%m/%Y %H:%M} falhou ({e}); será tentado de novo na próxima execução")
+                continue
+            recebidas = len(df)
+            if not sobrescrever and recebidas:
+                existentes = historico.timestamps(df["ts"].min() - CICLOS_SEGUNDOS[ciclo], df["ts"].max() + CICLOS_SEGUNDOS[ciclo], estacao_id)
+                df = filtrar_lacunas(df, existentes, CICLOS_SEGUNDOS[ciclo] / 2)
+            gravadas = historico.salvar_lote(df, estacao_id)
+            total += gravadas
+            if b.timestamp() <= agora_ts - CICLOS_SEGUNDOS[ciclo]: # O bloco que inclui "agora" ainda vai receber leituras
+                checkpoint.marcar(int(a.timestamp()), gravadas)
+            reportar(f"{estacao_id}: {a:%d/%m/%Y %H:%M} -> {recebidas} leitura(s) recebida(s), {gravadas} gravada(s)")
+    return total, falhas
+
+# --- API DE HISTÓRICO LOCAL (imita /device/history com dados sintéticos, para testes sem a nuvem) ---
+def criar_api_historico_falsa(timezone, porta=0, host="127.0.0.1"):
+    class ManipuladorHistorico(BaseHTTPRequestHandler):
+        def do_GET(self):
+            partes = urlsplit(self.path)
+            if not partes.path.endswith("/device/history"):
+                self.send_error(404); return
+            params = {k: v[0] for k, v in parse_qs(partes.query).items()}
+            passo = CICLOS_SEGUNDOS.get(params.get("cycle_type"), 300)
+            ini = timezone.localize(datetime.strptime(params["start_date"], FORMATO_DATA_API)).timestamp()
+            fim = timezone.localize(datetime.strptime(params["end_date"], FORMATO_DATA_API)).timestamp()
+            ts = np.arange(math.ceil(ini / passo) * passo, fim, passo, dtype=np.int64)
+            hora = (ts % 86400) / 3600.0 - 3 # Aproximadamente a hora local de Brasília
+            temp = 22 + 8 * np.sin((hora - 9) / 24 * 2 * np.pi)
+            serie = lambda valores, fmt="{:.1f}": {"list": {str(t): fmt.format(v) for t, v in zip(ts.tolist(), valores.tolist())}}
+            dados = {
+                "outdoor": {"temperature": serie(temp), "humidity": serie(np.clip(95 - 2.2 * (temp - 14), 15, 100), "{:.0f}")},
+                "indoor": {"temperature": serie(temp - 1.5)},
+                "wind": {"wind_speed": serie(6 + 5 * np.sin(ts / 5400.0)), "wind_gust": serie(9 + 6 * np.sin(ts / 5400.0)),
+                         "wind_direction": serie((ts // 600) % 360, "{:.0f}")},
+                "pressure": {"relative": serie(1013 + 3 * np.sin(ts / 43200.0))},
+                "solar_and_uvi": {"solar": serie(np.clip(900 * np.sin((hora - 6) / 12 * np.pi), 0, None)), "uvi": serie(np.zeros(len(ts)), "{:.0f}")},
+            } if len(ts) else []
+            corpo = json.dumps({"code": 0, "msg": "success", "time": str(int(py_time.time())), "data": dados}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, formato, *args): pass
+
+    servidor = ThreadingHTTPServer((host, porta), ManipuladorHistorico)
+    threading.Thread(target=servidor.serve_forever, name="api-historico-falsa", daemon=True).start()
+    return servidor
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa o histórico de leituras da API Ecowitt para o banco local.")
+    parser.add_argument("--inicio", required=True, help="Data inicial (AAAA-MM-DD ou AAAA-MM-DD HH:MM), horário local.")
+    parser.add_argument("--fim", help="Data final (padrão: agora).")
+    parser.add_argument("--estacao", action="append", help="Id da estação (pode repetir; padrão: todas as cadastradas).")
+    parser.add_argument("--ciclo", default="5min", choices=list(CICLOS_SEGUNDOS), help="Resolução pedida à API.")
+    parser.add_argument("--bloco-horas", type=float, default=24, help="Horas por requisição.")
+    parser.add_argument("--paralelo", type=int, default=4, help="Requisições simultâneas por estação.")
+    parser.add_argument("--banco", default=ler_segredo("HISTORICO_DB_PATH", CAMINHO_PADRAO))
+    parser.add_argument("--checkpoints", default=DIR_CHECKPOINTS_PADRAO, help="Pasta dos checkpoints de retomada.")
+    parser.add_argument("--recomecar", action="store_true", help="Ignora os checkpoints e importa o período inteiro.")
+    parser.add_argument("--sobrescrever", action="store_true", help="Grava todas as leituras, mesmo onde já há dados.")
+    parser.add_argument("--api-url", help="Base da API (padrão: ECOWITT_API_URL ou a API oficial).")
+    parser.add_argument("--api-local", action="store_true", help="Usa uma API de histórico local com dados sintéticos.")
+    args = parser.parse_args()
+
+    timezone = pytz.timezone(APP_TIMEZONE_STR)
+    ler_data = lambda texto: timezone.localize(datetime.fromisoformat(texto))
+    inicio = ler_data(args.inicio)
+    fim = ler_data(args.fim) if args.fim else datetime.now(timezone)
+    credenciais = {"api_key": ler_segredo("ECOWITT_API_KEY"), "app_key": ler_segredo("ECOWITT_APPLICATION_KEY")}
+    api_url = args.api_url
+    estacoes = [e for e in carregar_estacoes() if not args.estacao or e["id"] in args.estacao]
+    if args.api_local:
+        servidor = criar_api_historico_falsa(timezone)
+        api_url = f"http://127.0.0.1:{servidor.server_address[1]}/api/v3"
+        credenciais = {"api_key": "local", "app_key": "local"}
+        estacoes = [dict(e, mac=e.get("mac") or "00:00:00:00:00:00") for e in estacoes]
+    if not args.api_local: # Conta própria da estação, quando configurada no registro
+        estacoes = [dict(e, credenciais={"api_key": e.get("api_key") or credenciais["api_key"],
+                                         "app_key": e.get("app_key") or credenciais["app_key"]}) for e in estacoes]
+    if not all(all(e.get("credenciais", credenciais).values()) for e in estacoes):
+        raise SystemExit("Credenciais da API Ecowitt não configuradas em .streamlit/secrets.toml")
+
+    historico = HistoricoEstacao(args.banco, timezone)
+    inicio_execucao = py_time.perf_counter()
+    total, falhas = 0, 0
+    for estacao in estacoes:
+        if not estacao.get("mac"):
+            print(f"{estacao['id']}: sem MAC configurado, ignorada"); continue
+        gravadas, falhas_estacao = executar_backfill(
+            historico, estacao["id"], estacao["mac"], inicio, fim, estacao.get("credenciais", credenciais), api_url=api_url, ciclo=args.ciclo,
+            bloco=timedelta(hours=args.bloco_horas), paralelo=args.paralelo, dir_checkpoints=args.checkpoints,
+            recomecar=args.recomecar, sobrescrever=args.sobrescrever)
+        total += gravadas; falhas += falhas_estacao
+    print(f"Concluído em {py_time.perf_counter() - inicio_execucao:.1f} s: {total} leitura(s) gravada(s), {falhas} bloco(s) com falha.")
+    if falhas: raise SystemExit(1)
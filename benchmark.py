@@ -0,0 +1,290 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import altair as alt
+import numpy as np
+import pandas as pd
+import pytz
+import requests
+
+from alertas import MotorAlertas
+from amostragem import agregar_em_baldes, reduzir_lttb
+from calculos import calcular_delta_t_e_condicao, calcular_delta_t_lote
+from config import APP_TIMEZONE_STR
+from ecowitt import fetch_real_ecowitt_data, montar_dados_completos
+from grafico_delta_t import fronteiras_delta_t, grafico_zonas, preparar_trajetoria, zonas_delta_t
+from grafico_delta_t import grafico_delta_t as grafico_referencia
+from historico import COLUNAS_DADOS, ESTACAO_PADRAO, HistoricoEstacao, HistoricoIncremental
+from janelas import IndiceJanelas
+
+# --- BENCHMARK DOS CAMINHOS QUENTES DO PAINEL ---
+# Mede Delta T (escalar x lote), busca + mapeamento da API contra payloads gravados servidos localmente,
+# montagem do gráfico de referência, o motor de alertas, o caminho histórico -> DataFrame -> Altair e o índice de janelas em vários tamanhos.
+# Grava um JSON com a mediana de cada caso; com --comparar, falha (código 1) se algum caso ficou
+# mais lento que a referência além da tolerância.
+#   python benchmark.py --saida dados/benchmark.json
+#   python benchmark.py --tamanhos 200,10000 --comparar dados/benchmark.json
+DIR_RAIZ = os.path.dirname(os.path.abspath(__file__))
+DIR_PAYLOADS = os.path.join(DIR_RAIZ, "payloads_ecowitt")
+TAMANHOS_PADRAO = (200, 10_000, 100_000, 1_000_000)
+PONTOS_MAX_GRAFICO = 800
+
+def medir(funcao, repeticoes, aquecimento=1):
+    for _ in range(aquecimento): funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+def resultado(caso, n, tempos, **extras):
+    mediana = statistics.median(tempos)
+    return {"caso": caso, "n": n, "repeticoes": len(tempos), "mediana_s": mediana, "min_s": min(tempos),
+            "max_s": max(tempos), "por_item_us": mediana / n * 1e6 if n else None, **extras}
+
+def leituras_sinteticas(n, semente=42):
+    rng = np.random.default_rng(semente)
+    t = rng.uniform(5, 40, n)
+    rh = rng.uniform(15, 100, n)
+    return t, rh
+
+# --- Delta T: laço escalar (caminho de cada leitura) x lote NumPy (recálculo/backfill) ---
+def bench_delta_t(tamanhos, repeticoes, max_escalar):
+    saida = []
+    for n in tamanhos:
+        t, rh = leituras_sinteticas(n)
+        saida.append(resultado("delta_t_lote", n, medir(lambda: calcular_delta_t_lote(t, rh), repeticoes)))
+        if n <= max_escalar:
+            pares = list(zip(t.tolist(), rh.tolist()))
+            tempos = medir(lambda: [calcular_delta_t_e_condicao(a, b) for a, b in pares], max(1, repeticoes // 2), aquecimento=0)
+            saida.append(resultado("delta_t_escalar", n, tempos))
+    return saida
+
+# --- Servidor local que imita a API Ecowitt: o parâmetro `mac` escolhe o payload gravado ---
+def servidor_falso(payloads):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # Mantém a conexão aberta, como a sessão do poller
+        disable_nagle_algorithm = True # Sem isso, cabeçalho e corpo em escritas separadas esperam o ACK atrasado (~40 ms)
+
+        def do_GET(self):
+            partes = urlsplit(self.path)
+            corpo = payloads.get(parse_qs(partes.query).get("mac", [""])[0]) if partes.path.endswith("/device/real_time") else None
+            if corpo is None:
+                self.send_error(404); return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, formato, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=servidor.serve_forever, name="benchmark-api-falsa", daemon=True).start()
+    return servidor
+
+def bench_busca_api(url_api, payloads, repeticoes, chamadas=200):
+    saida = []
+    timezone = pytz.timezone(APP_TIMEZONE_STR)
+    sessao = requests.Session()
+    for nome in sorted(payloads):
+        erros = []
+        def buscar():
+            for _ in range(chamadas):
+                dados = fetch_real_ecowitt_data(reportar_erro=erros.append, mac_address=nome, sessao=sessao,
+                                                api_url=url_api, api_key="benchmark", app_key="benchmark")
+                montar_dados_completos(dados, datetime.now(timezone))
+        saida.append(resultado("busca_api_local", chamadas, medir(buscar, repeticoes), payload=nome))
+        if erros: raise RuntimeError(f"Payload {nome}: {erros[0]}")
+        # Só o mapeamento (sem HTTP), para separar o custo do parse do custo da rede local
+        api_data = json.loads(payloads[nome])
+        mapear = lambda: [montar_dados_completos(_mapear_sem_rede(api_data), datetime.now(timezone)) for _ in range(chamadas)]
+        saida.append(resultado("mapeamento_api", chamadas, medir(mapear, repeticoes), payload=nome))
+    return saida
+
+# Reaproveita o mapeamento de fetch_real_ecowitt_data com uma sessão que devolve o payload já decodificado
+class _RespostaPronta:
+    def __init__(self, dados): self.dados = dados
+    def raise_for_status(self): pass
+    def json(self): return self.dados
+
+class _SessaoPronta:
+    def __init__(self, dados): self.resposta = _RespostaPronta(dados)
+    def get(self, *args, **kwargs): return self.resposta
+
+def _mapear_sem_rede(api_data):
+    return fetch_real_ecowitt_data(reportar_erro=print, mac_address="benchmark", sessao=_SessaoPronta(api_data),
+                                   api_key="benchmark", app_key="benchmark")
+
+# --- Gráfico Delta T de referência: grade de zonas (uma vez por processo) x camada da leitura atual e da trajetória ---
+# Cada caso vai até a especificação Vega-Lite pronta, que é o que o painel envia ao navegador
+def bench_grafico(repeticoes, pontos=20, leituras_trajetoria=288):
+    def zonas_frio():
+        for funcao in (fronteiras_delta_t, zonas_delta_t, grafico_zonas): funcao.cache_clear()
+        grafico_zonas()
+    saida = [resultado("grafico_zonas_frio", 1, medir(zonas_frio, repeticoes))]
+    random.seed(7)
+    leituras = [(random.uniform(5, 45), random.uniform(15, 100)) for _ in range(pontos)]
+    saida.append(resultado("grafico_referencia", pontos, medir(lambda: [grafico_referencia(t, rh) for t, rh in leituras], repeticoes)))
+    t, rh = leituras_sinteticas(leituras_trajetoria) # 24 h a cada 5 min
+    df = pd.DataFrame({"temperature_superior_c": t, "humidity_percent": rh},
+                      index=pd.date_range(end=pd.Timestamp.now(tz=APP_TIMEZONE_STR), periods=leituras_trajetoria, freq="5min"))
+    df = df.assign(delta_t_c=calcular_delta_t_lote(t, rh)["delta_t_c"], condition_text="ADEQUADA")
+    saida.append(resultado("grafico_referencia_trajetoria", leituras_trajetoria, medir(
+        lambda: grafico_referencia(t[-1], rh[-1], preparar_trajetoria(df)), repeticoes)))
+    return saida
+
+# --- Motor de alertas: custo por leitura com várias estações (deve ficar constante com o tamanho) ---
+def bench_alertas(tamanhos, repeticoes, estacoes=50):
+    saida = []
+    timezone = pytz.timezone(APP_TIMEZONE_STR)
+    inicio = datetime.now(timezone)
+    for n in tamanhos:
+        t, rh = leituras_sinteticas(n)
+        delta_t = calcular_delta_t_lote(t, rh)["delta_t_c"]
+        vento = np.random.default_rng(2).uniform(0, 20, n)
+        registros = [{"timestamp": (inicio + pd.Timedelta(seconds=60 * (i // estacoes))).isoformat(), "delta_t_c": float(delta_t[i]),
+                      "wind_speed_kmh": float(vento[i]), "temperature_c": float(t[i]), "temperature_superior_c": float(t[i]) + 0.5}
+                     for i in range(n)]
+        def processar():
+            motor = MotorAlertas() # Sem notificadores: só a avaliação das regras
+            for i, registro in enumerate(registros): motor.processar(registro, f"estacao{i % estacoes}")
+        saida.append(resultado("alertas_processar", n, medir(processar, repeticoes)))
+    return saida
+
+# --- Histórico -> DataFrame -> Altair ---
+def popular_historico(caminho, n, timezone, passo_s=60):
+    historico = HistoricoEstacao(caminho, timezone)
+    t, rh = leituras_sinteticas(n)
+    derivados = calcular_delta_t_lote(t, rh)
+    fim_ts = int(time.time())
+    ts = np.arange(fim_ts - (n - 1) * passo_s, fim_ts + 1, passo_s, dtype=np.int64)
+    rng = np.random.default_rng(1)
+    colunas = {
+        "temperature_c": t - 1.0, "temperature_superior_c": t, "humidity_percent": rh,
+        "wet_bulb_c": derivados["wet_bulb_c"], "delta_t_c": derivados["delta_t_c"],
+        "dew_point_c": derivados["dew_point_c"], "feels_like_c": derivados["feels_like_c"],
+        "wind_speed_kmh": rng.uniform(0, 20, n), "wind_gust_kmh": rng.uniform(0, 30, n),
+        "pressure_hpa": rng.uniform(1000, 1020, n), "uv_index": rng.uniform(0, 10, n),
+        "solar_radiation_wm2": rng.uniform(0, 900, n), "luminosity_lux": rng.uniform(0, 108000, n),
+        "condition_text": np.array(["INADEQUADA", "ADEQUADA", "ATENÇÃO", "ARRISCADA", "ERRO CÁLCULO"], dtype=object)[derivados["condition_code"]],
+        "condition_description": np.full(n, None, dtype=object),
+        "wind_direction": np.array(["N", "NE", "E", "SE", "S", "SW", "W", "NW"], dtype=object)[rng.integers(0, 8, n)],
+    }
+    linhas = zip(*([np.full(n, ESTACAO_PADRAO, dtype=object), ts.tolist()] + [colunas[c].tolist() for c in COLUNAS_DADOS]))
+    conn = sqlite3.connect(caminho)
+    with conn:
+        conn.executemany(f"INSERT OR REPLACE INTO leituras (estacao, ts, {', '.join(COLUNAS_DADOS)}) "
+                         f"VALUES ({', '.join('?' * (len(COLUNAS_DADOS) + 2))})", linhas)
+    conn.close()
+    return historico, int(ts[0])
+
+def grafico_delta_t(df):
+    df_dt = reduzir_lttb(df[["delta_t_c", "condition_text"]], "delta_t_c", PONTOS_MAX_GRAFICO).reset_index()
+    return alt.Chart(df_dt).mark_line().encode(x="timestamp_dt:T", y="delta_t_c:Q").to_dict()
+
+def grafico_agregado(df, coluna):
+    df_agr = agregar_em_baldes(df, coluna, PONTOS_MAX_GRAFICO).reset_index()
+    base = alt.Chart(df_agr).encode(x="timestamp_dt:T")
+    return (base.mark_area().encode(y=f"{coluna}_min:Q", y2=f"{coluna}_max:Q") + base.mark_line().encode(y=f"{coluna}:Q")).to_dict()
+
+def bench_pipeline(tamanhos, repeticoes, max_sem_reducao):
+    saida = []
+    timezone = pytz.timezone(APP_TIMEZONE_STR)
+    with tempfile.TemporaryDirectory() as pasta:
+        for n in tamanhos:
+            historico, inicio_ts = popular_historico(os.path.join(pasta, f"historico_{n}.sqlite3"), n, timezone)
+            rep = max(1, repeticoes if n <= 100_000 else repeticoes // 2)
+            saida.append(resultado("sqlite_para_dataframe", n, medir(lambda: historico.consultar_dataframe(inicio_ts=inicio_ts), rep)))
+            df = historico.consultar_dataframe(inicio_ts=inicio_ts)
+            saida.append(resultado("lttb_delta_t_altair", n, medir(lambda: grafico_delta_t(df), rep)))
+            saida.append(resultado("baldes_altair", n, medir(lambda: grafico_agregado(df, "temperature_c"), rep)))
+
+            janela = HistoricoIncremental(historico, capacidade=n, janela=pd.Timedelta(seconds=int(time.time()) - inicio_ts + 1))
+            saida.append(resultado("janela_recente_intervalo", n, medir(
+                lambda: janela.intervalo(datetime.fromtimestamp(inicio_ts, timezone), None), rep)))
+            # Índice de janelas: montagem a partir do SQLite e consultas de 30 dias, contra recontar o DataFrame
+            saida.append(resultado("janelas_montagem", n, medir(lambda: IndiceJanelas(historico), max(1, rep // 2), aquecimento=0)))
+            indice = IndiceJanelas(historico)
+            fim_dt = datetime.now(timezone)
+            inicio_dt = fim_dt - pd.Timedelta(days=30)
+            saida.append(resultado("janelas_consulta", n, medir(lambda: (indice.resumo(inicio_dt, fim_dt),
+                                                                          indice.mais_longa("apta", "SIM", inicio_dt, fim_dt)), rep)))
+            saida.append(resultado("janelas_recontagem", n, medir(lambda: historico.consultar_dataframe(
+                inicio_ts=int(inicio_dt.timestamp()), fim_ts=int(fim_dt.timestamp()))["condition_text"].value_counts(), rep)))
+            if n <= max_sem_reducao: # Referência: todas as linhas serializadas, sem redução no servidor
+                with alt.data_transformers.disable_max_rows():
+                    tempos = medir(lambda: alt.Chart(df[["delta_t_c"]].reset_index()).mark_line().encode(
+                        x="timestamp_dt:T", y="delta_t_c:Q").to_dict(), max(1, rep // 2), aquecimento=0)
+                saida.append(resultado("altair_sem_reducao", n, tempos))
+    return saida
+
+def comparar(resultados, caminho_referencia, tolerancia):
+    with open(caminho_referencia, encoding="utf-8") as f:
+        referencia = {(r["caso"], r["n"], r.get("payload")): r for r in json.load(f)["resultados"]}
+    regressoes = []
+    for r in resultados:
+        anterior = referencia.get((r["caso"], r["n"], r.get("payload")))
+        if anterior and r["mediana_s"] > anterior["mediana_s"] * (1 + tolerancia):
+            regressoes.append(f"{r['caso']} (n={r['n']}{', ' + r['payload'] if r.get('payload') else ''}): "
+                              f"{anterior['mediana_s'] * 1e3:.2f} ms -> {r['mediana_s'] * 1e3:.2f} ms")
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos caminhos quentes do painel Delta T.")
+    parser.add_argument("--saida", default=os.path.join(DIR_RAIZ, "dados", "benchmark.json"), help="Arquivo JSON de resultados")
+    parser.add_argument("--tamanhos", default=",".join(str(n) for n in TAMANHOS_PADRAO), help="Quantidades de leituras, separadas por vírgula")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--max-escalar", type=int, default=100_000, help="Maior tamanho medido no laço escalar de Delta T")
+    parser.add_argument("--max-sem-reducao", type=int, default=100_000, help="Maior tamanho serializado no Altair sem redução")
+    parser.add_argument("--casos", default="delta_t,api,grafico,alertas,pipeline", help="Grupos a executar, separados por vírgula")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior; sai com código 1 se houver regressão")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Aumento relativo da mediana aceito em --comparar")
+    args = parser.parse_args()
+
+    tamanhos = [int(n) for n in args.tamanhos.split(",") if n]
+    casos = set(args.casos.split(","))
+    payloads = {os.path.splitext(os.path.basename(p))[0]: open(p, "rb").read() for p in glob.glob(os.path.join(DIR_PAYLOADS, "*.json"))}
+    servidor = servidor_falso(payloads)
+    url_local = f"http://127.0.0.1:{servidor.server_address[1]}"
+
+    resultados = []
+    if "delta_t" in casos: resultados += bench_delta_t(tamanhos, args.repeticoes, args.max_escalar)
+    if "api" in casos: resultados += bench_busca_api(url_local + "/api/v3", payloads, args.repeticoes)
+    if "grafico" in casos: resultados += bench_grafico(args.repeticoes)
+    if "alertas" in casos: resultados += bench_alertas([n for n in tamanhos if n <= args.max_escalar], args.repeticoes)
+    if "pipeline" in casos: resultados += bench_pipeline(tamanhos, args.repeticoes, args.max_sem_reducao)
+    servidor.shutdown()
+
+    for r in resultados:
+        print(f"{r['caso']:<28} n={r['n']:<9} {r['mediana_s'] * 1e3:>10.2f} ms" + (f"  ({r['payload']})" if r.get("payload") else ""))
+    pasta = os.path.dirname(args.saida)
+    if pasta: os.makedirs(pasta, exist_ok=True)
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump({"meta": {"data": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                            "plataforma": platform.platform(), "numpy": np.__version__, "pandas": pd.__version__,
+                            "altair": alt.__version__, "repeticoes": args.repeticoes},
+                   "resultados": resultados}, f, indent=2, ensure_ascii=False)
+    print(f"Resultados gravados em {args.saida}")
+
+    if args.comparar:
+        regressoes = comparar(resultados, args.comparar, args.tolerancia)
+        for linha in regressoes: print(f"REGRESSÃO: {linha}")
+        if regressoes: raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from calculos import CONDICOES_DELTA_T, TEXTO_CONDICAO_INVALIDA
+
+# --- BUFFER CIRCULAR COLUNAR DAS LEITURAS RECENTES (memória fixa, fatias sem cópia) ---
+# Cada coluna é um array NumPy: ts em segundos epoch (int64), medições em float32 e condição do Delta T
+# e direção do vento como códigos int8. Cada leitura é gravada duas vezes, na posição p e em p + capacidade
+# ("espelho"), então as últimas n leituras estão sempre contíguas e saem como views, sem np.concatenate.
+# Há `folga` posições além da capacidade visível: uma view entregue continua válida durante pelo menos
+# `folga` gravações seguintes, tempo de sobra para uma sessão terminar de desenhar tabela e gráficos.
+COLUNAS_FLOAT = [
+    "temperature_c", "temperature_superior_c", "humidity_percent", "wet_bulb_c", "delta_t_c",
+    "dew_point_c", "feels_like_c", "wind_speed_kmh", "wind_gust_kmh", "pressure_hpa",
+    "uv_index", "solar_radiation_wm2", "luminosity_lux",
+]
+DIRECOES_VENTO = ("N", "NE", "E", "SE", "S", "SW", "W", "NW") # Índice = código; -1 = sem direção
+TEXTOS_CONDICAO = CONDICOES_DELTA_T + (TEXTO_CONDICAO_INVALIDA,)  # Índice = código; -1 = sem condição
+SEM_CODIGO = -1
+
+def _codificar(valores, categorias):
+    return pd.Categorical(valores, categories=categorias).codes.astype(np.int8, copy=False) # Fora da lista vira -1
+
+class BufferLeituras:
+    def __init__(self, capacidade, folga=None):
+        self.capacidade = int(capacidade)
+        self.folga = int(folga) if folga is not None else max(64, self.capacidade // 16)
+        self._n_slots = self.capacidade + self.folga
+        self._ts = np.zeros(2 * self._n_slots, dtype=np.int64)
+        self._float = {c: np.full(2 * self._n_slots, np.nan, dtype=np.float32) for c in COLUNAS_FLOAT}
+        self._condicao = np.full(2 * self._n_slots, SEM_CODIGO, dtype=np.int8)
+        self._direcao = np.full(2 * self._n_slots, SEM_CODIGO, dtype=np.int8)
+        self._cabeca = 0   # Próximo slot a gravar
+        self._tamanho = 0  # Leituras visíveis (no máximo `capacidade`)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._tamanho
+
+    @property
+    def primeiro_ts(self):
+        with self._lock:
+            return int(self._ts[self._cabeca + self._n_slots - self._tamanho]) if self._tamanho else None
+
+    @property
+    def ultimo_ts(self):
+        with self._lock:
+            return int(self._ts[self._cabeca + self._n_slots - 1]) if self._tamanho else None
+
+    # Grava o DataFrame (índice DatetimeIndex, colunas como em HistoricoEstacao.consultar_dataframe),
+    # que deve vir em ordem crescente de tempo e depois da última leitura já guardada
+    def anexar_dataframe(self, df):
+        if df.empty: return
+        df = df.iloc[-self.capacidade:] # Do que não cabe, só as mais recentes importam
+        origem = {c: df[c].to_numpy(dtype=np.float32, na_value=np.nan) if c in df else np.float32(np.nan) for c in COLUNAS_FLOAT}
+        origem["ts"] = df.index.as_unit("s").asi8
+        origem["cond"] = _codificar(df["condition_text"], TEXTOS_CONDICAO) if "condition_text" in df else SEM_CODIGO
+        origem["direcao"] = _codificar(df["wind_direction"], DIRECOES_VENTO) if "wind_direction" in df else SEM_CODIGO
+        destinos = dict(self._float, ts=self._ts, cond=self._condicao, direcao=self._direcao)
+        with self._lock:
+            inicio = 0
+            while inicio < len(df): # Em pedaços que não passam do fim dos slots
+                n = min(len(df) - inicio, self._n_slots - self._cabeca)
+                for chave, arr in destinos.items():
+                    valores = origem[chave][inicio:inicio + n] if np.ndim(origem[chave]) else origem[chave]
+                    arr[self._cabeca:self._cabeca + n] = valores                                   # Original
+                    arr[self._cabeca + self._n_slots:self._cabeca + self._n_slots + n] = valores    # Espelho
+                self._cabeca = (self._cabeca + n) % self._n_slots
+                self._tamanho = min(self._tamanho + n, self.capacidade)
+                inicio += n
+
+    # Posições [i, j) no espelho das leituras com inicio_ts <= ts < fim_ts (busca binária nas views)
+    def _limites(self, inicio_ts=None, fim_ts=None):
+        fim = self._cabeca + self._n_slots
+        ini = fim - self._tamanho
+        ts = self._ts[ini:fim]
+        i = ini + (int(np.searchsorted(ts, inicio_ts, side="left")) if inicio_ts is not None else 0)
+        j = ini + (int(np.searchsorted(ts, fim_ts, side="left")) if fim_ts is not None else len(ts))
+        return i, j
+
+    # Views (sem cópia) das colunas no intervalo semiaberto [inicio_ts, fim_ts) ou das últimas `ultimas` leituras
+    def colunas(self, inicio_ts=None, fim_ts=None, ultimas=None):
+        with self._lock:
+            i, j = self._limites(inicio_ts, fim_ts)
+            if ultimas is not None: i = max(i, j - int(ultimas))
+            visao = {c: arr[i:j] for c, arr in self._float.items()}
+            visao["ts"] = self._ts[i:j]
+            visao["condition_text_code"] = self._condicao[i:j]
+            visao["wind_direction_code"] = self._direcao[i:j]
+        return visao
+
+    # DataFrame para tabela e gráficos: as colunas numéricas são as próprias views float32 (sem cópia);
+    # condição e direção viram Categorical a partir dos códigos int8 e o índice de tempo é convertido.
+    def para_dataframe(self, inicio_ts=None, fim_ts=None, ultimas=None, timezone=None):
+        visao = self.colunas(inicio_ts, fim_ts, ultimas)
+        indice = pd.DatetimeIndex(pd.to_datetime(visao.pop("ts"), unit="s", utc=True).as_unit("ns"), name="timestamp_dt")
+        if timezone is not None: indice = indice.tz_convert(timezone)
+        cond = visao.pop("condition_text_code"); direcao = visao.pop("wind_direction_code")
+        visao["condition_text"] = pd.Categorical.from_codes(cond, categories=TEXTOS_CONDICAO, validate=False)
+        visao["wind_direction"] = pd.Categorical.from_codes(direcao, categories=DIRECOES_VENTO, validate=False)
+        return pd.DataFrame(visao, index=indice, copy=False)
+
+    def bytes_usados(self):
+        return self._ts.nbytes + self._condicao.nbytes + self._direcao.nbytes + sum(a.nbytes for a in self._float.values())
@@ -0,0 +1,184 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+# --- FUNÇÕES DE CÁLCULO (Sem alterações) ---
+def calcular_temperatura_bulbo_umido_stull(t_bs, rh):
+    term1_factor = (rh + 8.313659)**0.5
+    term1 = t_bs * math.atan(0.151977 * term1_factor)
+    term2 = math.atan(t_bs + rh)
+    term3 = math.atan(rh - 1.676331)
+    term4_factor1 = rh**1.5
+    term4_factor2 = math.atan(0.023101 * rh)
+    term4 = 0.00391838 * term4_factor1 * term4_factor2
+    constante_final = 4.686035
+    t_w = term1 + term2 - term3 + term4 - constante_final
+    return t_w
+
+def calcular_delta_t_e_condicao(t_bs, rh):
+    if t_bs is None:
+        return None, None, "Erro: Temperatura do Ar (Superior) não fornecida para cálculo.", None, None, None
+    if not isinstance(rh, (int, float)) or not (0 <= rh <= 100):
+        return None, None, "Erro: Umidade Relativa inválida ou fora da faixa (0-100%).", None, None, None
+    if not isinstance(t_bs, (int, float)) or not (0 <= t_bs <= 50): # Limite de cálculo
+        return None, None, f"Erro: Temp. do Ar (Superior: {t_bs}°C) inválida ou fora da faixa (0-50°C).", None, None, None
+    try:
+        t_w = calcular_temperatura_bulbo_umido_stull(t_bs, rh)
+        delta_t = t_bs - t_w
+        ponto_orvalho = t_bs - ((100 - rh) / 5.0)
+        sensacao_termica = t_bs # Default
+        if rh >= 40:
+            e = (rh/100) * 6.105 * math.exp((17.27 * t_bs) / (237.7 + t_bs))
+            sensacao_termica = t_bs + 0.33 * e - 0.70 * 0
+            if t_bs > 27:
+                sensacao_termica = t_bs + 0.3 * ( (rh/100) * 6.105 * math.exp(17.27 * t_bs / (237.7 + t_bs)) - 10)
+        if rh < 50 and t_bs > 25 : sensacao_termica = t_bs + (t_bs-25)/5
+        elif rh > 70 and t_bs > 25: sensacao_termica = t_bs + (rh-70)/10 + (t_bs-25)/3
+
+        condicao_texto = "-"
+        descricao_condicao = ""
+        if delta_t < 2:
+            condicao_texto = "INADEQUADA"; descricao_condicao = "Risco elevado de deriva e escorrimento."
+        elif delta_t > 10:
+            condicao_texto = "ARRISCADA"; descricao_condicao = "Risco de evaporação excessiva das gotas."
+        elif 2 <= delta_t <= 8:
+            condicao_texto = "ADEQUADA"; descricao_condicao = "Condições ideais para pulverização."
+        else: # 8 < delta_t <= 10
+            condicao_texto = "ATENÇÃO"; descricao_condicao = f"Condição limite (Delta T {delta_t:.1f}°C)."
+        return t_w, delta_t, condicao_texto, descricao_condicao, ponto_orvalho, sensacao_termica
+    except Exception as e:
+        return None, None, f"Erro interno no cálculo Delta T: {e}", None, None, None
+
+# --- CLASSIFICAÇÃO DO VENTO E DA INVERSÃO TÉRMICA (mesmas regras do painel de condições atuais) ---
+# Devolvem (condição, descrição, cor de fundo, cor do texto)
+def classificar_vento(vento_vel):
+    if vento_vel <= 3: return "INADEQUADO", "Risco inversão térmica.", "#FFA500", "#FFFFFF"
+    elif 3 < vento_vel <= 12: return "EXCELENTE", "Vento ideal.", "#00CC66", "#FFFFFF"
+    else: return "PERIGOSO", "Risco de deriva.", "#FF0000", "#FFFFFF"
+
+# Índice em CONDICOES_DELTA_T (mesmos limites de calcular_delta_t_e_condicao), para classificar leitura por leitura
+def codigo_condicao_delta_t(delta_t):
+    if delta_t != delta_t: return CODIGO_INVALIDO # NaN
+    if delta_t < 2: return 0
+    if delta_t <= 8: return 1
+    if delta_t <= 10: return 2
+    return 3
+
+def avaliar_inversao(t_inf, t_sup, v_inv):
+    if all(val is not None for val in [t_inf, t_sup, v_inv]):
+        if t_sup < t_inf: return "APLICAÇÃO LIBERADA","Sem inversão.", "#00CC66","#FFFFFF"
+        elif t_sup > t_inf:
+            if v_inv < 3: return "INVERSÃO TÉRMICA","Não aplicar!", "#FF0000","#FFFFFF"
+            else: return "CUIDADO!","Possível inversão.", "#FFA500","#FFFFFF"
+        else: return "CONDIÇÃO ESTÁVEL","Temps iguais.", "lightgray", "black"
+    return "Aguardando...", "Dados insuficientes.", "lightgray", "black"
+
+# --- CÁLCULO VETORIZADO EM LOTE (reprocessamento e importação de histórico) ---
+# Mesmas fórmulas e mesmos limites de calcular_delta_t_e_condicao, aplicados a arrays inteiros de uma vez.
+# Linhas fora da faixa válida (ou com NaN) saem como NaN e código de condição CODIGO_INVALIDO,
+# em vez da mensagem de erro por linha do caminho escalar.
+CONDICOES_DELTA_T = ("INADEQUADA", "ADEQUADA", "ATENÇÃO", "ARRISCADA") # Índice = código da condição
+DESCRICOES_CONDICAO = ("Risco elevado de deriva e escorrimento.", "Condições ideais para pulverização.",
+                       "Condição limite (Delta T {:.1f}°C).", "Risco de evaporação excessiva das gotas.")
+CODIGO_INVALIDO = -1
+TEXTO_CONDICAO_INVALIDA = "ERRO CÁLCULO" # Mesmo texto gravado por montar_dados_completos
+
+def calcular_temperatura_bulbo_umido_stull_lote(t_bs, rh):
+    term1 = t_bs * np.arctan(0.151977 * (rh + 8.313659)**0.5)
+    term4 = 0.00391838 * rh**1.5 * np.arctan(0.023101 * rh)
+    return term1 + np.arctan(t_bs + rh) - np.arctan(rh - 1.676331) + term4 - 4.686035
+
+# Código da condição (índice em CONDICOES_DELTA_T) de cada valor de Delta T; NaN vira CODIGO_INVALIDO
+def classificar_delta_t_lote(delta_t):
+    delta_t = np.asarray(delta_t, dtype=np.float64)
+    codigo = np.full(delta_t.shape, CODIGO_INVALIDO, dtype=np.int8)
+    with np.errstate(invalid="ignore"):
+        codigo[delta_t < 2] = 0
+        codigo[(delta_t >= 2) & (delta_t <= 8)] = 1
+        codigo[(delta_t > 8) & (delta_t <= 10)] = 2
+        codigo[delta_t > 10] = 3
+    return codigo
+
+# Mesmas regras de classificar_vento e avaliar_inversao, com códigos (índices nas tuplas abaixo) em vez de textos
+CONDICOES_VENTO = ("INADEQUADO", "EXCELENTE", "PERIGOSO")
+ESTADOS_INVERSAO = ("APLICAÇÃO LIBERADA", "INVERSÃO TÉRMICA", "CUIDADO!", "CONDIÇÃO ESTÁVEL")
+
+def classificar_vento_lote(vento_vel):
+    vento_vel = np.asarray(vento_vel, dtype=np.float64)
+    codigo = np.full(vento_vel.shape, CODIGO_INVALIDO, dtype=np.int8)
+    with np.errstate(invalid="ignore"):
+        codigo[vento_vel <= 3] = 0
+        codigo[(vento_vel > 3) & (vento_vel <= 12)] = 1
+        codigo[vento_vel > 12] = 2
+    return codigo
+
+def avaliar_inversao_lote(t_inf, t_sup, v_inv):
+    t_inf, t_sup, v_inv = (np.asarray(a, dtype=np.float64) for a in (t_inf, t_sup, v_inv))
+    completos = ~(np.isnan(t_inf) | np.isnan(t_sup) | np.isnan(v_inv)) # "Aguardando..." fica CODIGO_INVALIDO
+    codigo = np.full(t_inf.shape, CODIGO_INVALIDO, dtype=np.int8)
+    with np.errstate(invalid="ignore"):
+        codigo[completos & (t_sup < t_inf)] = 0
+        codigo[completos & (t_sup > t_inf) & (v_inv < 3)] = 1
+        codigo[completos & (t_sup > t_inf) & (v_inv >= 3)] = 2
+        codigo[completos & (t_sup == t_inf)] = 3
+    return codigo
+
+def calcular_delta_t_lote(t_bs, rh):
+    t_bs = np.asarray(t_bs, dtype=np.float64)
+    rh = np.asarray(rh, dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        validos = (rh >= 0) & (rh <= 100) & (t_bs >= 0) & (t_bs <= 50) # NaN compara como falso
+    t_bs = np.where(validos, t_bs, np.nan)
+    rh = np.where(validos, rh, np.nan)
+
+    with np.errstate(invalid="ignore"):
+        t_w = calcular_temperatura_bulbo_umido_stull_lote(t_bs, rh)
+        delta_t = t_bs - t_w
+        ponto_orvalho = t_bs - ((100 - rh) / 5.0)
+
+        e = (rh/100) * 6.105 * np.exp((17.27 * t_bs) / (237.7 + t_bs))
+        sensacao_termica = np.where(rh >= 40, t_bs + 0.33 * e - 0.70 * 0, t_bs)
+        sensacao_termica = np.where((rh >= 40) & (t_bs > 27), t_bs + 0.3 * (e - 10), sensacao_termica)
+        sensacao_termica = np.where((rh < 50) & (t_bs > 25), t_bs + (t_bs-25)/5,
+                                    np.where((rh > 70) & (t_bs > 25), t_bs + (rh-70)/10 + (t_bs-25)/3, sensacao_termica))
+
+        codigo = classificar_delta_t_lote(delta_t) # delta_t já é NaN nas linhas inválidas
+
+    return {
+        "wet_bulb_c": t_w, "delta_t_c": delta_t, "dew_point_c": ponto_orvalho,
+        "feels_like_c": sensacao_termica, "condition_code": codigo,
+    }
+
+# Mesmo resultado do round() do Python, que arredonda o valor binário exato; np.round multiplica por 10**casas
+# antes e pode divergir nos empates. Só os valores próximos de um empate passam pelo round() escalar.
+def arredondar_lote(valores, casas):
+    arredondado = np.round(valores, casas)
+    escalado = valores * 10.0**casas
+    with np.errstate(invalid="ignore"):
+        perto_do_empate = np.flatnonzero(np.abs(escalado - np.floor(escalado) - 0.5) < 1e-6)
+    arredondado[perto_do_empate] = [round(v, casas) for v in valores[perto_do_empate].tolist()]
+    return arredondado
+
+# Versão para DataFrame: devolve as colunas derivadas no mesmo formato (e arredondamento) dos registros gravados
+def calcular_delta_t_dataframe(df, coluna_temp="temperature_superior_c", coluna_umid="humidity_percent"):
+    t_bs = pd.to_numeric(df[coluna_temp], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    rh = pd.to_numeric(df[coluna_umid], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    res = calcular_delta_t_lote(t_bs, rh)
+    codigo = res["condition_code"]
+
+    # CODIGO_INVALIDO (-1) indexa o último elemento: o texto de erro e a descrição vazia
+    textos = np.array(CONDICOES_DELTA_T + (TEXTO_CONDICAO_INVALIDA,), dtype=object)
+    descricoes = np.array(DESCRICOES_CONDICAO + (None,), dtype=object)[codigo]
+    atencao = np.flatnonzero(codigo == 2)
+    descricoes[atencao] = [DESCRICOES_CONDICAO[2].format(dt) for dt in res["delta_t_c"][atencao]]
+
+    return pd.DataFrame({
+        "wet_bulb_c": arredondar_lote(res["wet_bulb_c"], 2),
+        "delta_t_c": arredondar_lote(res["delta_t_c"], 2),
+        "condition_text": textos[codigo],
+        "condition_description": descricoes,
+        "dew_point_c": arredondar_lote(res["dew_point_c"], 1),
+        "feels_like_c": arredondar_lote(res["feels_like_c"], 1),
+        "condition_code": codigo,
+    }, index=df.index)
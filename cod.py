@@ -1,492 +1,563 @@
-import streamlit as st
-import math
-import requests
-from PIL import Image, ImageDraw
-from io import BytesIO
-from datetime import datetime, timedelta, time
-import pytz
-import time as py_time 
-import pandas as pd
-import altair as alt
-
-# --- Timezone Configuration ---
-APP_TIMEZONE_STR = "America/Sao_Paulo"
-try:
-    app_timezone = pytz.timezone(APP_TIMEZONE_STR)
-except pytz.exceptions.UnknownTimeZoneError:
-    st.error(f"Fuso horário desconhecido: {APP_TIMEZONE_STR}. Usando UTC.")
-    app_timezone = pytz.utc
-
-# --- Simulação do Firestore (Mantido para histórico) ---
-if 'db_historico' not in st.session_state:
-    st.session_state.db_historico = []
-
-def salvar_dados_no_firestore_simulado(dados):
-    st.session_state.db_historico.append(dados)
-    max_historico = 200
-    if len(st.session_state.db_historico) > max_historico:
-        st.session_state.db_historico = st.session_state.db_historico[-max_historico:]
-
-def carregar_historico_do_firestore_simulado():
-    return sorted([item.copy() for item in st.session_state.db_historico], key=lambda x: x.get('timestamp', ''), reverse=True)
-
-# --- FUNÇÕES DE CÁLCULO (Sem alterações) ---
-def calcular_temperatura_bulbo_umido_stull(t_bs, rh):
-    term1_factor = (rh + 8.313659)**0.5
-    term1 = t_bs * math.atan(0.151977 * term1_factor)
-    term2 = math.atan(t_bs + rh)
-    term3 = math.atan(rh - 1.676331)
-    term4_factor1 = rh**1.5
-    term4_factor2 = math.atan(0.023101 * rh)
-    term4 = 0.00391838 * term4_factor1 * term4_factor2
-    constante_final = 4.686035
-    t_w = term1 + term2 - term3 + term4 - constante_final
-    return t_w
-
-def calcular_delta_t_e_condicao(t_bs, rh):
-    if t_bs is None:
-        return None, None, "Erro: Temperatura do Ar (Superior) não fornecida para cálculo.", None, None, None
-    if not isinstance(rh, (int, float)) or not (0 <= rh <= 100):
-        return None, None, "Erro: Umidade Relativa inválida ou fora da faixa (0-100%).", None, None, None
-    if not isinstance(t_bs, (int, float)) or not (0 <= t_bs <= 50): # Limite de cálculo
-        return None, None, f"Erro: Temp. do Ar (Superior: {t_bs}°C) inválida ou fora da faixa (0-50°C).", None, None, None
-    try:
-        t_w = calcular_temperatura_bulbo_umido_stull(t_bs, rh)
-        delta_t = t_bs - t_w
-        ponto_orvalho = t_bs - ((100 - rh) / 5.0)
-        sensacao_termica = t_bs # Default
-        if rh >= 40:
-            e = (rh/100) * 6.105 * math.exp((17.27 * t_bs) / (237.7 + t_bs))
-            sensacao_termica = t_bs + 0.33 * e - 0.70 * 0
-            if t_bs > 27:
-                sensacao_termica = t_bs + 0.3 * ( (rh/100) * 6.105 * math.exp(17.27 * t_bs / (237.7 + t_bs)) - 10)
-        if rh < 50 and t_bs > 25 : sensacao_termica = t_bs + (t_bs-25)/5
-        elif rh > 70 and t_bs > 25: sensacao_termica = t_bs + (rh-70)/10 + (t_bs-25)/3
-
-        condicao_texto = "-"
-        descricao_condicao = ""
-        if delta_t < 2:
-            condicao_texto = "INADEQUADA"; descricao_condicao = "Risco elevado de deriva e escorrimento."
-        elif delta_t > 10:
-            condicao_texto = "ARRISCADA"; descricao_condicao = "Risco de evaporação excessiva das gotas."
-        elif 2 <= delta_t <= 8:
-            condicao_texto = "ADEQUADA"; descricao_condicao = "Condições ideais para pulverização."
-        else: # 8 < delta_t <= 10
-            condicao_texto = "ATENÇÃO"; descricao_condicao = f"Condição limite (Delta T {delta_t:.1f}°C)."
-        return t_w, delta_t, condicao_texto, descricao_condicao, ponto_orvalho, sensacao_termica
-    except Exception as e:
-        return None, None, f"Erro interno no cálculo Delta T: {e}", None, None, None
-
-# --- FUNÇÃO PARA DESENHAR PONTO E ÍCONE NO GRÁFICO (Sem alterações) ---
-def desenhar_grafico_com_ponto(imagem_base_pil, temp_para_plotar, rh_usuario, url_icone):
-    if imagem_base_pil is None: return None
-    img_processada = imagem_base_pil.copy()
-    if temp_para_plotar is None or rh_usuario is None: return img_processada
-    if not (isinstance(temp_para_plotar, (int, float)) and isinstance(rh_usuario, (int, float))): return img_processada
-
-    draw = ImageDraw.Draw(img_processada)
-    temp_min_g, temp_max_g = 0.0, 50.0; px_x_min, px_x_max = 198, 880
-    rh_min_g, rh_max_g = 10.0, 100.0; px_y_min, px_y_max = 650, 108
-
-    if not (temp_min_g <= temp_para_plotar <= temp_max_g): return img_processada
-
-    plot_temp = max(temp_min_g, min(temp_para_plotar, temp_max_g))
-    plot_rh = max(rh_min_g, min(rh_usuario, rh_max_g))
-
-    px_x = int(px_x_min + ((plot_temp - temp_min_g) / (temp_max_g - temp_min_g) if (temp_max_g - temp_min_g) != 0 else 0) * (px_x_max - px_x_min))
-    px_y = int(px_y_min - ((plot_rh - rh_min_g) / (rh_max_g - rh_min_g) if (rh_max_g - rh_min_g) != 0 else 0) * (px_y_min - px_y_max))
-
-    raio = 8; cor = "red"
-    draw.ellipse([(px_x - raio, px_y - raio), (px_x + raio, px_y + raio)], fill=cor, outline="black", width=1)
-    try:
-        resp_icone = requests.get(url_icone, timeout=10, headers={'User-Agent': 'Mozilla/5.0'})
-        resp_icone.raise_for_status()
-        if not any(ct in resp_icone.headers.get('content-type','').lower() for ct in ['png','jpeg','gif','webp']):
-            return img_processada
-        icone_pil = Image.open(BytesIO(resp_icone.content)).convert("RGBA")
-        tamanho_icone = (int(35*1.25), int(35*1.25))
-        icone_redim = icone_pil.resize(tamanho_icone, Image.Resampling.LANCZOS)
-        img_processada.paste(icone_redim, (px_x - tamanho_icone[0]//2, px_y - tamanho_icone[1]//2), icone_redim)
-    except Exception: pass
-    return img_processada
-
-# --- FUNÇÕES PARA BUSCAR DADOS REAIS DA ECOWITT (Sem alterações na lógica interna) ---
-def convert_deg_to_cardinal(deg):
-    if deg is None: return None
-    try:
-        deg = float(deg)
-        dirs = ["N", "NE", "E", "SE", "S", "SW", "W", "NW"] # 8 direções principais
-        ix = round(deg / 45) % 8
-        return dirs[ix]
-    except (ValueError, TypeError):
-        return None
-
-def fetch_real_ecowitt_data():
-    api_key = st.secrets.get("ECOWITT_API_KEY")
-    app_key = st.secrets.get("ECOWITT_APPLICATION_KEY")
-    mac_address = st.secrets.get("ECOWITT_MAC_ADDRESS")
-
-    if not all([api_key, app_key, mac_address]):
-        st.error("Credenciais da API Ecowitt não configuradas em .streamlit/secrets.toml")
-        return None
-
-    params = {
-        "application_key": app_key, "api_key": api_key, "mac": mac_address,
-        "temp_unitid": "1", "pressure_unitid": "3",
-        "wind_speed_unitid": "7", "rainfall_unitid": "12", "call_back": "all",
-    }
-    api_url = "http://api.ecowitt.net/api/v3/device/real_time"
-
-    try:
-        response = requests.get(api_url, params=params, timeout=15)
-        response.raise_for_status()
-        api_data = response.json()
-
-        if api_data.get("code") == 0 and "data" in api_data:
-            device_data = api_data["data"]
-            mapped_data = {
-                "temperature_c": None, "humidity_percent": None, "temperature_superior_c": None,
-                "wind_speed_kmh": None, "wind_gust_kmh": None, "pressure_hpa": None,
-                "wind_direction": None, "uv_index": None,
-                "solar_radiation_wm2": None, "luminosity_lux": None,
-            }
-
-            if "indoor" in device_data:
-                indoor_block = device_data["indoor"]
-                if "temperature" in indoor_block:
-                    mapped_data["temperature_c"] = indoor_block["temperature"].get("value")
-            if "pressure" in device_data:
-                pressure_block = device_data["pressure"]
-                mapped_data["pressure_hpa"] = pressure_block.get("relative", {}).get("value")
-                if mapped_data["pressure_hpa"] is None:
-                    mapped_data["pressure_hpa"] = pressure_block.get("absolute", {}).get("value")
-            if "outdoor" in device_data:
-                outdoor_block = device_data["outdoor"]
-                if "temperature" in outdoor_block:
-                    mapped_data["temperature_superior_c"] = outdoor_block["temperature"].get("value")
-                if "humidity" in outdoor_block:
-                    mapped_data["humidity_percent"] = outdoor_block["humidity"].get("value")
-            if "wind" in device_data:
-                wind_block = device_data["wind"]
-                if "wind_speed" in wind_block:
-                    mapped_data["wind_speed_kmh"] = wind_block["wind_speed"].get("value")
-                if "wind_gust" in wind_block:
-                    mapped_data["wind_gust_kmh"] = wind_block["wind_gust"].get("value")
-                if "wind_direction" in wind_block:
-                    wind_dir_deg = wind_block["wind_direction"].get("value")
-                    mapped_data["wind_direction"] = convert_deg_to_cardinal(wind_dir_deg)
-            if "solar_and_uvi" in device_data:
-                solar_uvi_block = device_data["solar_and_uvi"]
-                if "solar" in solar_uvi_block:
-                    mapped_data["solar_radiation_wm2"] = solar_uvi_block["solar"].get("value")
-                    if mapped_data["solar_radiation_wm2"] is not None:
-                        try: mapped_data["luminosity_lux"] = float(str(mapped_data["solar_radiation_wm2"])) * 120 
-                        except: pass 
-                if "uvi" in solar_uvi_block:
-                    mapped_data["uv_index"] = solar_uvi_block["uvi"].get("value")
-            
-            for key in mapped_data.keys():
-                if mapped_data.get(key) is not None:
-                    try: mapped_data[key] = float(str(mapped_data[key]))
-                    except (ValueError, TypeError):
-                        if not isinstance(mapped_data[key], str): mapped_data[key] = None
-            return mapped_data
-        else:
-            st.error(f"Erro da API Ecowitt: {api_data.get('msg', 'Resposta inválida')} (Código: {api_data.get('code', 'N/A')})")
-            return None
-    except requests.exceptions.RequestException as e:
-        st.error(f"Erro de conexão com a API Ecowitt: {e}")
-        return None
-    except Exception as e:
-        st.error(f"Erro crítico ao processar dados da API Ecowitt: {e}")
-        import traceback; print(f"Erro Crítico: {traceback.format_exc()}")
-        return None
-
-# --- LÓGICA DA APLICAÇÃO STREAMLIT ---
-@st.cache_data(ttl=3600)
-def load_image_from_url(url):
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        return Image.open(BytesIO(response.content))
-    except Exception as e:
-        print(f"Erro ao carregar imagem de {url}: {e}")
-        return None
-
-logo_pil = load_image_from_url("https://i.postimg.cc/9F8T5vBk/Whats-App-Image-2025-05-20-at-19-33-48.jpg")
-url_grafico_base = "https://i.postimg.cc/zXZpjrnd/Screenshot-20250520-192948-Drive.jpg"
-imagem_base_pil = load_image_from_url(url_grafico_base)
-if imagem_base_pil: imagem_base_pil = imagem_base_pil.convert("RGBA")
-
-col_logo_main, col_title_main = st.columns([1, 6])
-with col_logo_main:
-    if logo_pil: st.image(logo_pil, width=100)
-with col_title_main:
-    st.title("Estação Meteorológica BASE AGRO")
-    st.caption("Monitoramento de condições para pulverização agrícola eficiente e segura.")
-
-if 'last_update_time' not in st.session_state: st.session_state.last_update_time = datetime(1970,1,1,tzinfo=app_timezone)
-if 'dados_atuais' not in st.session_state: st.session_state.dados_atuais = {}
-if 'imagem_grafico_atual' not in st.session_state: st.session_state.imagem_grafico_atual = None
-
-url_icone_localizacao = "https://estudioweb.com.br/wp-content/uploads/2023/02/Emoji-Alvo-png.png"
-INTERVALO_ATUALIZACAO_MINUTOS = 5
-
-def atualizar_dados_estacao():
-    dados_ecowitt = fetch_real_ecowitt_data() # Alterado para buscar dados reais
-    now_app_tz = datetime.now(app_timezone)
-
-    if dados_ecowitt is None:
-        st.warning("Não foi possível buscar dados reais da estação. Verifique as mensagens de erro acima.")
-        return False
-
-    temp_ar_inferior = dados_ecowitt.get("temperature_c") # Do GW2000
-    umid_rel = dados_ecowitt.get("humidity_percent")      # Do Wittboy (superior)
-    temp_ar_superior = dados_ecowitt.get("temperature_superior_c") # Do Wittboy
-
-    t_w, delta_t, condicao, desc_condicao, ponto_orvalho, sensacao_termica = \
-        calcular_delta_t_e_condicao(temp_ar_superior, umid_rel)
-
-    dados_completos = {
-        "timestamp": now_app_tz.isoformat(),
-        "temperature_c": temp_ar_inferior,
-        "temperature_superior_c": temp_ar_superior,
-        "humidity_percent": umid_rel,
-        "wet_bulb_c": round(t_w, 2) if t_w is not None else None,
-        "delta_t_c": round(delta_t, 2) if delta_t is not None else None,
-        "condition_text": condicao if delta_t is not None else "ERRO CÁLCULO",
-        "condition_description": desc_condicao,
-        "dew_point_c": round(ponto_orvalho,1) if ponto_orvalho is not None else None,
-        "feels_like_c": round(sensacao_termica,1) if sensacao_termica is not None else None,
-        "wind_speed_kmh": dados_ecowitt.get("wind_speed_kmh"),
-        "wind_gust_kmh": dados_ecowitt.get("wind_gust_kmh"),
-        "wind_direction": dados_ecowitt.get("wind_direction"),
-        "pressure_hpa": dados_ecowitt.get("pressure_hpa"),
-        "uv_index": dados_ecowitt.get("uv_index"),
-        "solar_radiation_wm2": dados_ecowitt.get("solar_radiation_wm2"),
-        "luminosity_lux": dados_ecowitt.get("luminosity_lux"),
-    }
-
-    if delta_t is None and desc_condicao:
-        st.error(f"Falha no cálculo Delta T: {desc_condicao}")
-
-    salvar_dados_no_firestore_simulado(dados_completos)
-    st.session_state.dados_atuais = dados_completos
-    if imagem_base_pil:
-        temp_plot = temp_ar_superior if delta_t is not None else temp_ar_inferior
-        rh_plot = umid_rel
-        if temp_plot is not None and rh_plot is not None: # Somente plota se tiver dados válidos
-            st.session_state.imagem_grafico_atual = desenhar_grafico_com_ponto(
-                imagem_base_pil, temp_plot, rh_plot, url_icone_localizacao
-            )
-        else: # Se não puder plotar, reseta para a imagem base ou nada
-            st.session_state.imagem_grafico_atual = imagem_base_pil # Ou None, se preferir
-            
-    st.session_state.last_update_time = now_app_tz
-    return delta_t is not None
-
-# --- Interface Streamlit (com as alterações de layout solicitadas) ---
-
-if st.session_state.last_update_time.year == 1970 or \
-   st.session_state.last_update_time < (datetime.now(app_timezone) - timedelta(minutes=INTERVALO_ATUALIZACAO_MINUTOS)):
-    atualizar_dados_estacao()
-
-last_update_dt = st.session_state.last_update_time
-last_update_str = last_update_dt.strftime('%d/%m/%Y %H:%M:%S') if last_update_dt.year > 1970 else 'Aguardando...'
-st.caption(f"Última atualização: {last_update_str} (Horário Local: {APP_TIMEZONE_STR})")
-st.markdown("---")
-
-st.subheader("Condições Atuais da Estação")
-dados = st.session_state.dados_atuais
-if dados: 
-    st.markdown("##### 🌡️ Temperatura e Umidade")
-    col_t1, col_t2 = st.columns(2)
-    
-    with col_t1:
-        # Temperatura do Wittboy (Superior) - agora é a principal e primeira
-        if dados.get('temperature_superior_c') is not None:
-            st.metric("Temperatura", 
-                      f"{dados.get('temperature_superior_c'):.1f} °C", 
-                      help="Temperatura do ar (sensor Wittboy - superior). Usada para cálculo do Delta T e derivados.")
-        else:
-            st.metric("Temperatura", "- °C", help="Temperatura do ar (sensor Wittboy - superior).")
-
-        # Ponto de Orvalho (calculado com base na Temp. Superior e Umidade do Wittboy)
-        st.metric("Ponto de Orvalho", 
-                  f"{dados.get('dew_point_c', '-'):.1f} °C" if dados.get('dew_point_c') is not None else "- °C")
-
-    with col_t2:
-        # Umidade Relativa do Wittboy (usada para Delta T)
-        st.metric("Umidade Relativa", 
-                  f"{dados.get('humidity_percent', '-'):.1f} %" if dados.get('humidity_percent') is not None else "- %",
-                  help="Umidade relativa (sensor Wittboy - superior).")
-        
-        # Sensação Térmica (calculada com base na Temp. Superior e Umidade do Wittboy)
-        st.metric("Sensação Térmica", 
-                  f"{dados.get('feels_like_c', '-'):.1f} °C" if dados.get('feels_like_c') is not None else "- °C")
-    
-    # A métrica "Temp. Ar (Inferior)" foi removida desta seção principal.
-    # Ela ainda está disponível em `dados.get('temperature_c')` para o Indicador de Inversão Térmica.
-    st.markdown("---")
-
-    # Delta T (baseado na Temp Superior)
-    dt_val = dados.get('delta_t_c')
-    dt_cond = dados.get('condition_text', '-')
-    dt_desc = dados.get('condition_description', 'Aguardando...')
-    dt_color_map = {"INADEQUADA": "#FFA500", "ARRISCADA": "#FF0000", "ADEQUADA": "#00CC66", "ATENÇÃO": "#FFA500"}
-    dt_bg = dt_color_map.get(dt_cond, "#F8D7DA" if "ERRO" in str(dt_cond).upper() else "lightgray")
-    dt_txt = "#FFFFFF" if dt_cond in dt_color_map else ("#721C24" if "ERRO" in str(dt_cond).upper() else "black")
-
-    st.markdown(f"<div style='text-align:center; margin-bottom:10px;'><span style='font-size:1.1em; font-weight:bold;'>Delta T (Base Temp. Sup.):</span><br><span style='font-size:2.2em; font-weight:bold; color:#007bff;'>{dt_val:.2f}°C</span></div>" if dt_val is not None else "<div style='text-align:center; margin-bottom:10px;'><span style='font-size:1.1em; font-weight:bold;'>Delta T:</span><br><span style='font-size:2.2em; font-weight:bold; color:gray;'>-</span></div>", unsafe_allow_html=True)
-    st.markdown(f"<div style='background-color:{dt_bg}; color:{dt_txt}; padding:10px; border-radius:5px; text-align:center; margin-bottom:5px;'><strong style='font-size:1.1em;'>Condição Delta T: {dt_cond}</strong></div><p style='text-align:center; font-size:0.85em; color:#555;'>{dt_desc}</p>", unsafe_allow_html=True)
-    st.markdown("---")
-
-    # Vento e Pressão
-    st.markdown("##### 💨 Vento e Pressão")
-    col_v1, col_v2 = st.columns(2)
-    vento_vel = dados.get('wind_speed_kmh', 0.0) if dados.get('wind_speed_kmh') is not None else 0.0
-    cond_v_txt, desc_v_txt, bg_v_col, txt_v_col = "-", "", "lightgray", "black"
-    if vento_vel <= 3: cond_v_txt, desc_v_txt, bg_v_col, txt_v_col = "INADEQUADO", "Risco inversão térmica.", "#FFA500", "#FFFFFF"
-    elif 3 < vento_vel <= 12: cond_v_txt, desc_v_txt, bg_v_col, txt_v_col = "EXCELENTE", "Vento ideal.", "#00CC66", "#FFFFFF"
-    else: cond_v_txt, desc_v_txt, bg_v_col, txt_v_col = "PERIGOSO", "Risco de deriva.", "#FF0000", "#FFFFFF"
-    col_v1.metric("Vento Médio", f"{vento_vel:.1f} km/h")
-    col_v1.metric("Pressão", f"{dados.get('pressure_hpa', '-'):.1f} hPa" if dados.get('pressure_hpa') is not None else "-")
-    col_v2.metric("Rajadas", f"{dados.get('wind_gust_kmh', '-'):.1f} km/h" if dados.get('wind_gust_kmh') is not None else "-")
-    col_v2.metric("Direção Vento", f"{dados.get('wind_direction', '-')}")
-    st.markdown(f"<div style='background-color:{bg_v_col};color:{txt_v_col};padding:10px;border-radius:5px;text-align:center;margin-top:10px;margin-bottom:5px;'><strong style='font-size:1.1em'>Cond. Vento: {cond_v_txt}</strong></div><p style='text-align:center;font-size:0.85em;color:#555'>{desc_v_txt}</p>", unsafe_allow_html=True)
-    st.markdown("---")
-
-    # Indicador de Inversão Térmica com nomes completos
-    st.markdown("##### 🌡️ Indicador de Inversão Térmica")
-    t_inf, t_sup, v_inv = dados.get('temperature_c'), dados.get('temperature_superior_c'), dados.get('wind_speed_kmh')
-    inv_cols = st.columns(3)
-    inv_cols[0].metric("Temperatura Inferior", f"{t_inf:.1f}°C" if t_inf is not None else "N/D", help="Temperatura medida pelo GW2000 (base).")
-    inv_cols[1].metric("Temperatura Superior", f"{t_sup:.1f}°C" if t_sup is not None else "N/D", help="Temperatura medida pelo Wittboy (topo).")
-    inv_cols[2].metric("Vento Atual", f"{v_inv:.1f} km/h" if v_inv is not None else "N/D")
-
-    s_inv, d_inv, bg_inv_col, txt_inv_col = "Aguardando...", "", "lightgray", "black"
-    if all(val is not None for val in [t_inf, t_sup, v_inv]):
-        if t_sup < t_inf: s_inv,d_inv,bg_inv_col,txt_inv_col = "APLICAÇÃO LIBERADA","Sem inversão.", "#00CC66","#FFFFFF"
-        elif t_sup > t_inf:
-            if v_inv < 3: s_inv,d_inv,bg_inv_col,txt_inv_col = "INVERSÃO TÉRMICA","Não aplicar!", "#FF0000","#FFFFFF"
-            else: s_inv,d_inv,bg_inv_col,txt_inv_col = "CUIDADO!","Possível inversão.", "#FFA500","#FFFFFF"
-        else: s_inv,d_inv = "CONDIÇÃO ESTÁVEL","Temps iguais."
-    else: d_inv = "Dados insuficientes."
-    st.markdown(f"<div style='background-color:{bg_inv_col};color:{txt_inv_col};padding:10px;border-radius:5px;text-align:center;margin-top:10px;margin-bottom:5px;'><strong style='font-size:1.1em'>{s_inv}</strong></div><p style='text-align:center;font-size:0.85em;color:#555'>{d_inv}</p>", unsafe_allow_html=True)
-    st.markdown("---")
-else:
-    st.info("Aguardando dados da estação para exibir as condições atuais...")
-
-if st.button("🔄 Forçar Atualização Manual", help="Busca novos dados da estação Ecowitt."):
-    if atualizar_dados_estacao(): st.success("Dados atualizados!")
-    else: st.error("Falha ao buscar ou processar dados da estação.")
-    st.rerun()
-
-st.subheader("Gráfico Delta T de Referência")
-img_para_exibir = st.session_state.get('imagem_grafico_atual')
-if img_para_exibir:
-    ts_atual_str = datetime.fromisoformat(dados['timestamp']).astimezone(app_timezone).strftime('%d/%m/%Y %H:%M:%S') if dados and dados.get('timestamp') else "desconhecida"
-    st.image(img_para_exibir, caption=f"Ponto plotado para dados de: {ts_atual_str}", use_container_width=True)
-elif imagem_base_pil:
-    st.image(imagem_base_pil, caption="Gráfico de referência (aguardando dados para ponto).", use_container_width=True)
-else:
-    st.warning("Imagem base do gráfico Delta T não pôde ser carregada.")
-st.markdown("---")
-
-st.subheader("Histórico de Dados da Estação")
-historico_bruto = carregar_historico_do_firestore_simulado()
-if historico_bruto:
-    df_historico = pd.DataFrame(historico_bruto)
-    if not df_historico.empty and 'timestamp' in df_historico.columns:
-        try:
-            df_historico['timestamp_dt'] = pd.to_datetime(df_historico['timestamp'].astype(str), errors='coerce')
-            df_historico.dropna(subset=['timestamp_dt'], inplace=True)
-            if df_historico['timestamp_dt'].dt.tz is None: # Verifica se é naive
-                df_historico['timestamp_dt'] = df_historico['timestamp_dt'].dt.tz_localize('UTC').dt.tz_convert(app_timezone)
-            else: # Se já for aware, apenas converte
-                df_historico['timestamp_dt'] = df_historico['timestamp_dt'].dt.tz_convert(app_timezone)
-            df_historico = df_historico.sort_values(by='timestamp_dt', ascending=False)
-
-            st.markdown("##### Últimos Registros")
-            cols_hist = ['timestamp_dt', 'temperature_c', 'temperature_superior_c', 'humidity_percent', 'delta_t_c', 'condition_text', 'wind_speed_kmh']
-            df_display = df_historico[[col for col in cols_hist if col in df_historico.columns]].head(10).copy()
-            mapa_nomes = {'timestamp_dt': "Data/Hora",'temperature_c': "T.Inf(°C)",'temperature_superior_c': "T.Sup(°C)", 'humidity_percent': "UR(%)",'delta_t_c': "ΔT(°C)",'condition_text': "Cond.ΔT",'wind_speed_kmh': "Vento(km/h)"}
-            df_display.rename(columns=mapa_nomes, inplace=True)
-            if "Data/Hora" in df_display.columns:
-                df_display.loc[:, "Data/Hora"] = df_display["Data/Hora"].dt.strftime('%d/%m/%y %H:%M')
-            st.dataframe(df_display, use_container_width=True, hide_index=True)
-            st.markdown("---")
-
-            st.subheader("Tendências Recentes")
-            df_chart_full = df_historico.set_index('timestamp_dt').sort_index()
-            opts_int = {"1 H":1,"3 H":3,"12 H":12,"24 H":24,"3 D":72,"7 D":168,"Tudo":None}
-            
-            sel_int_label = st.radio("Intervalo Gráficos:", list(opts_int.keys())+["Custom"], horizontal=True, key="sel_int_graf")
-            
-            df_chart_filt = pd.DataFrame(); now_filt = datetime.now(app_timezone)
-
-            if sel_int_label == "Custom":
-                date_picker_cols = st.columns(2) 
-                if len(date_picker_cols) == 2:
-                    c_start, c_end = date_picker_cols
-                    min_hist_dt_val = (now_filt - timedelta(days=7)).date()
-                    if not df_chart_full.empty and pd.notna(df_chart_full.index.min()):
-                         min_hist_dt_val = df_chart_full.index.min().date()
-                    
-                    start_val = st.session_state.get('d_start_pick_val', min_hist_dt_val)
-                    end_val = st.session_state.get('d_end_pick_val', now_filt.date())
-
-                    d_start = c_start.date_input("Início", value=start_val, min_value=(now_filt - timedelta(days=730)).date(), max_value=now_filt.date(), key="d_start_pick_ui")
-                    if d_start: st.session_state.d_start_pick_val = d_start
-                    
-                    if d_start and end_val < d_start: end_val = d_start
-                    
-                    d_end = c_end.date_input("Fim", value=end_val, min_value=d_start if d_start else (now_filt - timedelta(days=730)).date(), max_value=now_filt.date(), key="d_end_pick_ui")
-                    if d_end: st.session_state.d_end_pick_val = d_end
-
-                    if d_start and d_end:
-                        s_dt = app_timezone.localize(datetime.combine(d_start, time.min)); e_dt = app_timezone.localize(datetime.combine(d_end, time.max))
-                        df_chart_filt = df_chart_full[(df_chart_full.index >= s_dt) & (df_chart_full.index <= e_dt)]
-                    else: df_chart_filt = pd.DataFrame()
-                else:
-                    st.error("Falha interna: colunas para datas."); df_chart_filt = pd.DataFrame()
-            else:
-                horas = opts_int.get(sel_int_label)
-                if horas is not None: df_chart_filt = df_chart_full[df_chart_full.index >= (now_filt - timedelta(hours=horas))]
-                else: df_chart_filt = df_chart_full
-            
-            if not df_chart_filt.empty:
-                df_alt = df_chart_filt.reset_index()
-                common_x = alt.X('timestamp_dt:T', title='Data/Hora', axis=alt.Axis(format='%d/%m %Hh'))
-                tooltip_ts = alt.Tooltip('timestamp_dt:T', title='Data/Hora', format='%d/%m %H:%M')
-
-                delta_t_c_chart = alt.Chart(df_alt.dropna(subset=['delta_t_c'])).mark_line(point=alt.OverlayMarkDef(size=20), interpolate='monotone').encode(
-                    x=common_x, y=alt.Y('delta_t_c:Q', title='ΔT (°C)'),
-                    color=alt.condition(alt.LogicalOrPredicate(predicates=[alt.LogicalAndPredicate(predicates=[alt.datum.delta_t_c>=0,alt.datum.delta_t_c<2]), alt.LogicalAndPredicate(predicates=[alt.datum.delta_t_c>8,alt.datum.delta_t_c<=10])]), alt.value('orange'),
-                                      alt.condition(alt.LogicalAndPredicate(predicates=[alt.datum.delta_t_c>=2,alt.datum.delta_t_c<=8]), alt.value('#00CC66'),
-                                                    alt.condition(alt.datum.delta_t_c>10,alt.value('red'),alt.value('lightgray')))),
-                    tooltip=[tooltip_ts, alt.Tooltip('delta_t_c:Q',title='ΔT(°C)',format='.2f'), alt.Tooltip('condition_text:N',title='Cond.ΔT')]
-                ).properties(title='Tendência Delta T (base T.Superior)').interactive()
-                st.altair_chart(delta_t_c_chart, use_container_width=True)
-
-                for col, title_chart, color_c in [('temperature_c','T.Inf.(°C)','royalblue'),('temperature_superior_c','T.Sup.(°C)','orangered'), ('humidity_percent','UR(%)','forestgreen'),('wind_speed_kmh','Vento(km/h)','slategray')]:
-                    if col in df_alt.columns:
-                        chart = alt.Chart(df_alt.dropna(subset=[col])).mark_line(point=True, color=color_c).encode(
-                            x=common_x, y=alt.Y(f'{col}:Q', title=title_chart), tooltip=[tooltip_ts, alt.Tooltip(f'{col}:Q', title=title_chart, format='.1f')]
-                        ).properties(title=f'Tendência {title_chart}').interactive()
-                        st.altair_chart(chart, use_container_width=True)
-            else: st.info("Sem dados históricos para o intervalo selecionado.")
-        except Exception as e_pd:
-            st.error(f"Erro ao formatar histórico ou gerar gráficos: {e_pd}")
-            import traceback
-            print(f"Pandas/Altair Error: {e_pd}\n{traceback.format_exc()}")
-else: st.info("Nenhum histórico de dados encontrado.")
-
-st.markdown("---")
-st.markdown("""
-**Notas:**
-- **Delta T:** Calculado com a **Temperatura e Umidade do Sensor Superior** (WS90).
-- **Temperatura Inferior:** Medida pelo Gateway **GW2000**.
-- **Inversão Térmica:** Avaliada comparando T. Inferior, T. Superior e Vento.
-
-""")
+import streamlit as st
+from datetime import datetime, timedelta, time
+import pytz
+import time as py_time 
+import numpy as np
+import pandas as pd
+import altair as alt
+
+from agendador import AgendadorAdaptativo
+from alertas import motor_alertas_configurado
+from amostragem import agregar_em_baldes, reduzir_lttb
+from calculos import avaliar_inversao, classificar_vento
+from config import APP_TIMEZONE_STR, ler_segredo
+from estacoes import carregar_estacoes, mapa_passkeys
+from exportacao import (CAMINHO_EXPORTACAO_PADRAO, FORMATOS, HOST_EXPORTACAO_PADRAO, VALIDADE_LINK_PADRAO, exportar,
+                        iniciar_servidor_exportacao_em_thread, limites_do_periodo, nome_arquivo, url_exportacao)
+from grafico_delta_t import grafico_delta_t, preparar_trajetoria
+from historico import CAMINHO_PADRAO, HistoricoEstacao, HistoricoIncremental
+from ingestao_push import CAMINHO_PUSH_PADRAO, HOST_PUSH_PADRAO, iniciar_servidor_em_thread
+from janelas import IndiceJanelas
+from metricas import HOST_METRICAS_PADRAO, METRICAS, iniciar_servidor_metricas_em_thread
+from poller import PollerEstacao
+from recursos import carregar_imagem
+
+inicio_execucao = py_time.perf_counter() # Duração da execução completa do script, registrada no fim
+
+# --- Timezone Configuration ---
+try:
+    app_timezone = pytz.timezone(APP_TIMEZONE_STR)
+except pytz.exceptions.UnknownTimeZoneError:
+    st.error(f"Fuso horário desconhecido: {APP_TIMEZONE_STR}. Usando UTC.")
+    app_timezone = pytz.utc
+
+# --- Histórico persistente (SQLite compartilhado entre sessões; substitui a simulação do Firestore) ---
+@st.cache_resource
+def obter_historico():
+    return HistoricoEstacao(ler_segredo("HISTORICO_DB_PATH", CAMINHO_PADRAO), app_timezone)
+
+historico = obter_historico()
+
+# --- Estações (registro em secrets.toml; sem ele, a estação única de ECOWITT_MAC_ADDRESS) ---
+estacoes = carregar_estacoes()
+nomes_estacoes = {e["id"]: e["nome"] for e in estacoes}
+if len(estacoes) > 1:
+    estacao_sel = st.sidebar.selectbox("Estação", list(nomes_estacoes), format_func=nomes_estacoes.get, key="estacao_sel")
+else:
+    estacao_sel = estacoes[0]["id"]
+
+# Janela recente do histórico (uma por estação) mantida em memória e só acrescida quando chega leitura nova
+@st.cache_resource
+def obter_historico_df(estacao_id):
+    return HistoricoIncremental(historico, estacao_id, capacidade=int(ler_segredo("CAPACIDADE_JANELA_RECENTE", 50000)))
+
+historico_df = obter_historico_df(estacao_sel)
+
+# --- LÓGICA DA APLICAÇÃO STREAMLIT ---
+# Imagens estáticas decodificadas uma vez por processo; o arquivo vem do disco quando já foi baixado
+# alguma vez nesta máquina (ver recursos.py). Falhas também ficam em cache por uma hora, para uma
+# hospedagem fora do ar não travar cada recarga da página.
+@st.cache_resource(ttl=3600)
+def load_image_from_url(url):
+    try:
+        return carregar_imagem(url)
+    except Exception as e:
+        print(f"Erro ao carregar imagem de {url}: {e}")
+        return None
+
+url_logo = "https://i.postimg.cc/9F8T5vBk/Whats-App-Image-2025-05-20-at-19-33-48.jpg"
+
+# O logo só é carregado no fim do script: o espaço fica reservado e as leituras aparecem antes dele
+col_logo_main, col_title_main = st.columns([1, 6])
+espaco_logo = col_logo_main.empty()
+with col_title_main:
+    st.title("Estação Meteorológica BASE AGRO")
+    st.caption("Monitoramento de condições para pulverização agrícola eficiente e segura.")
+
+if 'last_update_time' not in st.session_state: st.session_state.last_update_time = datetime(1970,1,1,tzinfo=app_timezone)
+if 'dados_atuais' not in st.session_state: st.session_state.dados_atuais = {}
+
+INTERVALO_ATUALIZACAO_MINUTOS = 5
+PONTOS_MAX_GRAFICO = int(ler_segredo("PONTOS_MAX_GRAFICO", 800)) # Limite de pontos enviados ao navegador por gráfico
+
+# Origem das leituras: "api" consulta a nuvem Ecowitt pelo poller; "push" só recebe os envios do GW2000 na rede local
+FONTE_DADOS = ler_segredo("FONTE_DADOS", "api")
+
+# Motor de alertas do processo: o poller e a ingestão local entregam a ele cada leitura nova, mesmo sem ninguém
+# com a página aberta. Regras e notificadores (log, webhook em ALERTAS_WEBHOOK_URL) vêm dos segredos (ver alertas.py).
+@st.cache_resource
+def obter_motor_alertas():
+    return motor_alertas_configurado()
+
+motor_alertas = obter_motor_alertas()
+
+# Um único poller por processo do servidor, compartilhado por todas as sessões. O intervalo de cada estação
+# se adapta às leituras (ver agendador.py); os limites e o orçamento de requisições à API vêm dos segredos.
+@st.cache_resource
+def obter_poller():
+    agendador = AgendadorAdaptativo(
+        intervalo_base=INTERVALO_ATUALIZACAO_MINUTOS * 60,
+        intervalo_min=int(ler_segredo("INTERVALO_MINIMO_SEGUNDOS", 60)),
+        intervalo_max=int(ler_segredo("INTERVALO_MAXIMO_SEGUNDOS", 900)),
+        intervalo_ocioso=int(ler_segredo("INTERVALO_OCIOSO_SEGUNDOS", 900)),
+    )
+    return PollerEstacao(INTERVALO_ATUALIZACAO_MINUTOS * 60, app_timezone, historico=historico, estacoes=carregar_estacoes(),
+                         agendador=agendador, requisicoes_por_minuto=int(ler_segredo("ORCAMENTO_REQUISICOES_MINUTO", 30)),
+                         alertas=motor_alertas)
+
+poller = obter_poller() if FONTE_DADOS != "push" else None
+
+# Servidor de ingestão local, iniciado uma vez por processo quando PUSH_PORTA está configurada.
+# Escuta em 127.0.0.1, a não ser que PUSH_HOST diga outro endereço (ex.: "0.0.0.0" para o gateway na rede local).
+@st.cache_resource
+def obter_servidor_push(porta):
+    return iniciar_servidor_em_thread(historico, porta, caminho=ler_segredo("PUSH_CAMINHO", CAMINHO_PUSH_PADRAO),
+                                      estacao_por_passkey=mapa_passkeys(estacoes), alertas=motor_alertas,
+                                      host=ler_segredo("PUSH_HOST", HOST_PUSH_PADRAO))
+
+if ler_segredo("PUSH_PORTA"):
+    try: obter_servidor_push(int(ler_segredo("PUSH_PORTA")))
+    except OSError as e: st.error(f"Não foi possível iniciar a ingestão local na porta {ler_segredo('PUSH_PORTA')}: {e}")
+
+# Endpoint /metrics no formato do Prometheus, iniciado uma vez por processo quando METRICAS_PORTA está configurada.
+# Escuta em 127.0.0.1, a não ser que METRICAS_HOST diga outro endereço.
+@st.cache_resource
+def obter_servidor_metricas(porta):
+    return iniciar_servidor_metricas_em_thread(porta, host=ler_segredo("METRICAS_HOST", HOST_METRICAS_PADRAO))
+
+if ler_segredo("METRICAS_PORTA"):
+    try: obter_servidor_metricas(int(ler_segredo("METRICAS_PORTA")))
+    except OSError as e: st.error(f"Não foi possível iniciar o endpoint de métricas na porta {ler_segredo('METRICAS_PORTA')}: {e}")
+
+# Endpoint de exportação em fluxo (CSV/Parquet), iniciado uma vez por processo quando EXPORTACAO_PORTA está configurada.
+# Escuta em 127.0.0.1, a não ser que EXPORTACAO_HOST diga outro endereço (que então exige EXPORTACAO_TOKEN).
+@st.cache_resource
+def obter_servidor_exportacao(porta):
+    return iniciar_servidor_exportacao_em_thread(historico, porta, caminho=ler_segredo("EXPORTACAO_CAMINHO", CAMINHO_EXPORTACAO_PADRAO),
+                                                 estacoes_validas=list(nomes_estacoes), token=ler_segredo("EXPORTACAO_TOKEN"),
+                                                 host=ler_segredo("EXPORTACAO_HOST", HOST_EXPORTACAO_PADRAO))
+
+if ler_segredo("EXPORTACAO_PORTA"):
+    try: obter_servidor_exportacao(int(ler_segredo("EXPORTACAO_PORTA")))
+    except (OSError, ValueError) as e: st.error(f"Não foi possível iniciar o endpoint de exportação na porta {ler_segredo('EXPORTACAO_PORTA')}: {e}")
+
+@METRICAS.cronometrado("atualizar_dados_estacao")
+def atualizar_dados_estacao(estacao_id):
+    # A leitura mais recente vem do histórico, onde gravam tanto o poller quanto a ingestão local;
+    # se o histórico ainda estiver vazio, usa o último resultado do poller. Erros vêm do poller.
+    dados_completos, erros = None, None
+    if poller:
+        _, dados_completos, _, erros = poller.estado(estacao_id)
+    ultimos = historico.consultar(estacao=estacao_id, limite=1, decrescente=True)
+    if ultimos: dados_completos = ultimos[0]
+
+    if erros and dados_completos is not None:
+        # Já há uma leitura para mostrar: a falha da última consulta vira só um aviso, com a próxima tentativa
+        st.warning(f"Última consulta à API falhou ({'; '.join(erros)}). Exibindo a leitura anterior; "
+                   f"nova tentativa às {poller.proxima_consulta(estacao_id).strftime('%H:%M:%S')}.")
+    elif erros:
+        for erro in erros: st.error(erro)
+        st.warning("Não foi possível buscar dados reais da estação. Verifique as mensagens de erro acima.")
+    if dados_completos is None:
+        return False
+    if dados_completos.get("timestamp") == st.session_state.dados_atuais.get("timestamp") and st.session_state.get("estacao_dados") == estacao_id:
+        return not erros and dados_completos.get("delta_t_c") is not None
+
+    delta_t = dados_completos.get("delta_t_c")
+    desc_condicao = dados_completos.get("condition_description")
+    if delta_t is None and desc_condicao:
+        st.error(f"Falha no cálculo Delta T: {desc_condicao}")
+
+    st.session_state.dados_atuais = dados_completos
+    st.session_state.estacao_dados = estacao_id
+    st.session_state.last_update_time = datetime.fromisoformat(dados_completos["timestamp"])
+    return not erros and delta_t is not None
+
+# --- Interface Streamlit (com as alterações de layout solicitadas) ---
+
+# O painel ao vivo e o histórico são fragmentos: o painel se atualiza sozinho a cada INTERVALO_PAINEL_SEGUNDOS
+# sem recarregar a página, e mexer no período dos gráficos só reexecuta a seção de histórico.
+INTERVALO_PAINEL_SEGUNDOS = int(ler_segredo("INTERVALO_PAINEL_SEGUNDOS", 30))
+
+# Primeira busca do processo ainda em andamento e nada no histórico: a página sai na hora com um aviso no lugar do painel,
+# que volta a olhar a cada INTERVALO_CARREGANDO_SEGUNDOS; quando a leitura chega, a página inteira é refeita com ela.
+INTERVALO_CARREGANDO_SEGUNDOS = 2
+carregando = bool(poller and not poller.aguardar_estacao(estacao_sel, timeout=0)
+                  and not historico.consultar(estacao=estacao_sel, limite=1, decrescente=True))
+
+def forcar_atualizacao_manual():
+    st.session_state.resultado_atualizacao_manual = bool((poller is None or poller.forcar_atualizacao(estacao_id=estacao_sel))
+                                                         and atualizar_dados_estacao(estacao_sel))
+
+@st.fragment(run_every=timedelta(seconds=INTERVALO_CARREGANDO_SEGUNDOS if carregando else INTERVALO_PAINEL_SEGUNDOS))
+@METRICAS.cronometrado("painel_ao_vivo")
+def painel_ao_vivo():
+    if poller: # Estações sem ninguém olhando são consultadas com menos frequência
+        for estacao in (estacoes if len(estacoes) > 1 else [{"id": estacao_sel}]): poller.registrar_visualizacao(estacao["id"])
+    atualizar_dados_estacao(estacao_sel)
+    if carregando:
+        if st.session_state.dados_atuais or poller.aguardar_estacao(estacao_sel, timeout=0): st.rerun()
+        st.info("⏳ Buscando a primeira leitura da estação... o painel é preenchido assim que ela chegar.")
+        return
+
+    last_update_dt = st.session_state.last_update_time
+    last_update_str = last_update_dt.strftime('%d/%m/%Y %H:%M:%S') if last_update_dt.year > 1970 else 'Aguardando...'
+    proxima_str = f" · Próxima consulta à API: {poller.proxima_consulta(estacao_sel).strftime('%H:%M:%S')}" if poller else ""
+    st.caption(f"Última atualização: {last_update_str} (Horário Local: {APP_TIMEZONE_STR}){proxima_str}")
+    alertas_ativos = motor_alertas.alertas_ativos(estacao_sel) # Confirmados pelo motor (histerese e duração mínima)
+    if alertas_ativos:
+        st.warning("🔔 Alertas ativos: " + " · ".join(f"{regra}: {condicao}" for regra, condicao in alertas_ativos.items()))
+    st.markdown("---")
+
+    # Visão geral da frota: última leitura de cada estação com Delta T, vento e inversão térmica
+    if len(estacoes) > 1:
+        st.subheader("Visão Geral da Frota")
+        linhas_frota = []
+        for estacao in estacoes:
+            ultima = historico.consultar(estacao=estacao["id"], limite=1, decrescente=True)
+            d = ultima[0] if ultima else {}
+            vento = d.get('wind_speed_kmh')
+            linhas_frota.append({
+                "Estação": estacao["nome"],
+                "Atualizado": datetime.fromisoformat(d['timestamp']).strftime('%d/%m %H:%M') if d else "-",
+                "ΔT(°C)": d.get('delta_t_c'),
+                "Cond.ΔT": d.get('condition_text', "-"),
+                "Vento(km/h)": vento,
+                "Cond.Vento": classificar_vento(vento)[0] if vento is not None else "-",
+                "Inversão": avaliar_inversao(d.get('temperature_c'), d.get('temperature_superior_c'), vento)[0],
+                "Falha": "; ".join(poller.estado(estacao["id"])[3] or []) if poller else "",
+            })
+        st.dataframe(pd.DataFrame(linhas_frota), use_container_width=True, hide_index=True)
+        st.markdown("---")
+
+    st.subheader("Condições Atuais da Estação" + (f" — {nomes_estacoes[estacao_sel]}" if len(estacoes) > 1 else ""))
+    dados = st.session_state.dados_atuais
+    if dados: 
+        st.markdown("##### 🌡️ Temperatura e Umidade")
+        col_t1, col_t2 = st.columns(2)
+    
+        with col_t1:
+            # Temperatura do Wittboy (Superior) - agora é a principal e primeira
+            if dados.get('temperature_superior_c') is not None:
+                st.metric("Temperatura", 
+                          f"{dados.get('temperature_superior_c'):.1f} °C", 
+                          help="Temperatura do ar (sensor Wittboy - superior). Usada para cálculo do Delta T e derivados.")
+            else:
+                st.metric("Temperatura", "- °C", help="Temperatura do ar (sensor Wittboy - superior).")
+
+            # Ponto de Orvalho (calculado com base na Temp. Superior e Umidade do Wittboy)
+            st.metric("Ponto de Orvalho", 
+                      f"{dados.get('dew_point_c', '-'):.1f} °C" if dados.get('dew_point_c') is not None else "- °C")
+
+        with col_t2:
+            # Umidade Relativa do Wittboy (usada para Delta T)
+            st.metric("Umidade Relativa", 
+                      f"{dados.get('humidity_percent', '-'):.1f} %" if dados.get('humidity_percent') is not None else "- %",
+                      help="Umidade relativa (sensor Wittboy - superior).")
+        
+            # Sensação Térmica (calculada com base na Temp. Superior e Umidade do Wittboy)
+            st.metric("Sensação Térmica", 
+                      f"{dados.get('feels_like_c', '-'):.1f} °C" if dados.get('feels_like_c') is not None else "- °C")
+    
+        # A métrica "Temp. Ar (Inferior)" foi removida desta seção principal.
+        # Ela ainda está disponível em `dados.get('temperature_c')` para o Indicador de Inversão Térmica.
+        st.markdown("---")
+
+        # Delta T (baseado na Temp Superior)
+        dt_val = dados.get('delta_t_c')
+        dt_cond = dados.get('condition_text', '-')
+        dt_desc = dados.get('condition_description', 'Aguardando...')
+        dt_color_map = {"INADEQUADA": "#FFA500", "ARRISCADA": "#FF0000", "ADEQUADA": "#00CC66", "ATENÇÃO": "#FFA500"}
+        dt_bg = dt_color_map.get(dt_cond, "#F8D7DA" if "ERRO" in str(dt_cond).upper() else "lightgray")
+        dt_txt = "#FFFFFF" if dt_cond in dt_color_map else ("#721C24" if "ERRO" in str(dt_cond).upper() else "black")
+
+        st.markdown(f"<div style='text-align:center; margin-bottom:10px;'><span style='font-size:1.1em; font-weight:bold;'>Delta T (Base Temp. Sup.):</span><br><span style='font-size:2.2em; font-weight:bold; color:#007bff;'>{dt_val:.2f}°C</span></div>" if dt_val is not None else "<div style='text-align:center; margin-bottom:10px;'><span style='font-size:1.1em; font-weight:bold;'>Delta T:</span><br><span style='font-size:2.2em; font-weight:bold; color:gray;'>-</span></div>", unsafe_allow_html=True)
+        st.markdown(f"<div style='background-color:{dt_bg}; color:{dt_txt}; padding:10px; border-radius:5px; text-align:center; margin-bottom:5px;'><strong style='font-size:1.1em;'>Condição Delta T: {dt_cond}</strong></div><p style='text-align:center; font-size:0.85em; color:#555;'>{dt_desc}</p>", unsafe_allow_html=True)
+        st.markdown("---")
+
+        # Vento e Pressão
+        st.markdown("##### 💨 Vento e Pressão")
+        col_v1, col_v2 = st.columns(2)
+        vento_vel = dados.get('wind_speed_kmh', 0.0) if dados.get('wind_speed_kmh') is not None else 0.0
+        cond_v_txt, desc_v_txt, bg_v_col, txt_v_col = classificar_vento(vento_vel)
+        col_v1.metric("Vento Médio", f"{vento_vel:.1f} km/h")
+        col_v1.metric("Pressão", f"{dados.get('pressure_hpa', '-'):.1f} hPa" if dados.get('pressure_hpa') is not None else "-")
+        col_v2.metric("Rajadas", f"{dados.get('wind_gust_kmh', '-'):.1f} km/h" if dados.get('wind_gust_kmh') is not None else "-")
+        col_v2.metric("Direção Vento", f"{dados.get('wind_direction', '-')}")
+        st.markdown(f"<div style='background-color:{bg_v_col};color:{txt_v_col};padding:10px;border-radius:5px;text-align:center;margin-top:10px;margin-bottom:5px;'><strong style='font-size:1.1em'>Cond. Vento: {cond_v_txt}</strong></div><p style='text-align:center;font-size:0.85em;color:#555'>{desc_v_txt}</p>", unsafe_allow_html=True)
+        st.markdown("---")
+
+        # Indicador de Inversão Térmica com nomes completos
+        st.markdown("##### 🌡️ Indicador de Inversão Térmica")
+        t_inf, t_sup, v_inv = dados.get('temperature_c'), dados.get('temperature_superior_c'), dados.get('wind_speed_kmh')
+        inv_cols = st.columns(3)
+        inv_cols[0].metric("Temperatura Inferior", f"{t_inf:.1f}°C" if t_inf is not None else "N/D", help="Temperatura medida pelo GW2000 (base).")
+        inv_cols[1].metric("Temperatura Superior", f"{t_sup:.1f}°C" if t_sup is not None else "N/D", help="Temperatura medida pelo Wittboy (topo).")
+        inv_cols[2].metric("Vento Atual", f"{v_inv:.1f} km/h" if v_inv is not None else "N/D")
+
+        s_inv, d_inv, bg_inv_col, txt_inv_col = avaliar_inversao(t_inf, t_sup, v_inv)
+        st.markdown(f"<div style='background-color:{bg_inv_col};color:{txt_inv_col};padding:10px;border-radius:5px;text-align:center;margin-top:10px;margin-bottom:5px;'><strong style='font-size:1.1em'>{s_inv}</strong></div><p style='text-align:center;font-size:0.85em;color:#555'>{d_inv}</p>", unsafe_allow_html=True)
+        st.markdown("---")
+    else:
+        st.info("Aguardando dados da estação para exibir as condições atuais...")
+
+    # A busca roda no callback, antes do fragmento ser redesenhado, então o painel já sai com a leitura nova
+    st.button("🔄 Forçar Atualização Manual", help="Busca novos dados da estação Ecowitt.", on_click=forcar_atualizacao_manual)
+    resultado_manual = st.session_state.pop("resultado_atualizacao_manual", None)
+    if resultado_manual is True: st.success("Dados atualizados!")
+    elif resultado_manual is False: st.error("Falha ao buscar ou processar dados da estação.")
+
+    st.subheader("Gráfico Delta T de Referência")
+    # Zonas geradas pela mesma fórmula do cálculo (em cache no processo); só a leitura atual e a trajetória mudam a cada execução
+    opts_traj = {"Nenhuma": None, "3 H": 3, "6 H": 6, "12 H": 12, "24 H": 24}
+    sel_traj = st.radio("Trajetória:", list(opts_traj), index=2, horizontal=True, key="sel_traj_dt", help="Leituras das últimas horas desenhadas sobre o gráfico.")
+    trajetoria = None
+    if opts_traj[sel_traj] is not None:
+        trajetoria = preparar_trajetoria(historico_df.intervalo(datetime.now(app_timezone) - timedelta(hours=opts_traj[sel_traj])))
+    temp_plot = rh_plot = None
+    if dados:
+        temp_plot = dados.get("temperature_superior_c") if dados.get("delta_t_c") is not None else dados.get("temperature_c")
+        rh_plot = dados.get("humidity_percent")
+    st.vega_lite_chart(grafico_delta_t(temp_plot, rh_plot, trajetoria), use_container_width=True)
+    if temp_plot is not None and rh_plot is not None:
+        ts_atual_str = datetime.fromisoformat(dados['timestamp']).astimezone(app_timezone).strftime('%d/%m/%Y %H:%M:%S') if dados.get('timestamp') else "desconhecida"
+        st.caption(f"Ponto plotado para dados de: {ts_atual_str}")
+    else:
+        st.caption("Gráfico de referência (aguardando dados para ponto).")
+    st.markdown("---")
+
+@st.fragment(run_every=timedelta(minutes=INTERVALO_ATUALIZACAO_MINUTOS)) # Acompanha as leituras novas sem esperar interação
+@METRICAS.cronometrado("secao_historico")
+def secao_historico():
+    st.subheader("Histórico de Dados da Estação")
+    df_historico = historico_df.ultimos(10).reset_index()
+    if not df_historico.empty:
+        try:
+            st.markdown("##### Últimos Registros")
+            cols_hist = ['timestamp_dt', 'temperature_c', 'temperature_superior_c', 'humidity_percent', 'delta_t_c', 'condition_text', 'wind_speed_kmh']
+            df_display = df_historico[[col for col in cols_hist if col in df_historico.columns]].head(10).copy()
+            mapa_nomes = {'timestamp_dt': "Data/Hora",'temperature_c': "T.Inf(°C)",'temperature_superior_c': "T.Sup(°C)", 'humidity_percent': "UR(%)",'delta_t_c': "ΔT(°C)",'condition_text': "Cond.ΔT",'wind_speed_kmh': "Vento(km/h)"}
+            df_display.rename(columns=mapa_nomes, inplace=True)
+            if "Data/Hora" in df_display.columns:
+                df_display.loc[:, "Data/Hora"] = df_display["Data/Hora"].dt.strftime('%d/%m/%y %H:%M')
+            st.dataframe(df_display, use_container_width=True, hide_index=True)
+            st.markdown("---")
+
+            st.subheader("Tendências Recentes")
+            opts_int = {"1 H":1,"3 H":3,"12 H":12,"24 H":24,"3 D":72,"7 D":168,"Tudo":None}
+        
+            sel_int_label = st.radio("Intervalo Gráficos:", list(opts_int.keys())+["Custom"], horizontal=True, key="sel_int_graf")
+        
+            # O período escolhido vira uma consulta por intervalo no histórico: só as linhas dele são lidas
+            inicio_filt, fim_filt, periodo_valido = None, None, True
+            now_filt = datetime.now(app_timezone)
+
+            if sel_int_label == "Custom":
+                date_picker_cols = st.columns(2) 
+                if len(date_picker_cols) == 2:
+                    c_start, c_end = date_picker_cols
+                    min_hist_dt_val = (now_filt - timedelta(days=7)).date()
+                    primeiro_ts = historico.primeiro_timestamp(estacao_sel)
+                    if primeiro_ts is not None:
+                         min_hist_dt_val = primeiro_ts.date()
+                
+                    start_val = st.session_state.get('d_start_pick_val', min_hist_dt_val)
+                    end_val = st.session_state.get('d_end_pick_val', now_filt.date())
+
+                    d_start = c_start.date_input("Início", value=start_val, min_value=(now_filt - timedelta(days=730)).date(), max_value=now_filt.date(), key="d_start_pick_ui")
+                    if d_start: st.session_state.d_start_pick_val = d_start
+                
+                    if d_start and end_val < d_start: end_val = d_start
+                
+                    d_end = c_end.date_input("Fim", value=end_val, min_value=d_start if d_start else (now_filt - timedelta(days=730)).date(), max_value=now_filt.date(), key="d_end_pick_ui")
+                    if d_end: st.session_state.d_end_pick_val = d_end
+
+                    if d_start and d_end:
+                        inicio_filt = app_timezone.localize(datetime.combine(d_start, time.min)); fim_filt = app_timezone.localize(datetime.combine(d_end, time.max))
+                    else: periodo_valido = False
+                else:
+                    st.error("Falha interna: colunas para datas."); periodo_valido = False
+            else:
+                horas = opts_int.get(sel_int_label)
+                if horas is not None: inicio_filt = now_filt - timedelta(hours=horas)
+
+            with METRICAS.medir("historico_dataframe"):
+                df_chart_filt = historico_df.intervalo(inicio_filt, fim_filt) if periodo_valido else pd.DataFrame()
+        
+            if not df_chart_filt.empty:
+                with METRICAS.medir("graficos_altair"): # Montagem, redução e serialização dos gráficos
+                    # Resolução automática: 1 H e 3 H mostram as leituras brutas; os demais períodos são reduzidos no servidor
+                    # para no máximo PONTOS_MAX_GRAFICO pontos por gráfico (LTTB no Delta T, mín/média/máx nos demais)
+                    reduzir = sel_int_label not in ("1 H", "3 H")
+                    common_x = alt.X('timestamp_dt:T', title='Data/Hora', axis=alt.Axis(format='%d/%m %Hh'))
+                    tooltip_ts = alt.Tooltip('timestamp_dt:T', title='Data/Hora', format='%d/%m %H:%M')
+
+                    # O LTTB mantém leituras reais, então a cor e a condição de cada ponto continuam exatas
+                    df_dt = df_chart_filt[['delta_t_c', 'condition_text']].dropna(subset=['delta_t_c'])
+                    if reduzir: df_dt = reduzir_lttb(df_dt, 'delta_t_c', PONTOS_MAX_GRAFICO)
+                    # Cor de cada ponto pela faixa do seu valor de Delta T
+                    df_dt = df_dt.assign(cor_dt=np.select([(df_dt['delta_t_c']>=2) & (df_dt['delta_t_c']<=8), df_dt['delta_t_c']>10,
+                                                           ((df_dt['delta_t_c']>=0) & (df_dt['delta_t_c']<2)) | ((df_dt['delta_t_c']>8) & (df_dt['delta_t_c']<=10))],
+                                                          ['#00CC66', 'red', 'orange'], default='lightgray'))
+                    # A linha fica neutra e só os pontos são coloridos: um campo de cor na própria linha a quebraria em uma linha por cor
+                    base_dt = alt.Chart(df_dt.reset_index()).encode(x=common_x, y=alt.Y('delta_t_c:Q', title='ΔT (°C)'))
+                    delta_t_c_chart = (base_dt.mark_line(interpolate='monotone', color='gray') + base_dt.mark_circle(size=20, opacity=1).encode(
+                        color=alt.Color('cor_dt:N', scale=None),
+                        tooltip=[tooltip_ts, alt.Tooltip('delta_t_c:Q',title='ΔT(°C)',format='.2f'), alt.Tooltip('condition_text:N',title='Cond.ΔT')]
+                    )).properties(title='Tendência Delta T (base T.Superior)').interactive()
+                    st.altair_chart(delta_t_c_chart, use_container_width=True)
+                    if len(df_dt) < df_chart_filt['delta_t_c'].count():
+                        st.caption(f"Exibindo {len(df_dt)} de {df_chart_filt['delta_t_c'].count()} leituras (amostragem LTTB).")
+
+                    for col, title_chart, color_c in [('temperature_c','T.Inf.(°C)','royalblue'),('temperature_superior_c','T.Sup.(°C)','orangered'), ('humidity_percent','UR(%)','forestgreen'),('wind_speed_kmh','Vento(km/h)','slategray')]:
+                        if col in df_chart_filt.columns:
+                            if not reduzir or df_chart_filt[col].count() <= PONTOS_MAX_GRAFICO:
+                                chart = alt.Chart(df_chart_filt[[col]].dropna().reset_index()).mark_line(point=True, color=color_c).encode(
+                                    x=common_x, y=alt.Y(f'{col}:Q', title=title_chart), tooltip=[tooltip_ts, alt.Tooltip(f'{col}:Q', title=title_chart, format='.1f')]
+                                ).properties(title=f'Tendência {title_chart}').interactive()
+                            else: # Faixa mín–máx de cada balde com a média por cima
+                                df_agr = agregar_em_baldes(df_chart_filt, col, PONTOS_MAX_GRAFICO).reset_index()
+                                base = alt.Chart(df_agr).encode(x=common_x)
+                                faixa = base.mark_area(opacity=0.25, color=color_c).encode(y=alt.Y(f'{col}_min:Q', title=title_chart), y2=f'{col}_max:Q')
+                                media = base.mark_line(color=color_c).encode(
+                                    y=f'{col}:Q', tooltip=[tooltip_ts, alt.Tooltip(f'{col}_min:Q', title='Mín.', format='.1f'),
+                                                           alt.Tooltip(f'{col}:Q', title='Média', format='.1f'), alt.Tooltip(f'{col}_max:Q', title='Máx.', format='.1f')])
+                                chart = (faixa + media).properties(title=f'Tendência {title_chart} (mín/média/máx)').interactive()
+                            st.altair_chart(chart, use_container_width=True)
+            else: st.info("Sem dados históricos para o intervalo selecionado.")
+        except Exception as e_pd:
+            st.error(f"Erro ao formatar histórico ou gerar gráficos: {e_pd}")
+            import traceback
+            print(f"Pandas/Altair Error: {e_pd}\n{traceback.format_exc()}")
+    else: st.info("Nenhum histórico de dados encontrado.")
+
+# Sem o endpoint, o download sai pelo próprio Streamlit, que monta o arquivo inteiro na memória: só até este número de leituras
+LIMITE_EXPORTACAO_APP = int(ler_segredo("LIMITE_EXPORTACAO_APP", 200000))
+
+@st.fragment
+def secao_exportacao():
+    with st.expander("📥 Exportar histórico (CSV/Parquet)"):
+        hoje = datetime.now(app_timezone).date()
+        col_ini, col_fim, col_fmt = st.columns(3)
+        d_inicio = col_ini.date_input("Início", value=hoje - timedelta(days=30), max_value=hoje, key="exp_inicio")
+        d_fim = col_fim.date_input("Fim", value=hoje, min_value=d_inicio, max_value=hoje, key="exp_fim")
+        formato = col_fmt.radio("Formato", list(FORMATOS), format_func=str.upper, horizontal=True, key="exp_formato")
+        if len(estacoes) > 1:
+            estacoes_exp = st.multiselect("Estações", list(nomes_estacoes), default=[estacao_sel], format_func=nomes_estacoes.get, key="exp_estacoes")
+        else: estacoes_exp = [estacao_sel]
+        if not estacoes_exp:
+            st.info("Selecione ao menos uma estação."); return
+        arquivo = nome_arquivo(estacoes_exp, d_inicio, d_fim, formato)
+
+        # Link para o endpoint só com o endereço público configurado (o localhost do servidor não é o de quem abre a página),
+        # assinado para este pedido: o EXPORTACAO_TOKEN não aparece na página
+        if ler_segredo("EXPORTACAO_PORTA") and ler_segredo("EXPORTACAO_URL_PUBLICA"):
+            url_base = ler_segredo("EXPORTACAO_URL_PUBLICA") + ler_segredo("EXPORTACAO_CAMINHO", CAMINHO_EXPORTACAO_PADRAO)
+            st.link_button(f"Baixar {arquivo}", url_exportacao(url_base, estacoes_exp, d_inicio, d_fim, formato, ler_segredo("EXPORTACAO_TOKEN")))
+            if ler_segredo("EXPORTACAO_TOKEN"): st.caption(f"Link válido por {VALIDADE_LINK_PADRAO // 60} minutos.")
+            return
+        inicio_ts, fim_ts = limites_do_periodo(d_inicio, d_fim, app_timezone)
+        n_leituras = sum(historico.contar(fim_ts - 1, e, desde_ts=inicio_ts) for e in estacoes_exp)
+        if n_leituras > LIMITE_EXPORTACAO_APP:
+            st.warning(f"{n_leituras} leituras no período: acima de {LIMITE_EXPORTACAO_APP}, exporte pelo endpoint (EXPORTACAO_PORTA e EXPORTACAO_URL_PUBLICA) "
+                       "ou com `python exportacao.py`, que gravam em fluxo sem carregar o período inteiro.")
+            return
+        # Gerado só no clique, numa thread à parte
+        st.download_button(f"Baixar {arquivo} ({n_leituras} leituras)", file_name=arquivo, mime=FORMATOS[formato][0], on_click="ignore",
+                           data=lambda: b"".join(exportar(historico, estacoes_exp, inicio_ts, fim_ts, formato)))
+
+# Índice das janelas de aplicação, um por estação e por processo: montado uma vez a partir do histórico
+# e depois só acrescido das leituras novas
+@st.cache_resource
+def obter_indice_janelas(estacao_id):
+    return IndiceJanelas(historico, estacao_id)
+
+CORES_DELTA_T = {"INADEQUADA": "orange", "ADEQUADA": "#00CC66", "ATENÇÃO": "orange", "ARRISCADA": "red"}
+
+@st.fragment(run_every=timedelta(minutes=INTERVALO_ATUALIZACAO_MINUTOS))
+@METRICAS.cronometrado("secao_janelas")
+def secao_janelas():
+    st.markdown("---")
+    st.subheader("Janelas de Aplicação")
+    indice = obter_indice_janelas(estacao_sel)
+    with METRICAS.medir("janelas_atualizacao"): indice.atualizar()
+
+    opts_periodo = {"24 H": None, "7 D": 7, "30 D": 30, "90 D": 90}
+    sel_periodo = st.radio("Período:", list(opts_periodo), index=2, horizontal=True, key="sel_periodo_janelas")
+    agora = datetime.now(app_timezone)
+    dias = opts_periodo[sel_periodo]
+    # Períodos em dias começam à meia-noite local, para os totais por dia fecharem com os dias do gráfico
+    inicio = agora - timedelta(hours=24) if dias is None else (agora - timedelta(days=dias - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    resumo = indice.resumo(inicio, agora)
+    if resumo["coberto"] == 0:
+        st.info("Sem leituras suficientes no período para calcular as janelas de aplicação."); return
+    por_dia = lambda horas: horas / resumo["coberto"] * 24 # Normalizado pelas horas com dados (lacunas não contam como inadequadas)
+    maior = indice.mais_longa("apta", "SIM", inicio, agora)
+    duracao = (maior[1] - maior[0]) if maior else timedelta(0)
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("ΔT ADEQUADA", f"{por_dia(resumo['delta_t']['ADEQUADA']):.1f} h/dia")
+    col2.metric("Apta (ΔT + vento)", f"{por_dia(resumo['apta']['SIM']):.1f} h/dia",
+                help="Delta T ADEQUADA, vento EXCELENTE e sem inversão térmica ao mesmo tempo.")
+    col3.metric("Maior janela apta", f"{int(duracao.total_seconds() // 3600)}h{int(duracao.total_seconds() % 3600 // 60):02d}",
+                help=f"De {maior[0].strftime('%d/%m %H:%M')} a {maior[1].strftime('%d/%m %H:%M')}." if maior else None)
+    col4.metric("Madrugadas com inversão", f"{resumo['madrugadas_com_inversao']} de {resumo['madrugadas_com_dados']}",
+                help="Dias com inversão térmica (T.Sup > T.Inf e vento < 3 km/h) entre 3h e 7h.")
+    st.caption(f"Com dados em {resumo['coberto']:.0f} h do período.")
+
+    with METRICAS.medir("graficos_janelas"):
+        if dias is None: # 24 H: linha do tempo das condições de Delta T
+            df_seq = indice.sequencias("delta_t", inicio, agora)
+            chart = alt.Chart(df_seq).mark_bar().encode(
+                x=alt.X('inicio:T', title='Data/Hora', axis=alt.Axis(format='%d/%m %Hh')), x2='fim:T',
+                y=alt.Y('condicao:N', title=None, sort=list(CORES_DELTA_T)),
+                color=alt.Color('condicao:N', scale=alt.Scale(domain=list(CORES_DELTA_T), range=list(CORES_DELTA_T.values())), legend=None),
+                tooltip=[alt.Tooltip('condicao:N', title='Cond.ΔT'), alt.Tooltip('inicio:T', title='Início', format='%d/%m %H:%M'),
+                         alt.Tooltip('fim:T', title='Fim', format='%d/%m %H:%M')]
+            ).properties(title='Condição Delta T nas últimas 24 h')
+        else: # Horas por dia em cada condição de Delta T
+            df_dia = indice.por_dia("delta_t", inicio, agora).melt(id_vars="dia", var_name="condicao", value_name="horas")
+            chart = alt.Chart(df_dia).mark_bar().encode(
+                x=alt.X('dia:T', title='Dia', axis=alt.Axis(format='%d/%m')), y=alt.Y('horas:Q', title='Horas', stack=True),
+                color=alt.Color('condicao:N', title='Cond.ΔT', scale=alt.Scale(domain=list(CORES_DELTA_T), range=list(CORES_DELTA_T.values()))),
+                order=alt.Order('ordem:Q'),
+                tooltip=[alt.Tooltip('dia:T', title='Dia', format='%d/%m'), alt.Tooltip('condicao:N', title='Cond.ΔT'), alt.Tooltip('horas:Q', title='Horas', format='.1f')]
+            ).transform_calculate(ordem=f"indexof({list(CORES_DELTA_T)}, datum.condicao)").properties(title='Horas por dia em cada condição de Delta T')
+        st.altair_chart(chart, use_container_width=True)
+
+        df_perfil = pd.DataFrame({"hora": range(24), "apta": indice.perfil_horario("apta", "SIM", inicio, agora) * 100})
+        chart_perfil = alt.Chart(df_perfil.dropna()).mark_bar(color='#00CC66').encode(
+            x=alt.X('hora:O', title='Hora do dia'), y=alt.Y('apta:Q', title='% do tempo', scale=alt.Scale(domain=[0, 100])),
+            tooltip=[alt.Tooltip('hora:O', title='Hora'), alt.Tooltip('apta:Q', title='% apta', format='.0f')]
+        ).properties(title='Tempo apto para aplicação por hora do dia')
+        st.altair_chart(chart_perfil, use_container_width=True)
+
+painel_ao_vivo()
+secao_historico()
+secao_exportacao()
+secao_janelas()
+
+logo_pil = load_image_from_url(url_logo)
+if logo_pil: espaco_logo.image(logo_pil, width=100)
+
+st.markdown("---")
+st.markdown("""
+**Notas:**
+- **Delta T:** Calculado com a **Temperatura e Umidade do Sensor Superior** (WS90).
+- **Temperatura Inferior:** Medida pelo Gateway **GW2000**.
+- **Inversão Térmica:** Avaliada comparando T. Inferior, T. Superior e Vento.
+
+""")
+
+METRICAS.observar("execucao_script", py_time.perf_counter() - inicio_execucao)
+
+# Painel de depuração: PAINEL_DEPURACAO = true no secrets.toml ou ?debug=1 na URL
+if str(ler_segredo("PAINEL_DEPURACAO", "")).lower() in ("1", "true") or st.query_params.get("debug") == "1":
+    with st.expander("🛠️ Métricas de desempenho (deste processo do servidor)"):
+        etapas, contadores = METRICAS.resumo()
+        if etapas: st.dataframe(pd.DataFrame(etapas), use_container_width=True, hide_index=True,
+                                column_config={c: st.column_config.NumberColumn(format="%.1f") for c in ("média (ms)", "p50 (ms)", "p95 (ms)", "máx. (ms)")})
+        if contadores: st.dataframe(pd.DataFrame(contadores), use_container_width=True, hide_index=True)
+        st.caption("p50/p95 sobre as últimas 1000 medições de cada etapa. Os mesmos dados saem em /metrics quando METRICAS_PORTA está configurada.")
+
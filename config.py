@@ -0,0 +1,12 @@
+import streamlit as st
+
+# --- CONFIGURAÇÕES GERAIS ---
+APP_TIMEZONE_STR = "America/Sao_Paulo"
+
+# --- LEITURA DE CONFIGURAÇÕES (.streamlit/secrets.toml) ---
+# st.secrets.get levanta erro quando não existe nenhum secrets.toml; aqui isso vira o valor padrão.
+def ler_segredo(chave, padrao=None):
+    try:
+        return st.secrets.get(chave, padrao)
+    except Exception:
+        return padrao
@@ -0,0 +1,47 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+import pytz
+
+from calculos import CONDICOES_DELTA_T, TEXTO_CONDICAO_INVALIDA
+from historico import HistoricoEstacao
+
+TIMEZONE = pytz.timezone("America/Sao_Paulo")
+
+@pytest.fixture
+def historico(tmp_path):
+    return HistoricoEstacao(str(tmp_path / "historico.db"), TIMEZONE)
+
+# Leituras sintéticas no formato de salvar_lote (coluna `ts` + colunas do histórico): passo irregular em torno de 5 min,
+# lacunas logo abaixo e acima de 30 min e de horas, valores atravessando os limites de Delta T, vento e inversão, e NaN
+def leituras_aleatorias(inicio_ts, n, semente=0):
+    rng = np.random.default_rng(semente)
+    passos = rng.choice([300, 300, 300, 300, 60, 290, 1790, 1810, 2 * 3600], size=n)
+    ts = int(inicio_ts) + np.cumsum(passos) - passos[0]
+    delta_t = np.clip(6 + np.cumsum(rng.normal(0, 0.8, n)), 0, 14)
+    vento = np.abs(7 + np.cumsum(rng.normal(0, 1.5, n))) % 16
+    temp = 20 + 5 * np.sin(ts / 86400 * 2 * np.pi)
+    temp_superior = temp + rng.choice([-1.0, 0.0, 0.5, 1.0], size=n)
+    for valores in (delta_t, vento, temp_superior): valores[rng.random(n) < 0.03] = np.nan
+    return pd.DataFrame({
+        "ts": ts, "delta_t_c": delta_t.round(2), "wind_speed_kmh": vento.round(1), "temperature_c": temp.round(1),
+        "temperature_superior_c": temp_superior.round(1), "humidity_percent": rng.uniform(20, 95, n).round(0),
+        "condition_text": rng.choice(np.array(list(CONDICOES_DELTA_T) + [TEXTO_CONDICAO_INVALIDA, None], dtype=object), size=n),
+        "wind_direction": rng.choice(np.array(["N", "NE", "E", "SE", "S", "SW", "W", "NW", None], dtype=object), size=n),
+    })
+
+# Servidores HTTP locais dos testes (ingestão, APIs falsas, webhooks): porta escolhida pelo sistema e desligados ao
+# fim do teste. `em_thread=False` para os que já sobem a própria thread (ex.: criar_api_historico_falsa).
+@pytest.fixture
+def servidor_local():
+    servidores = []
+    def iniciar(servidor, caminho="", em_thread=True):
+        servidores.append(servidor)
+        if em_thread: threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{servidor.server_address[1]}{caminho}"
+    yield iniciar
+    for servidor in servidores:
+        servidor.shutdown()
+        servidor.server_close()
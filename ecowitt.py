@@ -0,0 +1,140 @@
+import streamlit as st
+import requests
+
+from calculos import calcular_delta_t_e_condicao
+from config import ler_segredo
+from metricas import METRICAS
+
+# Base da API v3; ECOWITT_API_URL permite apontar para um proxy ou para um servidor local de testes
+URL_API_PADRAO = "http://api.ecowitt.net/api/v3"
+
+# --- FUNÇÕES PARA BUSCAR DADOS REAIS DA ECOWITT (Sem alterações na lógica interna) ---
+def convert_deg_to_cardinal(deg):
+    if deg is None: return None
+    try:
+        deg = float(deg)
+        dirs = ["N", "NE", "E", "SE", "S", "SW", "W", "NW"] # 8 direções principais
+        ix = round(deg / 45) % 8
+        return dirs[ix]
+    except (ValueError, TypeError):
+        return None
+
+# Mapeamento dos blocos da API v3 (valores já em °C, hPa e km/h) para o formato do app. Usado pela
+# consulta em tempo real e, leitura a leitura, pelo backfill do histórico (backfill.py).
+def mapear_dados_ecowitt(device_data):
+    mapped_data = {
+        "temperature_c": None, "humidity_percent": None, "temperature_superior_c": None,
+        "wind_speed_kmh": None, "wind_gust_kmh": None, "pressure_hpa": None,
+        "wind_direction": None, "uv_index": None,
+        "solar_radiation_wm2": None, "luminosity_lux": None,
+    }
+
+    if "indoor" in device_data:
+        indoor_block = device_data["indoor"]
+        if "temperature" in indoor_block:
+            mapped_data["temperature_c"] = indoor_block["temperature"].get("value")
+    if "pressure" in device_data:
+        pressure_block = device_data["pressure"]
+        mapped_data["pressure_hpa"] = pressure_block.get("relative", {}).get("value")
+        if mapped_data["pressure_hpa"] is None:
+            mapped_data["pressure_hpa"] = pressure_block.get("absolute", {}).get("value")
+    if "outdoor" in device_data:
+        outdoor_block = device_data["outdoor"]
+        if "temperature" in outdoor_block:
+            mapped_data["temperature_superior_c"] = outdoor_block["temperature"].get("value")
+        if "humidity" in outdoor_block:
+            mapped_data["humidity_percent"] = outdoor_block["humidity"].get("value")
+    if "wind" in device_data:
+        wind_block = device_data["wind"]
+        if "wind_speed" in wind_block:
+            mapped_data["wind_speed_kmh"] = wind_block["wind_speed"].get("value")
+        if "wind_gust" in wind_block:
+            mapped_data["wind_gust_kmh"] = wind_block["wind_gust"].get("value")
+        if "wind_direction" in wind_block:
+            wind_dir_deg = wind_block["wind_direction"].get("value")
+            mapped_data["wind_direction"] = convert_deg_to_cardinal(wind_dir_deg)
+    if "solar_and_uvi" in device_data:
+        solar_uvi_block = device_data["solar_and_uvi"]
+        if "solar" in solar_uvi_block:
+            mapped_data["solar_radiation_wm2"] = solar_uvi_block["solar"].get("value")
+            if mapped_data["solar_radiation_wm2"] is not None:
+                try: mapped_data["luminosity_lux"] = float(str(mapped_data["solar_radiation_wm2"])) * 120
+                except: pass
+        if "uvi" in solar_uvi_block:
+            mapped_data["uv_index"] = solar_uvi_block["uvi"].get("value")
+
+    for key in mapped_data.keys():
+        if mapped_data.get(key) is not None:
+            try: mapped_data[key] = float(str(mapped_data[key]))
+            except (ValueError, TypeError):
+                if not isinstance(mapped_data[key], str): mapped_data[key] = None
+    return mapped_data
+
+# `reportar_erro` recebe as mensagens de erro. Fora da thread do Streamlit (poller em segundo plano)
+# st.error não tem onde renderizar, então quem chama passa um coletor próprio.
+# `mac_address` escolhe a estação (padrão: ECOWITT_MAC_ADDRESS); `sessao` permite reaproveitar conexões.
+# URL e chaves vêm do secrets.toml, mas podem ser passadas diretamente (ex.: benchmark.py, fora do Streamlit).
+@METRICAS.cronometrado("ecowitt_busca", resultado=lambda dados: "sucesso" if dados is not None else "falha")
+def fetch_real_ecowitt_data(reportar_erro=st.error, mac_address=None, sessao=None, timeout=15,
+                            api_url=None, api_key=None, app_key=None):
+    api_key = api_key or ler_segredo("ECOWITT_API_KEY")
+    app_key = app_key or ler_segredo("ECOWITT_APPLICATION_KEY")
+    mac_address = mac_address or ler_segredo("ECOWITT_MAC_ADDRESS")
+
+    if not all([api_key, app_key, mac_address]):
+        reportar_erro("Credenciais da API Ecowitt não configuradas em .streamlit/secrets.toml")
+        return None
+
+    params = {
+        "application_key": app_key, "api_key": api_key, "mac": mac_address,
+        "temp_unitid": "1", "pressure_unitid": "3",
+        "wind_speed_unitid": "7", "rainfall_unitid": "12", "call_back": "all",
+    }
+    api_url = (api_url or ler_segredo("ECOWITT_API_URL", URL_API_PADRAO)).rstrip("/") + "/device/real_time"
+
+    try:
+        response = (sessao or requests).get(api_url, params=params, timeout=timeout)
+        response.raise_for_status()
+        api_data = response.json()
+
+        if api_data.get("code") == 0 and "data" in api_data:
+            return mapear_dados_ecowitt(api_data["data"])
+        else:
+            reportar_erro(f"Erro da API Ecowitt: {api_data.get('msg', 'Resposta inválida')} (Código: {api_data.get('code', 'N/A')})")
+            return None
+    except requests.exceptions.RequestException as e:
+        reportar_erro(f"Erro de conexão com a API Ecowitt: {e}")
+        return None
+    except Exception as e:
+        reportar_erro(f"Erro crítico ao processar dados da API Ecowitt: {e}")
+        import traceback; print(f"Erro Crítico: {traceback.format_exc()}")
+        return None
+
+# --- MONTAGEM DO REGISTRO COMPLETO (dados da estação + Delta T e derivados) ---
+def montar_dados_completos(dados_ecowitt, now_app_tz):
+    temp_ar_inferior = dados_ecowitt.get("temperature_c") # Do GW2000
+    umid_rel = dados_ecowitt.get("humidity_percent")      # Do Wittboy (superior)
+    temp_ar_superior = dados_ecowitt.get("temperature_superior_c") # Do Wittboy
+
+    t_w, delta_t, condicao, desc_condicao, ponto_orvalho, sensacao_termica = \
+        calcular_delta_t_e_condicao(temp_ar_superior, umid_rel)
+
+    return {
+        "timestamp": now_app_tz.isoformat(),
+        "temperature_c": temp_ar_inferior,
+        "temperature_superior_c": temp_ar_superior,
+        "humidity_percent": umid_rel,
+        "wet_bulb_c": round(t_w, 2) if t_w is not None else None,
+        "delta_t_c": round(delta_t, 2) if delta_t is not None else None,
+        "condition_text": condicao if delta_t is not None else "ERRO CÁLCULO",
+        "condition_description": desc_condicao,
+        "dew_point_c": round(ponto_orvalho,1) if ponto_orvalho is not None else None,
+        "feels_like_c": round(sensacao_termica,1) if sensacao_termica is not None else None,
+        "wind_speed_kmh": dados_ecowitt.get("wind_speed_kmh"),
+        "wind_gust_kmh": dados_ecowitt.get("wind_gust_kmh"),
+        "wind_direction": dados_ecowitt.get("wind_direction"),
+        "pressure_hpa": dados_ecowitt.get("pressure_hpa"),
+        "uv_index": dados_ecowitt.get("uv_index"),
+        "solar_radiation_wm2": dados_ecowitt.get("solar_radiation_wm2"),
+        "luminosity_lux": dados_ecowitt.get("luminosity_lux"),
+    }
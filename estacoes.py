@@ -0,0 +1,31 @@
+from config import ler_segredo
+from historico import ESTACAO_PADRAO
+
+# --- REGISTRO DE ESTAÇÕES ---
+# Em .streamlit/secrets.toml, uma tabela por estação:
+#
+#   [[estacoes]]
+#   id = "fazenda-norte"
+#   nome = "Fazenda Norte"
+#   mac = "AA:BB:CC:DD:EE:FF"
+#   passkey = "..."   # opcional: PASSKEY dos envios locais (ingestao_push) desse gateway
+#   api_key = "..."   # opcionais: conta Ecowitt da estação, quando não é a de ECOWITT_API_KEY /
+#   app_key = "..."   # ECOWITT_APPLICATION_KEY (cada chave tem o seu orçamento de requisições no poller)
+#
+# Sem a lista, vale a estação única de ECOWITT_MAC_ADDRESS, com id ESTACAO_PADRAO.
+def carregar_estacoes():
+    estacoes = []
+    for item in ler_segredo("estacoes", None) or []:
+        estacoes.append({"id": str(item["id"]), "nome": item.get("nome", str(item["id"])),
+                         "mac": item.get("mac"), "passkey": item.get("passkey"),
+                         "api_key": item.get("api_key"), "app_key": item.get("app_key")})
+    if not estacoes:
+        estacoes.append({"id": ESTACAO_PADRAO, "nome": "Estação principal",
+                         "mac": ler_segredo("ECOWITT_MAC_ADDRESS"), "passkey": ler_segredo("ECOWITT_PASSKEY"),
+                         "api_key": None, "app_key": None})
+    return estacoes
+
+# PASSKEY -> id da estação, para os envios locais. Vazio quando nenhuma passkey foi configurada
+# (nesse caso a ingestão aceita qualquer gateway como a estação padrão).
+def mapa_passkeys(estacoes):
+    return {e["passkey"]: e["id"] for e in estacoes if e.get("passkey")}
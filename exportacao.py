@@ -0,0 +1,234 @@
+import argparse
+import hashlib
+import hmac
+import ipaddress
+import os
+import threading
+import time as py_time
+from datetime import date, datetime, time, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+import pytz
+
+from config import APP_TIMEZONE_STR, ler_segredo
+from estacoes import carregar_estacoes
+from historico import CAMINHO_PADRAO, COLUNAS_REAIS, COLUNAS_TEXTO, HistoricoEstacao
+from metricas import METRICAS
+
+# --- EXPORTAÇÃO DO HISTÓRICO (CSV ou Parquet, em fluxo) ---
+# As leituras do período são lidas em lotes (HistoricoEstacao.consultar_em_lotes, paginação pela chave) e cada lote é
+# convertido e entregue antes de ler o próximo: a memória fica no tamanho de um lote, seja um dia ou vários anos de
+# várias estações. O mesmo gerador de pedaços de bytes alimenta o endpoint HTTP (resposta chunked), a linha de comando
+# (direto para um arquivo) e o botão de download do app, que só vale para períodos pequenos: o Streamlit guarda o
+# arquivo inteiro na memória antes de enviá-lo.
+#   python exportacao.py --inicio 2024-01-01 --fim 2024-12-31 --formato parquet
+#   python exportacao.py --servir --porta 8083
+FORMATOS = {"csv": ("text/csv; charset=utf-8", "csv"), "parquet": ("application/vnd.apache.parquet", "parquet")}
+CAMINHO_EXPORTACAO_PADRAO = "/exportar"
+TAMANHO_LOTE_PADRAO = 20000
+
+# Datas locais (fim incluído) -> intervalo semiaberto [inicio_ts, fim_ts) em segundos epoch; None = sem limite
+def limites_do_periodo(inicio, fim, timezone):
+    inicio_ts = int(timezone.localize(datetime.combine(inicio, time.min)).timestamp()) if inicio else None
+    fim_ts = int(timezone.localize(datetime.combine(fim + timedelta(days=1), time.min)).timestamp()) if fim else None
+    return inicio_ts, fim_ts
+
+def nome_arquivo(estacoes, inicio, fim, formato):
+    periodo = "_".join(d.strftime("%Y%m%d") for d in (inicio, fim) if d) or "completo"
+    return f"historico_{'-'.join(estacoes)}_{periodo}.{FORMATOS[formato][1]}"
+
+def _lotes(historico, estacoes, inicio_ts, fim_ts, tamanho_lote):
+    for estacao in estacoes: # Uma estação depois da outra: cada uma segue a ordem da chave primária (estacao, ts)
+        for df in historico.consultar_em_lotes(inicio_ts, fim_ts, estacao, tamanho_lote):
+            df = df.reset_index().rename(columns={"timestamp_dt": "timestamp"})
+            df.insert(1, "estacao", estacao)
+            yield df
+
+# Destino dos escritores Arrow que só acumula o que foi escrito até o gerador entregar
+class _Escoadouro:
+    def __init__(self):
+        self._pedacos = []
+        self._posicao = 0
+        self.closed = False
+
+    def write(self, dados):
+        self._pedacos.append(bytes(dados))
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self): return self._posicao
+    def flush(self): pass
+    def close(self): self.closed = True
+
+    def esvaziar(self):
+        dados = b"".join(self._pedacos)
+        self._pedacos.clear()
+        return dados
+
+# Esquema fixo (também o do CSV): um lote com uma coluna de texto toda vazia não pode virar outro tipo no meio do arquivo
+def esquema_parquet(timezone):
+    return pa.schema([("timestamp", pa.timestamp("s", tz=str(timezone))), ("estacao", pa.string())]
+                     + [(c, pa.float64()) for c in COLUNAS_REAIS] + [(c, pa.string()) for c in COLUNAS_TEXTO])
+
+# Os dois formatos passam pelo mesmo esquema Arrow e por escritores em C++ (o to_csv do pandas, formatando
+# float por float em Python, é várias vezes mais lento); no Parquet cada lote vira um row group e o rodapé
+# (metadados) sai no último pedaço
+def _gerar(criar_escritor, formato, historico, estacoes, inicio_ts, fim_ts, tamanho_lote):
+    escoadouro = _Escoadouro()
+    esquema = esquema_parquet(historico.timezone)
+    with criar_escritor(escoadouro, esquema) as escritor:
+        for df in _lotes(historico, estacoes, inicio_ts, fim_ts, tamanho_lote):
+            escritor.write_table(pa.Table.from_pandas(df, schema=esquema, preserve_index=False))
+            METRICAS.contar("exportacao_linhas_total", len(df), formato=formato)
+            yield escoadouro.esvaziar()
+    yield escoadouro.esvaziar()
+
+def gerar_csv(historico, estacoes, inicio_ts=None, fim_ts=None, tamanho_lote=TAMANHO_LOTE_PADRAO):
+    yield "\ufeff".encode("utf-8") # BOM: o Excel abre os acentos corretamente
+    yield from _gerar(pacsv.CSVWriter, "csv", historico, estacoes, inicio_ts, fim_ts, tamanho_lote)
+
+def gerar_parquet(historico, estacoes, inicio_ts=None, fim_ts=None, tamanho_lote=TAMANHO_LOTE_PADRAO):
+    yield from _gerar(lambda destino, esquema: pq.ParquetWriter(destino, esquema, compression="zstd"), "parquet",
+                      historico, estacoes, inicio_ts, fim_ts, tamanho_lote)
+
+def exportar(historico, estacoes, inicio_ts=None, fim_ts=None, formato="csv", tamanho_lote=TAMANHO_LOTE_PADRAO):
+    gerador = gerar_parquet if formato == "parquet" else gerar_csv
+    return gerador(historico, estacoes, inicio_ts, fim_ts, tamanho_lote)
+
+# --- LINKS ASSINADOS ---
+# O token do endpoint nunca vai para a página: o app entrega um link com a assinatura HMAC (chave = EXPORTACAO_TOKEN)
+# daquele pedido (estações, período, formato) e do seu vencimento. Quem vê o link só baixa aquele período, e só até
+# ele vencer; trocar qualquer parâmetro invalida a assinatura. O token puro (?token=...) continua valendo para scripts.
+VALIDADE_LINK_PADRAO = 15 * 60
+
+def _mensagem_assinada(pares):
+    return urlencode(sorted((chave, valor) for chave, valor in pares if chave not in ("token", "assinatura"))).encode("utf-8")
+
+def assinar(token, pares):
+    return hmac.new(token.encode("utf-8"), _mensagem_assinada(pares), hashlib.sha256).hexdigest()
+
+def pedido_autorizado(params, token, agora=None):
+    if hmac.compare_digest(params.get("token", [""])[0].encode("utf-8"), token.encode("utf-8")): return True
+    expira = params.get("expira", [""])[0]
+    if not expira.isdigit() or int(expira) < (py_time.time() if agora is None else agora): return False
+    pares = [(chave, valor) for chave, valores in params.items() for valor in valores]
+    return hmac.compare_digest(params.get("assinatura", [""])[0].encode("utf-8"), assinar(token, pares).encode("utf-8"))
+
+def url_exportacao(url_base, estacoes, inicio, fim, formato, token=None, validade=VALIDADE_LINK_PADRAO, agora=None):
+    params = [("estacao", e) for e in estacoes] + [("formato", formato)]
+    params += [(chave, d.isoformat()) for chave, d in (("inicio", inicio), ("fim", fim)) if d]
+    if token:
+        params.append(("expira", str(int(py_time.time() if agora is None else agora) + validade)))
+        params.append(("assinatura", assinar(token, params)))
+    return f"{url_base}?{urlencode(params)}"
+
+# Parâmetros da URL -> (estações, inicio, fim, formato); ValueError com a mensagem para o cliente
+def interpretar_pedido(params, estacoes_validas=None):
+    estacoes = [e for valor in params.get("estacao", []) for e in valor.split(",") if e]
+    if not estacoes: raise ValueError("Informe ao menos uma estação (?estacao=...).")
+    desconhecidas = [e for e in estacoes if estacoes_validas is not None and e not in estacoes_validas]
+    if desconhecidas: raise ValueError(f"Estação desconhecida: {', '.join(desconhecidas)}.")
+    formato = params.get("formato", ["csv"])[0]
+    if formato not in FORMATOS: raise ValueError(f"Formato inválido: {formato} (use csv ou parquet).")
+    try:
+        inicio, fim = (date.fromisoformat(params[chave][0]) if chave in params else None for chave in ("inicio", "fim"))
+    except ValueError:
+        raise ValueError("Datas no formato AAAA-MM-DD.")
+    if inicio and fim and fim < inicio: raise ValueError("O fim do período é anterior ao início.")
+    return estacoes, inicio, fim, formato
+
+# --- ENDPOINT DE EXPORTAÇÃO (download em fluxo, sem passar pela memória do Streamlit) ---
+# GET <caminho>?estacao=a&estacao=b&inicio=2024-01-01&fim=2024-12-31&formato=parquet[&token=... | &expira=...&assinatura=...]
+# Escuta só em 127.0.0.1 por padrão (atrás de um proxy reverso). Outro endereço precisa ser configurado explicitamente
+# (EXPORTACAO_HOST / --host) e exige EXPORTACAO_TOKEN: o endpoint entrega o histórico inteiro de qualquer estação.
+HOST_EXPORTACAO_PADRAO = "127.0.0.1"
+
+def endereco_local(host):
+    if host == "localhost": return True
+    try: return ipaddress.ip_address(host).is_loopback
+    except ValueError: return False # Nome de máquina ou interface: tratado como exposto
+
+def criar_servidor_exportacao(historico, porta, host=HOST_EXPORTACAO_PADRAO, caminho=CAMINHO_EXPORTACAO_PADRAO, estacoes_validas=None, token=None,
+                              tamanho_lote=TAMANHO_LOTE_PADRAO):
+    if not token and not endereco_local(host):
+        raise ValueError(f"O endpoint de exportação em {host} exige um token (EXPORTACAO_TOKEN).")
+    class ManipuladorExportacao(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # Necessário para Transfer-Encoding: chunked
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path.rstrip("/") != caminho.rstrip("/"):
+                self.send_error(404); return
+            params = parse_qs(url.query)
+            if token and not pedido_autorizado(params, token):
+                self.send_error(403, "Token ou assinatura inválidos"); return
+            try:
+                estacoes, inicio, fim, formato = interpretar_pedido(params, estacoes_validas)
+            except ValueError as e:
+                self.send_error(400, str(e)); return
+            inicio_ts, fim_ts = limites_do_periodo(inicio, fim, historico.timezone)
+            self.send_response(200)
+            self.send_header("Content-Type", FORMATOS[formato][0])
+            self.send_header("Content-Disposition", f'attachment; filename="{nome_arquivo(estacoes, inicio, fim, formato)}"')
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                with METRICAS.medir("exportacao", formato=formato):
+                    for pedaco in exportar(historico, estacoes, inicio_ts, fim_ts, formato, tamanho_lote):
+                        if pedaco: self.wfile.write(f"{len(pedaco):X}\r\n".encode("ascii") + pedaco + b"\r\n")
+                    self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError): # Download cancelado pelo navegador
+                self.close_connection = True
+            except Exception as e: # O status 200 já foi enviado: só resta interromper a resposta
+                print(f"Erro durante a exportação: {e}")
+                self.close_connection = True
+
+        def log_message(self, formato, *args): pass
+
+    return ThreadingHTTPServer((host, porta), ManipuladorExportacao)
+
+def iniciar_servidor_exportacao_em_thread(historico, porta, **kwargs):
+    servidor = criar_servidor_exportacao(historico, porta, **kwargs)
+    threading.Thread(target=servidor.serve_forever, name="exportacao", daemon=True).start()
+    return servidor
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta o histórico de leituras para CSV ou Parquet, em lotes.")
+    parser.add_argument("--estacao", action="append", help="Id da estação (repita para várias; padrão: todas)")
+    parser.add_argument("--inicio", type=date.fromisoformat, help="Primeiro dia (AAAA-MM-DD, horário local)")
+    parser.add_argument("--fim", type=date.fromisoformat, help="Último dia, incluído")
+    parser.add_argument("--formato", choices=list(FORMATOS), default="csv")
+    parser.add_argument("--saida", help="Arquivo de saída (padrão: nome gerado na pasta atual)")
+    parser.add_argument("--banco", default=ler_segredo("HISTORICO_DB_PATH", CAMINHO_PADRAO))
+    parser.add_argument("--tamanho-lote", type=int, default=TAMANHO_LOTE_PADRAO)
+    parser.add_argument("--servir", action="store_true", help="Em vez de exportar, atende downloads em HTTP")
+    parser.add_argument("--porta", type=int, default=int(ler_segredo("EXPORTACAO_PORTA", 8083)))
+    parser.add_argument("--host", default=ler_segredo("EXPORTACAO_HOST", HOST_EXPORTACAO_PADRAO),
+                        help="Endereço de escuta (padrão: 127.0.0.1; fora do loopback exige EXPORTACAO_TOKEN)")
+    args = parser.parse_args()
+
+    historico = HistoricoEstacao(args.banco, pytz.timezone(APP_TIMEZONE_STR))
+    ids_estacoes = [e["id"] for e in carregar_estacoes()]
+    if args.servir:
+        try:
+            servidor = criar_servidor_exportacao(historico, args.porta, host=args.host, estacoes_validas=ids_estacoes,
+                                                 token=ler_segredo("EXPORTACAO_TOKEN"), tamanho_lote=args.tamanho_lote)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"Exportação disponível em http://{args.host}:{args.porta}{CAMINHO_EXPORTACAO_PADRAO}")
+        servidor.serve_forever()
+    else:
+        estacoes = args.estacao or ids_estacoes
+        saida = args.saida or nome_arquivo(estacoes, args.inicio, args.fim, args.formato)
+        inicio_ts, fim_ts = limites_do_periodo(args.inicio, args.fim, historico.timezone)
+        tamanho = 0
+        with open(saida + ".parcial", "wb") as f:
+            for pedaco in exportar(historico, estacoes, inicio_ts, fim_ts, args.formato, args.tamanho_lote):
+                f.write(pedaco)
+                tamanho += len(pedaco)
+        os.replace(saida + ".parcial", saida)
+        print(f"{saida}: {tamanho / 1e6:.1f} MB")
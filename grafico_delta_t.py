@@ -0,0 +1,109 @@
+from functools import lru_cache
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from amostragem import reduzir_lttb
+from calculos import CONDICOES_DELTA_T, calcular_delta_t_lote
+from metricas import METRICAS
+
+# --- GRÁFICO DELTA T DE REFERÊNCIA (mapa de zonas gerado pela fórmula de Stull + leituras por cima) ---
+# As zonas (temperatura 0–50 °C × UR 10–100 %) saem de uma grade calculada uma única vez por processo com o
+# mesmo calcular_delta_t_lote das leituras, então a fronteira desenhada é exatamente a usada na classificação.
+# Para cada temperatura o Delta T só cai com a umidade, e cada zona vira uma faixa [UR mínima, UR máxima]:
+# poucas centenas de linhas no lugar de uma imagem, e o gráfico pode ser redimensionado e ampliado.
+# A leitura atual e a trajetória das últimas horas são uma camada leve montada a cada exibição.
+FAIXA_TEMPERATURA = (0.0, 50.0)
+FAIXA_UMIDADE = (10.0, 100.0)
+LIMITES_DELTA_T = (2.0, 8.0, 10.0)
+CORES_ZONAS = {"INADEQUADA": "orange", "ADEQUADA": "#00CC66", "ATENÇÃO": "orange", "ARRISCADA": "red"}
+MAX_PONTOS_TRAJETORIA = 200
+
+# UR em que o Delta T atinge cada limite, por temperatura (np.interp já satura nas bordas da faixa de umidade)
+@lru_cache(maxsize=4)
+def fronteiras_delta_t(passo_temp=0.5, passo_umid=0.1):
+    temperaturas = np.arange(FAIXA_TEMPERATURA[0], FAIXA_TEMPERATURA[1] + passo_temp / 2, passo_temp)
+    umidades = np.arange(FAIXA_UMIDADE[0], FAIXA_UMIDADE[1] + passo_umid / 2, passo_umid)
+    t, rh = np.meshgrid(temperaturas, umidades, indexing="ij")
+    delta_t = calcular_delta_t_lote(t, rh)["delta_t_c"]
+    fronteiras = pd.DataFrame({"temperatura": temperaturas})
+    for limite in LIMITES_DELTA_T: # Colunas com o Delta T crescente, como o np.interp exige
+        fronteiras[f"ur_{limite:g}"] = [np.interp(limite, linha[::-1], umidades[::-1]) for linha in delta_t]
+    return fronteiras
+
+# Faixas de cada condição, da umidade mais alta (Delta T baixo) para a mais baixa
+@lru_cache(maxsize=4)
+def zonas_delta_t(passo_temp=0.5, passo_umid=0.1):
+    f = fronteiras_delta_t(passo_temp, passo_umid)
+    faixas = {"INADEQUADA": (f["ur_2"], FAIXA_UMIDADE[1]), "ADEQUADA": (f["ur_8"], f["ur_2"]),
+              "ATENÇÃO": (f["ur_10"], f["ur_8"]), "ARRISCADA": (FAIXA_UMIDADE[0], f["ur_10"])}
+    return pd.concat([pd.DataFrame({"temperatura": f["temperatura"], "ur_min": ur_min, "ur_max": ur_max, "condicao": condicao})
+                      for condicao, (ur_min, ur_max) in faixas.items()], ignore_index=True)
+
+EIXO_TEMPERATURA = alt.X("temperatura:Q", title="Temperatura (°C)", scale=alt.Scale(domain=list(FAIXA_TEMPERATURA), nice=False))
+ESCALA_UMIDADE = alt.Scale(domain=list(FAIXA_UMIDADE), nice=False)
+EIXO_UMIDADE = alt.Y("umidade:Q", title="Umidade Relativa (%)", scale=ESCALA_UMIDADE)
+
+# Camada fixa: faixas coloridas e as linhas de Delta T 2, 8 e 10 °C. O Altair monta e valida a especificação uma única vez;
+# o que fica em cache é o dicionário Vega-Lite pronto (com os dados em `datasets`), e cada exibição só acrescenta as
+# camadas da trajetória e da leitura atual como dicionários simples, sem passar de novo pelo Altair.
+@lru_cache(maxsize=1)
+def grafico_zonas():
+    linhas_df = fronteiras_delta_t().melt(id_vars="temperatura", var_name="limite", value_name="umidade")
+    linhas_df["limite"] = "ΔT " + linhas_df["limite"].str.removeprefix("ur_") + " °C"
+    faixas = alt.Chart(alt.NamedData("zonas_delta_t")).mark_area(opacity=0.45, interpolate="monotone").encode(
+        x=EIXO_TEMPERATURA, y=alt.Y("ur_min:Q", title="Umidade Relativa (%)", scale=ESCALA_UMIDADE), y2="ur_max:Q",
+        color=alt.Color("condicao:N", title="Cond.ΔT", scale=alt.Scale(domain=list(CONDICOES_DELTA_T), range=[CORES_ZONAS[c] for c in CONDICOES_DELTA_T])),
+        tooltip=[alt.Tooltip("condicao:N", title="Cond.ΔT")])
+    linhas = alt.Chart(alt.NamedData("limites_delta_t")).mark_line(color="dimgray", strokeWidth=1, interpolate="monotone").encode(
+        x=EIXO_TEMPERATURA, y=EIXO_UMIDADE, detail="limite:N", tooltip=[alt.Tooltip("limite:N", title="Limite")])
+    especificacao = alt.layer(faixas, linhas).properties(height=420).interactive().to_dict() # O zoom (params) fica na 1ª camada
+    especificacao["datasets"] = {"zonas_delta_t": zonas_delta_t().to_dict("records"), "limites_delta_t": linhas_df.to_dict("records")}
+    return especificacao
+
+# Codificações das camadas montadas a cada exibição (dicionários Vega-Lite, os mesmos eixos das zonas)
+X_VL = EIXO_TEMPERATURA.to_dict()
+Y_VL = EIXO_UMIDADE.to_dict()
+TOOLTIP_PONTO_VL = [{"field": "temperatura", "type": "quantitative", "title": "Temp.(°C)", "format": ".1f"},
+                    {"field": "umidade", "type": "quantitative", "title": "UR(%)", "format": ".0f"}]
+
+# Últimas leituras do histórico (índice DatetimeIndex) -> pontos da trajetória, no máximo `max_pontos` leituras reais
+def preparar_trajetoria(df, coluna_temp="temperature_superior_c", coluna_umid="humidity_percent", max_pontos=MAX_PONTOS_TRAJETORIA):
+    if df is None or df.empty or coluna_temp not in df.columns or coluna_umid not in df.columns: return pd.DataFrame()
+    df = df[[coluna_temp, coluna_umid, "delta_t_c", "condition_text"]].dropna(subset=[coluna_temp, coluna_umid, "delta_t_c"])
+    df = df[df[coluna_temp].between(*FAIXA_TEMPERATURA)]
+    df = reduzir_lttb(df, "delta_t_c", max_pontos) # Mantém os picos de Delta T
+    if df.empty: return pd.DataFrame()
+    trajetoria = pd.DataFrame({"timestamp_dt": df.index, "temperatura": df[coluna_temp].to_numpy(),
+                               "umidade": df[coluna_umid].clip(*FAIXA_UMIDADE).to_numpy(),
+                               "delta_t_c": df["delta_t_c"].to_numpy(), "condition_text": df["condition_text"].to_numpy()})
+    trajetoria["recencia"] = np.linspace(0.15, 1.0, len(trajetoria)) # Opacidade: as leituras mais antigas esmaecem
+    return trajetoria
+
+# Especificação Vega-Lite completa (para st.vega_lite_chart): zonas em cache + trajetória (opcional) + leitura atual.
+# Só o primeiro nível é novo a cada chamada; camadas e dados das zonas são compartilhados com o cache e não são alterados.
+def grafico_delta_t(temperatura, umidade, trajetoria=None, rotulo_atual="Leitura atual"):
+    with METRICAS.medir("grafico_referencia"):
+        base = grafico_zonas()
+        camadas, dados = list(base["layer"]), dict(base["datasets"])
+        if trajetoria is not None and not trajetoria.empty:
+            registros = trajetoria.assign(timestamp_dt=[ts.isoformat() for ts in trajetoria["timestamp_dt"]]).to_dict("records")
+            dados["trajetoria_delta_t"] = registros
+            ordem = {"field": "timestamp_dt", "type": "temporal"}
+            camadas.append({"data": {"name": "trajetoria_delta_t"}, "mark": {"type": "line", "color": "black", "strokeWidth": 1, "opacity": 0.4},
+                            "encoding": {"x": X_VL, "y": Y_VL, "order": ordem}})
+            camadas.append({"data": {"name": "trajetoria_delta_t"}, "mark": {"type": "circle", "color": "black", "size": 18},
+                            "encoding": {"x": X_VL, "y": Y_VL, "order": ordem,
+                                         "opacity": {"field": "recencia", "type": "quantitative", "scale": None},
+                                         "tooltip": [{"field": "timestamp_dt", "type": "temporal", "title": "Data/Hora", "format": "%d/%m %H:%M"}]
+                                                    + TOOLTIP_PONTO_VL
+                                                    + [{"field": "delta_t_c", "type": "quantitative", "title": "ΔT(°C)", "format": ".2f"},
+                                                       {"field": "condition_text", "type": "nominal", "title": "Cond.ΔT"}]}})
+        if temperatura is not None and umidade is not None and FAIXA_TEMPERATURA[0] <= temperatura <= FAIXA_TEMPERATURA[1]:
+            dados["leitura_atual"] = [{"temperatura": float(temperatura), "umidade": float(min(max(umidade, FAIXA_UMIDADE[0]), FAIXA_UMIDADE[1])),
+                                       "rotulo": rotulo_atual}]
+            camadas.append({"data": {"name": "leitura_atual"},
+                            "mark": {"type": "point", "shape": "circle", "filled": True, "size": 220, "color": "red", "stroke": "black", "strokeWidth": 1.5, "opacity": 1},
+                            "encoding": {"x": X_VL, "y": Y_VL, "tooltip": [{"field": "rotulo", "type": "nominal", "title": "Ponto"}] + TOOLTIP_PONTO_VL}})
+        return {**base, "layer": camadas, "datasets": dados}
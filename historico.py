@@ -0,0 +1,217 @@
+import math
+import os
+import sqlite3
+import threading
+import time as py_time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from buffer_leituras import BufferLeituras
+from calculos import calcular_delta_t_dataframe
+
+# --- HISTÓRICO PERSISTENTE (SQLite em modo WAL, compartilhado entre sessões e processos) ---
+# Uma linha por leitura, chave primária (estacao, ts) com ts em segundos epoch: a tabela fica
+# ordenada por estação e tempo (WITHOUT ROWID), então uma consulta por intervalo lê só as linhas dele.
+ESTACAO_PADRAO = "principal"
+CAMINHO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados", "historico.sqlite3")
+
+COLUNAS_REAIS = [
+    "temperature_c", "temperature_superior_c", "humidity_percent", "wet_bulb_c", "delta_t_c",
+    "dew_point_c", "feels_like_c", "wind_speed_kmh", "wind_gust_kmh", "pressure_hpa",
+    "uv_index", "solar_radiation_wm2", "luminosity_lux",
+]
+COLUNAS_TEXTO = ["condition_text", "condition_description", "wind_direction"]
+COLUNAS_DADOS = COLUNAS_REAIS + COLUNAS_TEXTO
+
+class HistoricoEstacao:
+    def __init__(self, caminho, timezone):
+        self.caminho = caminho
+        self.timezone = timezone
+        self._local = threading.local() # Conexões sqlite3 não podem ser usadas por várias threads
+        pasta = os.path.dirname(caminho)
+        if pasta: os.makedirs(pasta, exist_ok=True)
+        colunas_sql = ", ".join([f"{c} REAL" for c in COLUNAS_REAIS] + [f"{c} TEXT" for c in COLUNAS_TEXTO])
+        with self._conexao() as conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS leituras (estacao TEXT NOT NULL, ts INTEGER NOT NULL, {colunas_sql}, "
+                         "PRIMARY KEY (estacao, ts)) WITHOUT ROWID")
+
+    def _conexao(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.caminho, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def salvar(self, registro, estacao=ESTACAO_PADRAO):
+        ts = int(datetime.fromisoformat(registro["timestamp"]).timestamp())
+        valores = [estacao, ts] + [registro.get(c) for c in COLUNAS_DADOS]
+        marcadores = ", ".join("?" * len(valores))
+        with self._conexao() as conn: # INSERT OR REPLACE: regravar a mesma leitura não duplica linhas
+            conn.execute(f"INSERT OR REPLACE INTO leituras (estacao, ts, {', '.join(COLUNAS_DADOS)}) VALUES ({marcadores})", valores)
+
+    # Gravação em lote (backfill): DataFrame com a coluna `ts` (segundos epoch) e as colunas de COLUNAS_DADOS
+    # que existirem; as ausentes e os NaN viram NULL. Uma transação e um executemany por chamada.
+    def salvar_lote(self, df, estacao=ESTACAO_PADRAO):
+        if df.empty: return 0
+        dados = df.reindex(columns=COLUNAS_DADOS).astype(object)
+        dados = dados.where(dados.notna(), None)
+        linhas = zip([estacao] * len(df), df["ts"].astype("int64").tolist(), *(dados[c].tolist() for c in COLUNAS_DADOS))
+        marcadores = ", ".join("?" * (len(COLUNAS_DADOS) + 2))
+        with self._conexao() as conn:
+            conn.executemany(f"INSERT OR REPLACE INTO leituras (estacao, ts, {', '.join(COLUNAS_DADOS)}) VALUES ({marcadores})", linhas)
+        return len(df)
+
+    # Instantes (segundos epoch) já gravados em [inicio_ts, fim_ts), sem ler as demais colunas
+    def timestamps(self, inicio_ts, fim_ts, estacao=ESTACAO_PADRAO):
+        linhas = self._conexao().execute("SELECT ts FROM leituras WHERE estacao = ? AND ts >= ? AND ts < ? ORDER BY ts",
+                                         (estacao, int(inicio_ts), int(fim_ts))).fetchall()
+        return [linha[0] for linha in linhas]
+
+    def consultar(self, inicio=None, fim=None, estacao=ESTACAO_PADRAO, limite=None, decrescente=False):
+        sql = f"SELECT ts, {', '.join(COLUNAS_DADOS)} FROM leituras WHERE estacao = ?"
+        params = [estacao]
+        if inicio is not None: sql += " AND ts >= ?"; params.append(int(inicio.timestamp()))
+        if fim is not None: sql += " AND ts <= ?"; params.append(int(fim.timestamp()))
+        sql += " ORDER BY ts DESC" if decrescente else " ORDER BY ts"
+        if limite is not None: sql += " LIMIT ?"; params.append(int(limite))
+        registros = []
+        for linha in self._conexao().execute(sql, params):
+            registro = {"timestamp": datetime.fromtimestamp(linha[0], self.timezone).isoformat()}
+            registro.update(zip(COLUNAS_DADOS, linha[1:]))
+            registros.append(registro)
+        return registros
+
+    # Mesma consulta, já em formato colunar: índice DatetimeIndex nativo (sem texto ISO para converter)
+    # e colunas numéricas float64. Intervalo semiaberto [inicio_ts, fim_ts) em segundos epoch.
+    def consultar_dataframe(self, inicio_ts=None, fim_ts=None, estacao=ESTACAO_PADRAO):
+        sql = f"SELECT ts, {', '.join(COLUNAS_DADOS)} FROM leituras WHERE estacao = ?"
+        params = [estacao]
+        if inicio_ts is not None: sql += " AND ts >= ?"; params.append(int(inicio_ts))
+        if fim_ts is not None: sql += " AND ts < ?"; params.append(int(fim_ts))
+        return self._para_dataframe(self._conexao().execute(sql + " ORDER BY ts", params).fetchall())
+
+    def _para_dataframe(self, linhas):
+        df = pd.DataFrame.from_records(linhas, columns=["ts"] + COLUNAS_DADOS)
+        df[COLUNAS_REAIS] = df[COLUNAS_REAIS].astype("float64")
+        df.index = pd.DatetimeIndex(pd.to_datetime(df.pop("ts").to_numpy(dtype="int64"), unit="s", utc=True).as_unit("ns").tz_convert(self.timezone), name="timestamp_dt")
+        return df
+
+    # Mesmo formato de consultar_dataframe, em DataFrames de até `tamanho_lote` linhas. A paginação é pela chave
+    # (ts > último lido, sem OFFSET), então cada lote custa o mesmo e a memória não depende do tamanho do intervalo.
+    def consultar_em_lotes(self, inicio_ts=None, fim_ts=None, estacao=ESTACAO_PADRAO, tamanho_lote=20000):
+        sql = f"SELECT ts, {', '.join(COLUNAS_DADOS)} FROM leituras WHERE estacao = ? AND ts > ? AND ts < ? ORDER BY ts LIMIT ?"
+        ultimo_ts = int(inicio_ts) - 1 if inicio_ts is not None else -2**62
+        fim_ts = int(fim_ts) if fim_ts is not None else 2**62
+        while True:
+            linhas = self._conexao().execute(sql, (estacao, ultimo_ts, fim_ts, tamanho_lote)).fetchall()
+            if not linhas: return
+            yield self._para_dataframe(linhas)
+            if len(linhas) < tamanho_lote: return
+            ultimo_ts = linhas[-1][0]
+
+    # Só as colunas pedidas (numéricas), como arrays float64 com NULL em NaN, das leituras com ts > depois_de_ts;
+    # "ts" vem sempre, em int64
+    def consultar_colunas(self, colunas, depois_de_ts=None, estacao=ESTACAO_PADRAO):
+        sql = f"SELECT ts, {', '.join(colunas)} FROM leituras WHERE estacao = ?"
+        params = [estacao]
+        if depois_de_ts is not None: sql += " AND ts > ?"; params.append(int(depois_de_ts))
+        linhas = self._conexao().execute(sql + " ORDER BY ts", params).fetchall()
+        dados = np.array(linhas, dtype=np.float64).reshape(len(linhas), len(colunas) + 1) # None vira NaN
+        resultado = {"ts": dados[:, 0].astype(np.int64)}
+        resultado.update((coluna, dados[:, i + 1]) for i, coluna in enumerate(colunas))
+        return resultado
+
+    def contar(self, ate_ts=None, estacao=ESTACAO_PADRAO, desde_ts=None):
+        sql, params = "SELECT COUNT(*) FROM leituras WHERE estacao = ?", [estacao]
+        if desde_ts is not None: sql += " AND ts >= ?"; params.append(int(desde_ts))
+        if ate_ts is not None: sql += " AND ts <= ?"; params.append(int(ate_ts))
+        return self._conexao().execute(sql, params).fetchone()[0]
+
+    def primeiro_timestamp(self, estacao=ESTACAO_PADRAO):
+        linha = self._conexao().execute("SELECT MIN(ts) FROM leituras WHERE estacao = ?", (estacao,)).fetchone()
+        return datetime.fromtimestamp(linha[0], self.timezone) if linha and linha[0] is not None else None
+
+    # Reprocessa Delta T e derivados das leituras gravadas (ex.: após mudar limites de classificação),
+    # em lotes paginados por ts para não carregar o período inteiro na memória
+    def recalcular_derivados(self, estacao=ESTACAO_PADRAO, inicio=None, fim=None, tamanho_lote=50000):
+        colunas_derivadas = ["wet_bulb_c", "delta_t_c", "condition_text", "condition_description", "dew_point_c", "feels_like_c"]
+        conn = self._conexao()
+        ultimo_ts = int(inicio.timestamp()) - 1 if inicio is not None else -2**62
+        fim_ts = int(fim.timestamp()) if fim is not None else 2**62
+        total = 0
+        while True:
+            linhas = conn.execute("SELECT ts, temperature_superior_c, humidity_percent FROM leituras "
+                                  "WHERE estacao = ? AND ts > ? AND ts <= ? ORDER BY ts LIMIT ?",
+                                  (estacao, ultimo_ts, fim_ts, tamanho_lote)).fetchall()
+            if not linhas: return total
+            lote = pd.DataFrame(linhas, columns=["ts", "temperature_superior_c", "humidity_percent"])
+            derivados = calcular_delta_t_dataframe(lote)[colunas_derivadas]
+            derivados = derivados.astype(object).where(derivados.notna(), None) # NaN vira NULL no SQLite
+            with conn:
+                conn.executemany(f"UPDATE leituras SET {', '.join(c + ' = ?' for c in colunas_derivadas)} WHERE estacao = ? AND ts = ?",
+                                 [(*valores, estacao, ts) for valores, ts in zip(derivados.itertuples(index=False, name=None), lote["ts"].tolist())])
+            total += len(linhas)
+            ultimo_ts = linhas[-1][0]
+
+# --- JANELA RECENTE EM MEMÓRIA (compartilhada entre sessões via st.cache_resource) ---
+# As leituras da última `janela` ficam num BufferLeituras de tamanho fixo (colunas float32 e códigos int8);
+# cada chamada só anexa as leituras novas do SQLite. Períodos dentro da janela saem do buffer como views, por
+# busca binária e sem cópia; períodos mais antigos (ex.: "Tudo" ou datas customizadas) são lidos do SQLite.
+# A cada `verificar_a_cada` segundos a contagem do SQLite na cobertura é comparada com a do buffer: leituras
+# inseridas no passado (backfill de uma lacuna) fazem o buffer ser recarregado.
+class HistoricoIncremental:
+    def __init__(self, historico, estacao=ESTACAO_PADRAO, janela=timedelta(days=7), capacidade=50000, verificar_a_cada=60):
+        self.historico = historico
+        self.estacao = estacao
+        self.janela = janela
+        self.capacidade = capacidade
+        self.verificar_a_cada = verificar_a_cada
+        self._lock = threading.Lock()
+        self._carregar()
+
+    def _carregar(self):
+        self._buffer = BufferLeituras(self.capacidade)
+        self._cobertura_ts = int((datetime.now(self.historico.timezone) - self.janela).timestamp()) # O buffer tem tudo a partir daqui
+        self._buffer.anexar_dataframe(self.historico.consultar_dataframe(inicio_ts=self._cobertura_ts, estacao=self.estacao))
+        self._ajustar_cobertura()
+        self._verificado_em = py_time.monotonic()
+
+    # Com o buffer cheio, as leituras mais antigas já foram descartadas: a cobertura passa a começar na mais antiga guardada
+    def _ajustar_cobertura(self):
+        if len(self._buffer) == self._buffer.capacidade:
+            self._cobertura_ts = max(self._cobertura_ts, self._buffer.primeiro_ts)
+
+    def atualizar(self):
+        with self._lock:
+            ultimo_ts = self._buffer.ultimo_ts
+            if ultimo_ts is not None and py_time.monotonic() - self._verificado_em >= self.verificar_a_cada:
+                self._verificado_em = py_time.monotonic()
+                if self.historico.contar(ultimo_ts, self.estacao, desde_ts=self._cobertura_ts) != len(self._buffer):
+                    self._carregar() # Leituras inseridas no passado (backfill)
+                    return
+            desde_ts = ultimo_ts + 1 if ultimo_ts is not None else self._cobertura_ts
+            self._buffer.anexar_dataframe(self.historico.consultar_dataframe(inicio_ts=desde_ts, estacao=self.estacao))
+            self._ajustar_cobertura()
+
+    def intervalo(self, inicio=None, fim=None):
+        self.atualizar()
+        inicio_ts = math.ceil(inicio.timestamp()) if inicio is not None else None
+        fim_ts = math.floor(fim.timestamp()) + 1 if fim is not None else None # `fim` incluído
+        if inicio_ts is None or inicio_ts < self._cobertura_ts:
+            return self.historico.consultar_dataframe(inicio_ts=inicio_ts, fim_ts=fim_ts, estacao=self.estacao)
+        return self._buffer.para_dataframe(inicio_ts, fim_ts, timezone=self.historico.timezone)
+
+    # Mais recentes primeiro; se a janela tem menos de `n` leituras (estação parada há mais de uma janela), vem do SQLite
+    def ultimos(self, n):
+        self.atualizar()
+        df = self._buffer.para_dataframe(ultimas=n, timezone=self.historico.timezone).iloc[::-1]
+        if len(df) >= n: return df
+        registros = self.historico.consultar(estacao=self.estacao, limite=n, decrescente=True)
+        if len(registros) <= len(df): return df
+        df = pd.DataFrame(registros, columns=["timestamp"] + COLUNAS_DADOS)
+        df.index = pd.DatetimeIndex(pd.to_datetime(df.pop("timestamp"), utc=True).dt.tz_convert(self.historico.timezone), name="timestamp_dt")
+        return df
@@ -0,0 +1,154 @@
+import argparse
+import random
+import threading
+import time as py_time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+import pytz
+import requests
+
+from alertas import motor_alertas_configurado
+from config import APP_TIMEZONE_STR, ler_segredo
+from ecowitt import convert_deg_to_cardinal, montar_dados_completos
+from estacoes import carregar_estacoes, mapa_passkeys
+from historico import CAMINHO_PADRAO, ESTACAO_PADRAO, HistoricoEstacao
+from metricas import METRICAS
+
+# --- INGESTÃO LOCAL (GW2000 "Customized server", protocolo Ecowitt) ---
+# O gateway faz POST form-urlencoded a cada 16-60 s com unidades imperiais (°F, mph, inHg).
+# Cada envio é convertido para o mesmo formato de fetch_real_ecowitt_data, recebe Delta T e
+# derivados em montar_dados_completos e é gravado direto no histórico, sem chamar a nuvem; com um
+# motor de alertas, cada envio também passa pelas regras assim que é gravado.
+CAMINHO_PUSH_PADRAO = "/data/report/"
+# Escuta só em 127.0.0.1 por padrão (gateway atrás de um proxy reverso). Para receber direto do GW2000 na rede
+# local, configure PUSH_HOST (ex.: "0.0.0.0" / --host) e as passkeys das estações.
+HOST_PUSH_PADRAO = "127.0.0.1"
+
+def _f_para_c(v): return (v - 32) * 5 / 9
+def _mph_para_kmh(v): return v * 1.609344
+def _inhg_para_hpa(v): return v * 33.8639
+
+def _numero(campos, chave):
+    try: return float(campos[chave])
+    except (KeyError, ValueError, TypeError): return None
+
+def mapear_dados_push(campos):
+    mapped_data = {
+        "temperature_c": None, "humidity_percent": None, "temperature_superior_c": None,
+        "wind_speed_kmh": None, "wind_gust_kmh": None, "pressure_hpa": None,
+        "wind_direction": None, "uv_index": None,
+        "solar_radiation_wm2": None, "luminosity_lux": None,
+    }
+    conversoes = [
+        ("temperature_c", "tempinf", _f_para_c),          # GW2000 (inferior)
+        ("temperature_superior_c", "tempf", _f_para_c),   # Wittboy (superior)
+        ("humidity_percent", "humidity", None),
+        ("wind_speed_kmh", "windspeedmph", _mph_para_kmh),
+        ("wind_gust_kmh", "windgustmph", _mph_para_kmh),
+        ("pressure_hpa", "baromrelin", _inhg_para_hpa),
+        ("solar_radiation_wm2", "solarradiation", None),
+        ("uv_index", "uv", None),
+    ]
+    for chave, campo, conversao in conversoes:
+        valor = _numero(campos, campo)
+        if valor is not None: mapped_data[chave] = conversao(valor) if conversao else valor
+    if mapped_data["pressure_hpa"] is None and _numero(campos, "baromabsin") is not None:
+        mapped_data["pressure_hpa"] = _inhg_para_hpa(_numero(campos, "baromabsin"))
+    if mapped_data["solar_radiation_wm2"] is not None:
+        mapped_data["luminosity_lux"] = mapped_data["solar_radiation_wm2"] * 120
+    mapped_data["wind_direction"] = convert_deg_to_cardinal(campos.get("winddir"))
+    # Mesma precisão que a API em nuvem devolve (temperaturas em °C com uma casa)
+    for chave in ("temperature_c", "temperature_superior_c", "wind_speed_kmh", "wind_gust_kmh", "pressure_hpa"):
+        if mapped_data[chave] is not None: mapped_data[chave] = round(mapped_data[chave], 1)
+    return mapped_data
+
+# `dateutc` vem como "2025-05-20 19:33:48" (ou "now"); sem ele, vale a hora de chegada
+def horario_da_leitura(campos, timezone):
+    try:
+        return pytz.utc.localize(datetime.strptime(campos.get("dateutc", ""), "%Y-%m-%d %H:%M:%S")).astimezone(timezone)
+    except ValueError:
+        return datetime.now(timezone)
+
+# `estacao_por_passkey` (PASSKEY -> id da estação) identifica o gateway; vazio aceita tudo como a estação padrão
+def processar_envio(campos, historico, estacao_por_passkey=None, alertas=None):
+    if estacao_por_passkey:
+        estacao = estacao_por_passkey.get(campos.get("PASSKEY"))
+        if estacao is None: return None
+    else: estacao = ESTACAO_PADRAO
+    registro = montar_dados_completos(mapear_dados_push(campos), horario_da_leitura(campos, historico.timezone))
+    historico.salvar(registro, estacao)
+    if alertas is not None: alertas.processar(registro, estacao)
+    return registro
+
+def criar_servidor(historico, porta, host=HOST_PUSH_PADRAO, caminho=CAMINHO_PUSH_PADRAO, estacao_por_passkey=None, alertas=None):
+    class ManipuladorPush(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path.split("?")[0].rstrip("/") != caminho.rstrip("/"):
+                self.send_error(404); return
+            tamanho = int(self.headers.get("Content-Length") or 0)
+            campos = dict(parse_qsl(self.rfile.read(tamanho).decode("utf-8", "replace")))
+            try:
+                with METRICAS.medir("push_envio"):
+                    registro = processar_envio(campos, historico, estacao_por_passkey, alertas)
+            except Exception as e:
+                print(f"Erro ao processar envio do gateway: {e}")
+                METRICAS.contar("push_envios_total", resultado="erro")
+                self.send_error(500); return
+            if registro is None:
+                METRICAS.contar("push_envios_total", resultado="passkey_desconhecida")
+                self.send_error(403, "PASSKEY desconhecida"); return
+            METRICAS.contar("push_envios_total", resultado="sucesso")
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, formato, *args): pass # Um envio a cada 16 s encheria o log
+
+    return ThreadingHTTPServer((host, porta), ManipuladorPush)
+
+# Usado pelo app para rodar a ingestão no mesmo processo do Streamlit
+def iniciar_servidor_em_thread(historico, porta, **kwargs):
+    servidor = criar_servidor(historico, porta, **kwargs)
+    threading.Thread(target=servidor.serve_forever, name="ingestao-push", daemon=True).start()
+    return servidor
+
+# --- GATEWAY SIMULADO (testes locais sem o GW2000) ---
+def simular_gateway(url, intervalo_segundos=16, envios=None, passkey="SIMULADO"):
+    enviados = 0
+    while envios is None or enviados < envios:
+        campos = {
+            "PASSKEY": passkey, "stationtype": "GW2000A_V3.1.2", "model": "GW2000A",
+            "dateutc": datetime.now(pytz.utc).strftime("%Y-%m-%d %H:%M:%S"),
+            "tempinf": f"{random.uniform(60, 85):.1f}", "humidityin": f"{random.randint(30, 80)}",
+            "baromrelin": f"{random.uniform(29.6, 30.2):.3f}", "baromabsin": f"{random.uniform(29.0, 29.6):.3f}",
+            "tempf": f"{random.uniform(55, 95):.1f}", "humidity": f"{random.randint(20, 95)}",
+            "winddir": f"{random.randint(0, 359)}", "windspeedmph": f"{random.uniform(0, 12):.2f}",
+            "windgustmph": f"{random.uniform(0, 18):.2f}", "solarradiation": f"{random.uniform(0, 900):.2f}", "uv": f"{random.randint(0, 10)}",
+        }
+        resposta = requests.post(url, data=campos, timeout=10)
+        print(f"{campos['dateutc']} -> HTTP {resposta.status_code}")
+        enviados += 1
+        if envios is None or enviados < envios: py_time.sleep(intervalo_segundos)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recebe os envios do GW2000 (protocolo Ecowitt) e grava no histórico.")
+    parser.add_argument("--porta", type=int, default=int(ler_segredo("PUSH_PORTA", 8081)))
+    parser.add_argument("--caminho", default=ler_segredo("PUSH_CAMINHO", CAMINHO_PUSH_PADRAO))
+    parser.add_argument("--host", default=ler_segredo("PUSH_HOST", HOST_PUSH_PADRAO),
+                        help="Endereço de escuta (padrão: 127.0.0.1; 0.0.0.0 para receber da rede local)")
+    parser.add_argument("--banco", default=ler_segredo("HISTORICO_DB_PATH", CAMINHO_PADRAO))
+    parser.add_argument("--simular", metavar="URL", help="Em vez de receber, envia leituras simuladas para URL (gateway falso).")
+    parser.add_argument("--intervalo", type=float, default=16, help="Segundos entre envios simulados.")
+    parser.add_argument("--envios", type=int, help="Quantidade de envios simulados (padrão: sem fim).")
+    parser.add_argument("--passkey", default="SIMULADO", help="PASSKEY enviada pelo gateway simulado.")
+    args = parser.parse_args()
+
+    if args.simular:
+        simular_gateway(args.simular, args.intervalo, args.envios, args.passkey)
+    else:
+        historico = HistoricoEstacao(args.banco, pytz.timezone(APP_TIMEZONE_STR))
+        servidor = criar_servidor(historico, args.porta, host=args.host, caminho=args.caminho, estacao_por_passkey=mapa_passkeys(carregar_estacoes()),
+                                  alertas=motor_alertas_configurado())
+        print(f"Recebendo envios do gateway em http://{args.host}:{args.porta}{args.caminho}")
+        servidor.serve_forever()
@@ -0,0 +1,356 @@
+import threading
+import time as py_time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from calculos import (CODIGO_INVALIDO, CONDICOES_DELTA_T, CONDICOES_VENTO, ESTADOS_INVERSAO, avaliar_inversao_lote,
+                      classificar_delta_t_lote, classificar_vento_lote)
+from historico import ESTACAO_PADRAO
+
+# --- ÍNDICE DE JANELAS DE APLICAÇÃO (estatísticas de condição mantidas incrementalmente) ---
+# Cada leitura vale do seu instante até a leitura seguinte; um intervalo maior que `lacuna_max` conta como sem dados.
+# Os segundos de cada trecho são somados por classe de Delta T, de vento e de inversão térmica (mesmas regras do
+# painel de condições atuais) e por condição apta, em tabelas de somas acumuladas por hora local, por dia local e,
+# para cada hora do dia, por dia (perfil horário): o total de qualquer período sai de duas buscas binárias.
+# As sequências contínuas de cada condição ficam em listas ordenadas, com uma árvore de segmentos das durações
+# (_MaximoPorIntervalo) para achar a mais longa de um período em O(log n) depois das buscas binárias.
+# atualizar() processa só as leituras novas; se aparecerem leituras antigas (ex.: backfill), o índice é refeito
+# (a contagem que detecta isso percorre a estação inteira, então roda no máximo a cada `verificar_a_cada` s).
+# Valores regravados no mesmo instante (backfill com --sobrescrever, recalcular_derivados) pedem reconstruir().
+DIMENSOES = {
+    "delta_t": CONDICOES_DELTA_T,
+    "vento": CONDICOES_VENTO,
+    "inversao": ESTADOS_INVERSAO,
+    "apta": ("NÃO", "SIM"), # Delta T ADEQUADA, vento EXCELENTE e sem inversão térmica
+}
+COLUNAS_ENTRADA = ["delta_t_c", "wind_speed_kmh", "temperature_c", "temperature_superior_c"]
+HORAS_MADRUGADA_PADRAO = (3, 7) # [3 h, 7 h) no horário local
+LACUNA_MAX_PADRAO = 1800
+
+# Colunas das tabelas: uma por (dimensão, condição), na ordem de DIMENSOES, e por fim o tempo com dados
+_DESLOCAMENTOS, _coluna = {}, 0
+for _dimensao, _condicoes in DIMENSOES.items():
+    _DESLOCAMENTOS[_dimensao] = _coluna
+    _coluna += len(_condicoes)
+COLUNA_COBERTO = _coluna
+N_COLUNAS = _coluna + 1
+COLUNA_INVERSAO = _DESLOCAMENTOS["inversao"] + ESTADOS_INVERSAO.index("INVERSÃO TÉRMICA")
+# Colunas extras da tabela diária: segundos de madrugada (com inversão / com dados) e indicadores 0/1 por dia
+DIA_INVERSAO_MADRUGADA, DIA_MADRUGADA_COBERTA, DIA_COM_DADOS, DIA_COM_INVERSAO_MADRUGADA, DIA_MADRUGADA_COM_DADOS = range(N_COLUNAS, N_COLUNAS + 5)
+N_COLUNAS_DIA = N_COLUNAS + 5
+
+def coluna(dimensao, condicao):
+    return _DESLOCAMENTOS[dimensao] + DIMENSOES[dimensao].index(condicao)
+
+# Somas acumuladas por chave inteira crescente (hora ou dia local). Só a última chave pode receber mais valores,
+# como acontece com leituras chegando em ordem; o total de um intervalo de chaves é a diferença de duas linhas.
+class _TabelaAcumulada:
+    def __init__(self, n_colunas, capacidade=256):
+        self._chaves = np.empty(capacidade, dtype=np.int64)
+        self._acumulado = np.zeros((capacidade + 1, n_colunas), dtype=np.int64) # Linha i = soma das i primeiras chaves
+        self.n = 0
+
+    def somar(self, chave, valores):
+        if self.n and chave <= self._chaves[self.n - 1]: # Menor só na volta do horário de verão (hora local repetida)
+            self._acumulado[self.n] += valores
+            return
+        if self.n == len(self._chaves):
+            self._chaves = np.concatenate([self._chaves, np.empty_like(self._chaves)])
+            self._acumulado = np.concatenate([self._acumulado, np.zeros((len(self._chaves) - self.n, self._acumulado.shape[1]), dtype=np.int64)])
+        self._chaves[self.n] = chave
+        self._acumulado[self.n + 1] = self._acumulado[self.n] + valores
+        self.n += 1
+
+    def ultimo(self):
+        return self._acumulado[self.n] - self._acumulado[self.n - 1]
+
+    def definir_ultimo(self, coluna, valor):
+        self._acumulado[self.n, coluna] = self._acumulado[self.n - 1, coluna] + valor
+
+    def _posicoes(self, inicio, fim):
+        chaves = self._chaves[:self.n]
+        return int(np.searchsorted(chaves, inicio)), int(np.searchsorted(chaves, fim))
+
+    # Soma das chaves em [inicio, fim)
+    def total(self, inicio, fim):
+        i, j = self._posicoes(inicio, fim)
+        return self._acumulado[j] - self._acumulado[i]
+
+    # Chaves presentes em [inicio, fim) e os valores de cada uma
+    def linhas(self, inicio, fim):
+        i, j = self._posicoes(inicio, fim)
+        return self._chaves[i:j].copy(), np.diff(self._acumulado[i:j + 1], axis=0)
+
+def _crescer(vetor, tamanho, preenchimento=0):
+    if tamanho <= len(vetor): return vetor
+    novo = np.full(max(tamanho, 2 * len(vetor)), preenchimento, dtype=vetor.dtype)
+    novo[:len(vetor)] = vetor
+    return novo
+
+# Árvore de segmentos (num vetor, folhas a partir de `capacidade`) com a posição do maior valor de cada nó.
+# Os valores só mudam no fim (acrescentar ou alterar o último); os nós são refeitos de forma preguiçosa, na
+# consulta, só acima das folhas alteradas, um nível por vez.
+class _MaximoPorIntervalo:
+    def __init__(self, capacidade=256):
+        self._valores = np.full(capacidade, -1, dtype=np.int64) # -1 nas folhas vazias: nunca vencem
+        self._arvore = np.zeros(2 * capacidade, dtype=np.int64)
+        self._alterado_desde = 0
+        self.n = 0
+
+    def definir(self, i, valores): # Posições i, i+1, ...; i == n acrescenta, i == n - 1 altera o último
+        fim = i + len(valores)
+        if fim > len(self._valores):
+            self._valores = _crescer(self._valores, fim, preenchimento=-1)
+            self._arvore = np.zeros(2 * len(self._valores), dtype=np.int64)
+            self._alterado_desde = 0 # Com outra capacidade, a árvore inteira é refeita
+        self._valores[i:fim] = valores
+        self.n = max(self.n, fim)
+        self._alterado_desde = min(self._alterado_desde, i)
+
+    def _refazer(self):
+        capacidade = len(self._valores)
+        if self._alterado_desde >= self.n: return
+        if self._alterado_desde == 0: self._arvore[capacidade:] = np.arange(capacidade)
+        inicio, fim = self._alterado_desde + capacidade, self.n - 1 + capacidade
+        while inicio > 1:
+            inicio, fim = inicio // 2, fim // 2
+            a, b = self._arvore[2 * inicio:2 * fim + 2:2], self._arvore[2 * inicio + 1:2 * fim + 2:2]
+            self._arvore[inicio:fim + 1] = np.where(self._valores[a] >= self._valores[b], a, b)
+        self._alterado_desde = self.n
+
+    # Posição do maior valor em [inicio, fim), fim > inicio; no empate, a primeira
+    def argmax(self, inicio, fim):
+        self._refazer()
+        capacidade = len(self._valores)
+        melhor = None
+        inicio, fim = inicio + capacidade, fim + capacidade
+        while inicio < fim:
+            for no in ((inicio,) if inicio & 1 else ()) + ((fim - 1,) if fim & 1 else ()):
+                candidata = int(self._arvore[no])
+                if melhor is None or self._valores[candidata] > self._valores[melhor] or (
+                        self._valores[candidata] == self._valores[melhor] and candidata < melhor): melhor = candidata
+            inicio, fim = (inicio + 1) // 2, fim // 2
+        return melhor
+
+# Sequências em ordem (início, fim e código), em vetores numpy que dobram de tamanho quando enchem
+class _ListaSequencias:
+    def __init__(self, capacidade=256):
+        self.inicios = np.zeros(capacidade, dtype=np.int64)
+        self.fins = np.zeros(capacidade, dtype=np.int64)
+        self.codigos = np.zeros(capacidade, dtype=np.int8)
+        self.n = 0
+
+    def acrescentar(self, inicios, fins, codigos):
+        fim = self.n + len(inicios)
+        self.inicios, self.fins, self.codigos = (_crescer(v, fim) for v in (self.inicios, self.fins, self.codigos))
+        self.inicios[self.n:fim], self.fins[self.n:fim], self.codigos[self.n:fim] = inicios, fins, codigos
+        self.n = fim
+
+    # Posições [i, j) das sequências que cruzam [inicio, fim)
+    def posicoes(self, inicio, fim):
+        return int(np.searchsorted(self.fins[:self.n], inicio, side="right")), int(np.searchsorted(self.inicios[:self.n], fim))
+
+# Sequências contínuas de uma dimensão: todas em ordem (para a linha do tempo) e, por condição, com a árvore de máximos
+class _Sequencias:
+    def __init__(self, n_condicoes):
+        self._todas = _ListaSequencias()
+        self._por_codigo = [(_ListaSequencias(), _MaximoPorIntervalo()) for _ in range(n_condicoes)]
+
+    # Sequências já maximais dentro do lote; a primeira pode continuar a última guardada
+    def anexar(self, inicios, fins, codigos):
+        todas = self._todas
+        if todas.n and todas.fins[todas.n - 1] == inicios[0] and todas.codigos[todas.n - 1] == codigos[0]:
+            lista, maximos = self._por_codigo[codigos[0]]
+            todas.fins[todas.n - 1] = lista.fins[lista.n - 1] = fins[0]
+            maximos.definir(lista.n - 1, [fins[0] - lista.inicios[lista.n - 1]])
+            inicios, fins, codigos = inicios[1:], fins[1:], codigos[1:]
+        todas.acrescentar(inicios, fins, codigos)
+        for codigo, (lista, maximos) in enumerate(self._por_codigo):
+            selecao = codigos == codigo
+            if not selecao.any(): continue
+            maximos.definir(lista.n, fins[selecao] - inicios[selecao])
+            lista.acrescentar(inicios[selecao], fins[selecao], codigo)
+
+    # Mais longa sequência da condição dentro de [inicio, fim), recortada nas pontas: (início, fim) ou None
+    def mais_longa(self, codigo, inicio, fim):
+        lista, maximos = self._por_codigo[codigo]
+        i, j = lista.posicoes(inicio, fim)
+        if i >= j: return None
+        candidatas = [i, j - 1] + ([maximos.argmax(i + 1, j - 1)] if j - i > 2 else [])
+        recortes = [(max(int(lista.inicios[k]), inicio), min(int(lista.fins[k]), fim)) for k in candidatas]
+        return max(recortes, key=lambda r: r[1] - r[0])
+
+    def no_periodo(self, inicio, fim):
+        todas = self._todas
+        i, j = todas.posicoes(inicio, fim)
+        return (np.maximum(todas.inicios[i:j], inicio), np.minimum(todas.fins[i:j], fim), todas.codigos[i:j].copy())
+
+class IndiceJanelas:
+    def __init__(self, historico, estacao=ESTACAO_PADRAO, lacuna_max=LACUNA_MAX_PADRAO, horas_madrugada=HORAS_MADRUGADA_PADRAO,
+                 verificar_a_cada=600):
+        self.historico = historico
+        self.estacao = estacao
+        self.lacuna_max = min(lacuna_max, 3600) # Cada trecho atravessa no máximo uma virada de hora
+        self.horas_madrugada = horas_madrugada
+        self.verificar_a_cada = verificar_a_cada
+        self._verificado_em = py_time.monotonic()
+        self._lock = threading.Lock()
+        self._reiniciar()
+        self.atualizar()
+
+    def _reiniciar(self):
+        self._horas = _TabelaAcumulada(N_COLUNAS)                            # Chave: hora local desde a época
+        self._dias = _TabelaAcumulada(N_COLUNAS_DIA)                         # Chave: dia local desde a época
+        self._horas_do_dia = [_TabelaAcumulada(N_COLUNAS) for _ in range(24)] # Chave: dia local
+        self._sequencias = {dimensao: _Sequencias(len(condicoes)) for dimensao, condicoes in DIMENSOES.items()}
+        self._pendente = None # Última leitura: só conta quando chegar a seguinte, que fecha o seu trecho
+        self._n_leituras = 0
+        self._ultimo_ts = None
+
+    def reconstruir(self):
+        with self._lock: self._reiniciar()
+        self.atualizar()
+
+    # Processa as leituras gravadas desde a última chamada; devolve quantas eram
+    def atualizar(self):
+        with self._lock:
+            if self._ultimo_ts is not None and py_time.monotonic() - self._verificado_em >= self.verificar_a_cada:
+                self._verificado_em = py_time.monotonic()
+                if self.historico.contar(self._ultimo_ts, self.estacao) != self._n_leituras:
+                    self._reiniciar() # Leituras inseridas no passado (backfill)
+            novas = self.historico.consultar_colunas(COLUNAS_ENTRADA, depois_de_ts=self._ultimo_ts, estacao=self.estacao)
+            if not len(novas["ts"]): return 0
+            self._processar(novas)
+            return len(novas["ts"])
+
+    def _processar(self, novas):
+        ts = novas["ts"]
+        codigos = {
+            "delta_t": classificar_delta_t_lote(novas["delta_t_c"]),
+            "vento": classificar_vento_lote(novas["wind_speed_kmh"]),
+            "inversao": avaliar_inversao_lote(novas["temperature_c"], novas["temperature_superior_c"], novas["wind_speed_kmh"]),
+        }
+        apta = (codigos["delta_t"] == 1) & (codigos["vento"] == 1) & (codigos["inversao"] != 1)
+        sem_dados = (codigos["delta_t"] == CODIGO_INVALIDO) | (codigos["vento"] == CODIGO_INVALIDO)
+        codigos["apta"] = np.where(sem_dados, CODIGO_INVALIDO, apta).astype(np.int8)
+
+        if self._pendente is not None:
+            ts_pendente, codigos_pendente = self._pendente
+            ts = np.concatenate([[ts_pendente], ts])
+            codigos = {d: np.concatenate([[codigos_pendente[d]], c]) for d, c in codigos.items()}
+        self._pendente = (int(ts[-1]), {d: c[-1] for d, c in codigos.items()})
+        self._n_leituras += len(novas["ts"])
+        self._ultimo_ts = int(ts[-1])
+
+        duracoes = np.diff(ts)
+        cobertos = duracoes <= self.lacuna_max
+        inicios, duracoes = ts[:-1][cobertos], duracoes[cobertos]
+        codigos = {d: c[:-1][cobertos] for d, c in codigos.items()}
+        if not len(inicios): return
+        self._somar_trechos(inicios, duracoes, codigos)
+        self._anexar_sequencias(inicios, inicios + duracoes, codigos)
+
+    def _segundos_locais(self, ts):
+        locais = pd.to_datetime(np.asarray(ts, dtype=np.int64), unit="s", utc=True).tz_convert(self.historico.timezone).tz_localize(None)
+        return locais.as_unit("s").asi8
+
+    def _somar_trechos(self, inicios, duracoes, codigos):
+        # Trechos que atravessam uma virada de hora são divididos nela
+        locais = self._segundos_locais(inicios)
+        proxima_hora = (locais // 3600 + 1) * 3600
+        parte1 = np.minimum(duracoes, proxima_hora - locais)
+        divididos = duracoes > parte1
+        ordem = np.argsort(np.concatenate([locais, proxima_hora[divididos]]), kind="stable")
+        locais = np.concatenate([locais, proxima_hora[divididos]])[ordem]
+        segundos = np.concatenate([parte1, (duracoes - parte1)[divididos]])[ordem]
+        codigos = {d: np.concatenate([c, c[divididos]])[ordem] for d, c in codigos.items()}
+
+        valores = np.zeros((len(segundos), N_COLUNAS), dtype=np.int64)
+        linhas = np.arange(len(segundos))
+        for dimensao, codigo in codigos.items():
+            validos = codigo != CODIGO_INVALIDO
+            valores[linhas[validos], _DESLOCAMENTOS[dimensao] + codigo[validos]] = segundos[validos]
+        valores[:, COLUNA_COBERTO] = segundos
+
+        horas = locais // 3600
+        viradas = np.flatnonzero(np.diff(horas)) + 1
+        inicio_madrugada, fim_madrugada = self.horas_madrugada
+        extras = np.zeros(N_COLUNAS_DIA - N_COLUNAS, dtype=np.int64)
+        for hora, soma in zip(horas[np.concatenate([[0], viradas])].tolist(), np.add.reduceat(valores, np.concatenate([[0], viradas]), axis=0)):
+            dia, hora_do_dia = divmod(hora, 24)
+            self._horas.somar(hora, soma)
+            self._horas_do_dia[hora_do_dia].somar(dia, soma)
+            madrugada = inicio_madrugada <= hora_do_dia < fim_madrugada
+            extras[DIA_INVERSAO_MADRUGADA - N_COLUNAS] = soma[COLUNA_INVERSAO] if madrugada else 0
+            extras[DIA_MADRUGADA_COBERTA - N_COLUNAS] = soma[COLUNA_COBERTO] if madrugada else 0
+            self._dias.somar(dia, np.concatenate([soma, extras]))
+            ultimo = self._dias.ultimo()
+            self._dias.definir_ultimo(DIA_COM_DADOS, int(ultimo[COLUNA_COBERTO] > 0))
+            self._dias.definir_ultimo(DIA_COM_INVERSAO_MADRUGADA, int(ultimo[DIA_INVERSAO_MADRUGADA] > 0))
+            self._dias.definir_ultimo(DIA_MADRUGADA_COM_DADOS, int(ultimo[DIA_MADRUGADA_COBERTA] > 0))
+
+    def _anexar_sequencias(self, inicios, fins, codigos):
+        for dimensao, codigo in codigos.items():
+            # Uma sequência termina onde muda a condição ou há lacuna
+            quebras = np.flatnonzero((codigo[1:] != codigo[:-1]) | (inicios[1:] != fins[:-1])) + 1
+            primeiros, ultimos = np.concatenate([[0], quebras]), np.concatenate([quebras, [len(codigo)]]) - 1
+            validas = codigo[primeiros] != CODIGO_INVALIDO
+            if validas.any():
+                self._sequencias[dimensao].anexar(inicios[primeiros][validas], fins[ultimos][validas], codigo[primeiros][validas])
+
+    # --- Consultas (datetimes com fuso; resultados em horas) ---
+    def _hora_local(self, momento, arredondar_para_cima=False):
+        local = int(self._segundos_locais([int(momento.timestamp())])[0])
+        return -(-local // 3600) if arredondar_para_cima else local // 3600
+
+    def _dia_local(self, momento):
+        return self._hora_local(momento) // 24
+
+    def _para_datetime(self, ts):
+        return datetime.fromtimestamp(ts, self.historico.timezone)
+
+    # Horas em cada condição de cada dimensão e horas com dados, com resolução de hora cheia
+    def resumo(self, inicio, fim):
+        with self._lock:
+            total = self._horas.total(self._hora_local(inicio), self._hora_local(fim, arredondar_para_cima=True))
+            dias = self._dias.total(self._dia_local(inicio), self._dia_local(fim) + 1)
+        resultado = {dimensao: {condicao: total[coluna(dimensao, condicao)] / 3600 for condicao in condicoes}
+                     for dimensao, condicoes in DIMENSOES.items()}
+        resultado.update(coberto=total[COLUNA_COBERTO] / 3600, dias_com_dados=int(dias[DIA_COM_DADOS]),
+                         madrugadas_com_dados=int(dias[DIA_MADRUGADA_COM_DADOS]),
+                         madrugadas_com_inversao=int(dias[DIA_COM_INVERSAO_MADRUGADA]))
+        return resultado
+
+    # Uma linha por dia local com horas em cada condição da dimensão
+    def por_dia(self, dimensao, inicio, fim):
+        with self._lock:
+            dias, valores = self._dias.linhas(self._dia_local(inicio), self._dia_local(fim) + 1)
+        condicoes = DIMENSOES[dimensao]
+        deslocamento = _DESLOCAMENTOS[dimensao]
+        df = pd.DataFrame(valores[:, deslocamento:deslocamento + len(condicoes)] / 3600, columns=list(condicoes))
+        df.insert(0, "dia", pd.to_datetime(dias, unit="D").date)
+        return df
+
+    # Fração do tempo com dados em que a condição valeu, para cada hora do dia (24 valores; NaN sem dados)
+    def perfil_horario(self, dimensao, condicao, inicio, fim):
+        dia_inicio, dia_fim = self._dia_local(inicio), self._dia_local(fim) + 1
+        with self._lock:
+            totais = np.array([tabela.total(dia_inicio, dia_fim) for tabela in self._horas_do_dia])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return totais[:, coluna(dimensao, condicao)] / np.where(totais[:, COLUNA_COBERTO] > 0, totais[:, COLUNA_COBERTO], np.nan)
+
+    # Mais longa sequência contínua da condição no período: (início, fim) em datetimes, ou None
+    def mais_longa(self, dimensao, condicao, inicio, fim):
+        with self._lock:
+            sequencia = self._sequencias[dimensao].mais_longa(DIMENSOES[dimensao].index(condicao), int(inicio.timestamp()), int(fim.timestamp()))
+        return None if sequencia is None else tuple(self._para_datetime(t) for t in sequencia)
+
+    # Sequências do período (recortadas nas pontas), para a linha do tempo
+    def sequencias(self, dimensao, inicio, fim):
+        with self._lock:
+            inicios, fins, codigos = self._sequencias[dimensao].no_periodo(int(inicio.timestamp()), int(fim.timestamp()))
+        para_datas = lambda ts: pd.to_datetime(ts, unit="s", utc=True).tz_convert(self.historico.timezone)
+        return pd.DataFrame({"inicio": para_datas(inicios), "fim": para_datas(fins),
+                             "condicao": np.array(DIMENSOES[dimensao], dtype=object)[codigos]})
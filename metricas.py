@@ -0,0 +1,142 @@
+import bisect
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# --- MÉTRICAS DE DESEMPENHO (tempos por etapa e contadores, em memória no processo) ---
+# Cada etapa medida vira um histograma de segundos (baldes fixos, exportado como `<etapa>_segundos`) e guarda as
+# últimas `max_amostras` durações, de onde saem p50/p95 do painel de depuração. Contadores são somas
+# simples. Tudo é por processo: o registro METRICAS é criado na importação do módulo e compartilhado
+# pelas sessões, pelo poller e pela ingestão local.
+BALDES_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PREFIXO_PROMETHEUS = "deltat_"
+
+class _Histograma:
+    def __init__(self, baldes, max_amostras):
+        self.contagens = [0] * (len(baldes) + 1) # Último = acima do maior balde (+Inf)
+        self.soma = 0.0
+        self.total = 0
+        self.amostras = deque(maxlen=max_amostras)
+
+class RegistroMetricas:
+    def __init__(self, baldes=BALDES_PADRAO, max_amostras=1000):
+        self.baldes = tuple(baldes)
+        self.max_amostras = max_amostras
+        self._contadores = {}  # (nome, rótulos) -> valor
+        self._histogramas = {} # (nome, rótulos) -> _Histograma
+        self._lock = threading.Lock()
+
+    def contar(self, nome, valor=1, **rotulos):
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+
+    def observar(self, nome, segundos, **rotulos):
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            hist = self._histogramas.get(chave)
+            if hist is None: hist = self._histogramas[chave] = _Histograma(self.baldes, self.max_amostras)
+            hist.contagens[bisect.bisect_left(self.baldes, segundos)] += 1
+            hist.soma += segundos
+            hist.total += 1
+            hist.amostras.append(segundos)
+
+    # Uso: `with METRICAS.medir("secao_historico"): ...` (a duração é registrada mesmo se houver exceção)
+    @contextmanager
+    def medir(self, nome, **rotulos):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nome, time.perf_counter() - inicio, **rotulos)
+
+    # Decorador; `resultado(retorno)` opcional classifica cada chamada (ex.: "sucesso"/"falha"), vira o rótulo
+    # `resultado` do histograma e também incrementa o contador `<nome>_total`
+    def cronometrado(self, nome, resultado=None):
+        def decorador(funcao):
+            @functools.wraps(funcao)
+            def envolvida(*args, **kwargs):
+                inicio = time.perf_counter()
+                rotulos = {"resultado": "erro"} if resultado else {}
+                try:
+                    retorno = funcao(*args, **kwargs)
+                    if resultado: rotulos = {"resultado": resultado(retorno)}
+                    return retorno
+                finally: # Como em medir, a chamada que levanta exceção também conta (resultado="erro")
+                    self.observar(nome, time.perf_counter() - inicio, **rotulos)
+                    if resultado: self.contar(f"{nome}_total", **rotulos)
+            return envolvida
+        return decorador
+
+    # Uma linha por etapa/rótulos, para o painel de depuração (tempos em ms sobre as amostras recentes)
+    def resumo(self):
+        with self._lock:
+            itens = [(nome, rotulos, hist.total, hist.soma, np.array(hist.amostras)) for (nome, rotulos), hist in self._histogramas.items()]
+            contadores = [(nome, rotulos, valor) for (nome, rotulos), valor in self._contadores.items()]
+        etapas = [{
+            "etapa": nome, "rótulos": ", ".join(f"{k}={v}" for k, v in rotulos), "chamadas": total,
+            "média (ms)": soma / total * 1e3, "p50 (ms)": float(np.percentile(amostras, 50)) * 1e3,
+            "p95 (ms)": float(np.percentile(amostras, 95)) * 1e3, "máx. (ms)": float(amostras.max()) * 1e3,
+        } for nome, rotulos, total, soma, amostras in sorted(itens, key=lambda i: (i[0], i[1]))]
+        contagens = [{"contador": nome, "rótulos": ", ".join(f"{k}={v}" for k, v in rotulos), "valor": valor}
+                     for nome, rotulos, valor in sorted(contadores, key=lambda i: (i[0], i[1]))]
+        return etapas, contagens
+
+    # Formato de exposição em texto do Prometheus (versão 0.0.4)
+    def exportar_prometheus(self, prefixo=PREFIXO_PROMETHEUS):
+        with self._lock:
+            contadores = sorted(self._contadores.items())
+            histogramas = sorted((chave, list(h.contagens), h.soma, h.total) for chave, h in self._histogramas.items())
+        linhas, tipos_emitidos = [], set()
+        for (nome, rotulos), valor in contadores:
+            if nome not in tipos_emitidos:
+                linhas.append(f"# TYPE {prefixo}{nome} counter"); tipos_emitidos.add(nome)
+            linhas.append(f"{prefixo}{nome}{_rotulos(rotulos)} {valor}")
+        for (nome, rotulos), contagens, soma, total in histogramas:
+            if nome not in tipos_emitidos:
+                linhas.append(f"# TYPE {prefixo}{nome}_segundos histogram"); tipos_emitidos.add(nome)
+            acumulado = 0
+            for limite, contagem in zip(self.baldes + (float("inf"),), contagens):
+                acumulado += contagem
+                le = "+Inf" if limite == float("inf") else repr(limite)
+                linhas.append(f"{prefixo}{nome}_segundos_bucket{_rotulos(rotulos + (('le', le),))} {acumulado}")
+            linhas.append(f"{prefixo}{nome}_segundos_sum{_rotulos(rotulos)} {soma!r}")
+            linhas.append(f"{prefixo}{nome}_segundos_count{_rotulos(rotulos)} {total}")
+        return "\n".join(linhas) + "\n"
+
+def _rotulos(rotulos):
+    if not rotulos: return ""
+    escapar = lambda v: str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escapar(v)}"' for k, v in rotulos) + "}"
+
+METRICAS = RegistroMetricas()
+
+# --- ENDPOINT /metrics (para o Prometheus coletar) ---
+# Escuta só em 127.0.0.1 por padrão; um coletor em outra máquina precisa de METRICAS_HOST (ex.: "0.0.0.0")
+HOST_METRICAS_PADRAO = "127.0.0.1"
+
+def criar_servidor_metricas(porta, host=HOST_METRICAS_PADRAO, caminho="/metrics", registro=METRICAS):
+    class ManipuladorMetricas(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0].rstrip("/") != caminho.rstrip("/"):
+                self.send_error(404); return
+            corpo = registro.exportar_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, formato, *args): pass # Uma coleta a cada poucos segundos encheria o log
+
+    return ThreadingHTTPServer((host, porta), ManipuladorMetricas)
+
+def iniciar_servidor_metricas_em_thread(porta, **kwargs):
+    servidor = criar_servidor_metricas(porta, **kwargs)
+    threading.Thread(target=servidor.serve_forever, name="metricas", daemon=True).start()
+    return servidor
@@ -0,0 +1,156 @@
+import threading
+import time as py_time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from agendador import AgendadorAdaptativo, OrcamentoRequisicoes
+from config import ler_segredo
+from ecowitt import fetch_real_ecowitt_data, montar_dados_completos
+from historico import ESTACAO_PADRAO
+from metricas import METRICAS
+
+# --- POLLER COMPARTILHADO (consultas agendadas para todo o processo) ---
+# Uma única thread por processo consulta a Ecowitt e publica o último registro de cada estação para
+# todas as sessões. Quando consultar cada estação é decidido pelo AgendadorAdaptativo (mais vezes perto
+# dos limites de Delta T e vento, menos com leituras estáveis ou sem ninguém olhando, backoff em falhas).
+# As estações que vencem juntas são buscadas em paralelo (pool de threads e uma sessão HTTP com conexões
+# reaproveitadas), cada uma com seu próprio timeout, e o resultado de cada uma é publicado assim que chega.
+# Toda consulta gasta uma ficha do orçamento da chave da API da estação (a do registro de estações ou a
+# global); sem saldo, a estação é adiada.
+# Pedidos manuais simultâneos são agrupados: quem pede durante uma busca em andamento da mesma estação
+# apenas espera o resultado dela, sem disparar outra chamada à API.
+class PollerEstacao:
+    def __init__(self, intervalo_segundos, timezone, historico=None, estacoes=None, timeout_estacao=15, max_paralelo=8,
+                 agendador=None, requisicoes_por_minuto=30, alertas=None):
+        self.intervalo_segundos = intervalo_segundos
+        self.timezone = timezone
+        self.historico = historico # HistoricoEstacao onde cada leitura é gravada uma única vez
+        self.estacoes = estacoes or [{"id": ESTACAO_PADRAO, "mac": None}]
+        self.timeout_estacao = timeout_estacao
+        self.agendador = agendador or AgendadorAdaptativo(intervalo_base=intervalo_segundos)
+        self.requisicoes_por_minuto = requisicoes_por_minuto
+        self.alertas = alertas # MotorAlertas que avalia cada leitura nova (opcional)
+        self.ultimo_registro = {}   # id da estação -> último registro
+        self.ultima_atualizacao = {}
+        self.ultimo_erro = {}       # id da estação -> mensagens da última tentativa (None se ela deu certo)
+        self.geracao = 0            # Incrementada a cada rodada de buscas concluída (com ou sem sucesso)
+        self._cond = threading.Condition()
+        self._em_andamento = set()  # Estações da rodada em execução
+        self._pedidos_manuais = set()
+        self._orcamentos = {}       # Chave da API -> OrcamentoRequisicoes (compartilhado pelas estações da chave)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, min(max_paralelo, len(self.estacoes))), thread_name_prefix="poller-estacao")
+        self._sessao = requests.Session()
+        self._sessao.mount("http://", HTTPAdapter(pool_maxsize=max_paralelo))
+        self._sessao.mount("https://", HTTPAdapter(pool_maxsize=max_paralelo))
+        self._thread = threading.Thread(target=self._loop, name="poller-ecowitt", daemon=True)
+        self._thread.start()
+
+    def _ids(self):
+        return [estacao["id"] for estacao in self.estacoes]
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                espera = self.agendador.segundos_ate_proxima(self._ids())
+                if not self._pedidos_manuais and espera > 0:
+                    self._cond.wait(timeout=espera) # Acorda antes com pedido manual ou estação voltando a ser vista
+                ids = set(self.agendador.devidas(self._ids())) | self._pedidos_manuais
+                self._pedidos_manuais.clear()
+                if not ids: continue
+                self._em_andamento = ids
+            try: self._executar_busca(ids)
+            except Exception as e: # A thread não pode morrer: a rodada é descartada e as estações voltam no intervalo normal
+                print(f"Erro inesperado na rodada do poller: {e}")
+                METRICAS.contar("poller_erros_total")
+                for estacao_id in ids: self.agendador.adiar(estacao_id, py_time.monotonic() + self.intervalo_segundos)
+
+    # Mesma chave usada na busca: a da estação no registro ou, sem ela, ECOWITT_API_KEY
+    def _orcamento(self, estacao):
+        chave = estacao.get("api_key") or ler_segredo("ECOWITT_API_KEY") or ""
+        with self._cond:
+            if chave not in self._orcamentos: self._orcamentos[chave] = OrcamentoRequisicoes(self.requisicoes_por_minuto)
+            return self._orcamentos[chave]
+
+    def _buscar_estacao(self, estacao):
+        erros = []
+        registro = None
+        try:
+            dados_ecowitt = fetch_real_ecowitt_data(reportar_erro=erros.append, mac_address=estacao.get("mac"),
+                                                    sessao=self._sessao, timeout=self.timeout_estacao,
+                                                    api_key=estacao.get("api_key"), app_key=estacao.get("app_key"))
+            if dados_ecowitt is not None:
+                registro = montar_dados_completos(dados_ecowitt, datetime.now(self.timezone))
+                if self.historico is not None:
+                    try: self.historico.salvar(registro, estacao["id"])
+                    except Exception as e: print(f"Erro ao gravar leitura no histórico: {e}") # A leitura ainda é publicada
+                if self.alertas is not None: self.alertas.processar(registro, estacao["id"])
+        except Exception as e: # A thread não pode morrer por causa de uma falha isolada
+            erros.append(f"Erro inesperado no poller da estação: {e}")
+        return registro, erros
+
+    def _publicar(self, estacao_id, registro, erros):
+        with self._cond:
+            if registro is not None:
+                self.ultimo_registro[estacao_id] = registro
+                self.ultima_atualizacao[estacao_id] = datetime.fromisoformat(registro["timestamp"])
+                self.ultimo_erro[estacao_id] = None
+            else:
+                self.ultimo_erro[estacao_id] = erros or ["Não foi possível buscar dados reais da estação."]
+            self._cond.notify_all()
+
+    def _executar_busca(self, ids):
+        futuros = {}
+        try:
+            for estacao in self.estacoes:
+                if estacao["id"] not in ids: continue
+                espera = self._orcamento(estacao).consumir()
+                if espera: # Sem saldo: não conta como falha, só adia
+                    self.agendador.adiar(estacao["id"], py_time.monotonic() + espera)
+                    METRICAS.contar("poller_orcamento_esgotado_total")
+                    self._publicar(estacao["id"], None, [f"Limite de requisições à API atingido; nova consulta em {espera:.0f} s."])
+                    continue
+                futuros[self._executor.submit(self._buscar_estacao, estacao)] = estacao["id"]
+            for futuro in as_completed(futuros):
+                estacao_id = futuros[futuro]
+                registro, erros = futuro.result()
+                self._publicar(estacao_id, registro, erros)
+                if registro is not None: self.agendador.registrar_sucesso(estacao_id, registro)
+                else: self.agendador.registrar_falha(estacao_id)
+        finally: # Mesmo com erro, quem espera pela rodada (forcar_atualizacao, aguardar_estacao) é liberado
+            with self._cond:
+                self.geracao += 1
+                self._em_andamento = set()
+                self._cond.notify_all()
+
+    def estado(self, estacao_id=ESTACAO_PADRAO):
+        with self._cond:
+            return (self.geracao, self.ultimo_registro.get(estacao_id),
+                    self.ultima_atualizacao.get(estacao_id), self.ultimo_erro.get(estacao_id))
+
+    # Horário previsto da próxima consulta da estação (para exibir no painel)
+    def proxima_consulta(self, estacao_id=ESTACAO_PADRAO):
+        return datetime.now(self.timezone) + timedelta(seconds=self.agendador.segundos_ate(estacao_id))
+
+    # Chamado a cada exibição da estação; uma estação ociosa que volta a ser vista é reagendada na hora
+    def registrar_visualizacao(self, estacao_id=ESTACAO_PADRAO):
+        if self.agendador.registrar_visualizacao(estacao_id):
+            with self._cond: self._cond.notify_all()
+
+    # Espera só a primeira tentativa da estação pedida, sem aguardar as demais da rodada
+    def aguardar_estacao(self, estacao_id=ESTACAO_PADRAO, timeout=20):
+        with self._cond:
+            return self._cond.wait_for(lambda: estacao_id in self.ultimo_erro or self.geracao > 0, timeout=timeout)
+
+    def forcar_atualizacao(self, timeout=30, estacao_id=ESTACAO_PADRAO):
+        with self._cond:
+            if estacao_id in self._em_andamento:
+                alvo = self.geracao + 1 # Aproveita a busca em andamento
+            else:
+                self._pedidos_manuais.add(estacao_id)
+                alvo = self.geracao + (2 if self._em_andamento else 1) # Entra na rodada seguinte à atual
+                self._cond.notify_all()
+            concluiu = self._cond.wait_for(lambda: self.geracao >= alvo, timeout=timeout)
+            return concluiu and self.ultimo_erro.get(estacao_id) is None
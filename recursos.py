@@ -0,0 +1,68 @@
+import glob
+import hashlib
+import os
+import threading
+from io import BytesIO
+from urllib.parse import urlsplit
+
+import requests
+from PIL import Image
+
+# --- RECURSOS ESTÁTICOS (logo, gráfico base, ícone) COM CACHE EM DISCO ---
+# Ordem de busca: pasta `estaticos/` distribuída junto com o app (arquivo com o mesmo nome do fim da URL),
+# depois o cache em disco e só então o download. No cache cada arquivo se chama <hash da URL>-<sha256 do
+# conteúdo>; a leitura confere o sha256, então um arquivo truncado ou corrompido é descartado e baixado
+# de novo. Assim só o primeiro início da máquina paga o download, e não cada reinício do processo.
+DIR_RAIZ = os.path.dirname(os.path.abspath(__file__))
+DIR_EMBUTIDO = os.path.join(DIR_RAIZ, "estaticos")
+DIR_CACHE_PADRAO = os.path.join(DIR_RAIZ, "dados", "recursos")
+
+def _chave_url(url):
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+
+def _ler_embutido(url):
+    nome = os.path.basename(urlsplit(url).path)
+    caminho = os.path.join(DIR_EMBUTIDO, nome)
+    if not nome or not os.path.isfile(caminho): return None
+    with open(caminho, "rb") as f:
+        return f.read()
+
+def _ler_do_cache(dir_cache, url):
+    for caminho in glob.glob(os.path.join(dir_cache, _chave_url(url) + "-*")):
+        if caminho.endswith(".tmp"): continue
+        try:
+            with open(caminho, "rb") as f: conteudo = f.read()
+        except OSError:
+            continue
+        if hashlib.sha256(conteudo).hexdigest() == os.path.basename(caminho).split("-", 1)[1]:
+            return conteudo
+        try: os.remove(caminho) # Conteúdo não confere com o hash do nome: descarta
+        except OSError: pass
+    return None
+
+def _gravar_no_cache(dir_cache, url, conteudo):
+    # Grava em arquivo temporário e renomeia: outro processo nunca enxerga um arquivo pela metade
+    try:
+        os.makedirs(dir_cache, exist_ok=True)
+        destino = os.path.join(dir_cache, f"{_chave_url(url)}-{hashlib.sha256(conteudo).hexdigest()}")
+        temporario = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporario, "wb") as f: f.write(conteudo)
+        os.replace(temporario, destino)
+    except OSError as e:
+        print(f"Não foi possível gravar {url} no cache de recursos: {e}")
+
+def _decodificar(conteudo):
+    imagem = Image.open(BytesIO(conteudo))
+    imagem.load() # Decodifica agora, e não na primeira vez que a imagem for desenhada
+    return imagem
+
+# Levanta exceção quando a imagem não está em disco e não pode ser baixada (ou não é uma imagem válida)
+def carregar_imagem(url, dir_cache=DIR_CACHE_PADRAO, timeout=10, headers=None):
+    conteudo = _ler_embutido(url) or _ler_do_cache(dir_cache, url)
+    if conteudo is not None:
+        return _decodificar(conteudo)
+    resposta = requests.get(url, timeout=timeout, headers=headers)
+    resposta.raise_for_status()
+    imagem = _decodificar(resposta.content) # Só vai para o cache o que decodifica como imagem
+    _gravar_no_cache(dir_cache, url, resposta.content)
+    return imagem
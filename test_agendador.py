@@ -0,0 +1,113 @@
+import pytest
+
+import agendador
+import poller
+from agendador import AgendadorAdaptativo, OrcamentoRequisicoes
+from conftest import TIMEZONE
+from poller import PollerEstacao
+
+# Intervalos pequenos e redondos: base 300 s, entre 60 e 900 s, ocioso até 900 s
+def novo_agendador(**kwargs):
+    return AgendadorAdaptativo(**{"intervalo_base": 300, "intervalo_min": 60, "intervalo_max": 900, "fator_estavel": 1.5,
+                                  "fator_ocioso": 3, "intervalo_ocioso": 900, "janela_visualizacao": 120, **kwargs})
+
+LONGE = {"delta_t_c": 5.0, "wind_speed_kmh": 7.0} # A mais de uma margem de todos os limites
+
+# --- Proximidade dos limites de Delta T e vento ---
+@pytest.mark.parametrize("registro, intervalo", [
+    (LONGE, 300),
+    ({"delta_t_c": 8.0, "wind_speed_kmh": 7.0}, 60),   # Em cima do limite de Delta T
+    ({"delta_t_c": 7.5, "wind_speed_kmh": 7.0}, 180),  # Meia margem: metade do caminho entre mínimo e base
+    ({"delta_t_c": 1.0, "wind_speed_kmh": 7.0}, 300),  # Exatamente a uma margem (2 °C)
+    ({"delta_t_c": 5.0, "wind_speed_kmh": 12.0}, 60),  # Em cima do limite de vento
+    ({"delta_t_c": 5.0, "wind_speed_kmh": 3.5}, 120),  # A 1/4 da margem de vento
+    ({"delta_t_c": 9.9, "wind_speed_kmh": 2.0}, 60 + 240 * 0.1), # Vale o limite mais próximo
+    ({"delta_t_c": None, "wind_speed_kmh": None}, 300),
+])
+def test_intervalo_pela_proximidade_dos_limites(registro, intervalo):
+    assert novo_agendador().registrar_sucesso("e", registro, agora=0) == pytest.approx(intervalo)
+
+@pytest.mark.parametrize("invalido", ["--", "", float("nan"), True])
+def test_valores_nao_numericos_sao_ignorados(invalido):
+    agenda = novo_agendador()
+    assert agenda.registrar_sucesso("e", {"delta_t_c": 8.0, "wind_speed_kmh": invalido}, agora=0) == 60 # Só o Delta T conta
+    assert agenda.registrar_sucesso("e", {"delta_t_c": invalido, "wind_speed_kmh": invalido}, agora=10) == 300
+    assert agenda.registrar_sucesso("e", {"delta_t_c": invalido, "wind_speed_kmh": invalido}, agora=20) == 300 # Não conta como estável
+
+# --- Leituras estáveis longe dos limites ---
+def test_estabilidade_alonga_o_intervalo_ate_o_maximo():
+    agenda = novo_agendador()
+    obtidos = [agenda.registrar_sucesso("e", {"delta_t_c": 5.0 + 0.1 * (i % 2), "wind_speed_kmh": 7.0}, agora=i * 1000) for i in range(6)]
+    assert obtidos == pytest.approx([300, 450, 675, 900, 900, 900])
+    assert agenda.registrar_sucesso("e", {"delta_t_c": 5.5, "wind_speed_kmh": 7.0}, agora=7000) == 300 # Variação >= 0,3 °C: recomeça
+    assert agenda.registrar_sucesso("e", {"delta_t_c": 5.5, "wind_speed_kmh": 8.5}, agora=8000) == 300 # Vento >= 1 km/h também
+
+# --- Sessões olhando a estação ---
+def test_estacao_ociosa_espera_mais_e_volta_na_hora_ao_ser_vista():
+    agenda = novo_agendador()
+    assert agenda.devidas(["e"], agora=0) == ["e"] # Nunca consultada
+    assert agenda.registrar_visualizacao("e", agora=0) # Primeira visualização: estava ociosa
+    agenda.registrar_sucesso("e", LONGE, agora=0)
+    assert agenda.segundos_ate("e", agora=100) == 200 # Vista há 100 s: intervalo normal
+    assert agenda.segundos_ate("e", agora=150) == 750 # Ninguém olha há mais de 120 s: 300 × 3
+    assert agenda.devidas(["e"], agora=400) == []
+    assert agenda.registrar_visualizacao("e", agora=400) # Voltou a ser vista: já venceu
+    assert agenda.devidas(["e"], agora=400) == ["e"]
+    assert not agenda.registrar_visualizacao("e", agora=450)
+
+def test_fator_ocioso_respeita_o_teto_sem_encurtar_intervalos_longos():
+    agenda = novo_agendador(intervalo_ocioso=600)
+    agenda.registrar_sucesso("e", LONGE, agora=0)
+    assert agenda.segundos_ate("e", agora=0) == 600 # min(300 × 3, 600)
+    agenda = novo_agendador(intervalo_base=800, intervalo_ocioso=600)
+    agenda.registrar_sucesso("e", LONGE, agora=0)
+    assert agenda.segundos_ate("e", agora=0) == 800 # Nunca menor que o intervalo normal
+
+# --- Falhas ---
+def test_backoff_exponencial_com_jitter(monkeypatch):
+    agenda = novo_agendador(backoff_base=30, backoff_max=900)
+    sorteios = []
+    monkeypatch.setattr(agendador.random, "uniform", lambda a, b: sorteios.append((a, b)) or b) # Jitter no máximo
+    esperas = [agenda.registrar_falha("e", agora=i * 10_000) for i in range(7)]
+    assert esperas == [30, 60, 120, 240, 480, 900, 900]
+    assert sorteios == [(0, e / 2) for e in esperas] # Metade fixa, metade sorteada
+    assert agenda.segundos_ate("e", agora=60_000) == 900
+    agenda.registrar_sucesso("e", LONGE, agora=70_000)
+    agenda.registrar_visualizacao("e", agora=70_000)
+    assert agenda.segundos_ate("e", agora=70_000) == 300 # Sucesso zera o backoff
+
+def test_jitter_fica_entre_metade_e_o_total():
+    agenda = novo_agendador(backoff_base=40, backoff_max=900)
+    esperas = [AgendadorAdaptativo.registrar_falha(agenda, f"e{i}", agora=0) for i in range(200)]
+    assert all(20 <= e <= 40 for e in esperas) and len(set(esperas)) > 1
+
+def test_adiar_vale_mesmo_para_estacao_devida():
+    agenda = novo_agendador()
+    agenda.adiar("e", 50)
+    assert agenda.devidas(["e", "f"], agora=0) == ["f"]
+    assert agenda.segundos_ate_proxima(["e"], agora=20) == 30
+
+# --- Orçamento de requisições ---
+def test_orcamento_consome_a_rajada_e_repoe_pela_taxa():
+    orcamento = OrcamentoRequisicoes(30, rajada=3, agora=0) # Uma ficha a cada 2 s
+    assert [orcamento.consumir(agora=0) for _ in range(3)] == [0, 0, 0]
+    assert orcamento.consumir(agora=0) == pytest.approx(2.0) # Sem saldo: espera, sem consumir
+    assert orcamento.consumir(agora=1) == pytest.approx(1.0)
+    assert orcamento.consumir(agora=2) == 0
+    assert orcamento.saldo(agora=100) == 3 # Acumula só até a rajada
+    assert orcamento.consumir(fichas=2, agora=100) == 0 and orcamento.saldo(agora=100) == pytest.approx(1)
+
+def test_orcamento_sem_taxa_nunca_repoe():
+    orcamento = OrcamentoRequisicoes(0, rajada=1, agora=0)
+    assert orcamento.consumir(agora=0) == 0
+    assert orcamento.consumir(agora=1e6) == float("inf")
+
+# --- Poller: uma leitura com texto no lugar do vento não derruba a thread ---
+def test_poller_sobrevive_a_leitura_com_texto(monkeypatch):
+    monkeypatch.setattr(poller, "fetch_real_ecowitt_data", lambda **kwargs: {
+        "temperature_superior_c": 25.0, "humidity_percent": 50.0, "wind_speed_kmh": "--"})
+    instancia = PollerEstacao(300, TIMEZONE, requisicoes_por_minuto=600)
+    assert instancia.aguardar_estacao(timeout=10)
+    assert instancia.forcar_atualizacao(timeout=10) # A thread continua atendendo
+    assert instancia._thread.is_alive()
+    assert instancia.estado()[1]["wind_speed_kmh"] == "--"
@@ -0,0 +1,32 @@
+import time as py_time
+from datetime import datetime, timedelta
+
+from alertas import MotorAlertas, NotificadorWebhook, criar_receptor_webhook, descrever_transicao, regras_padrao
+from conftest import TIMEZONE
+
+INICIO = TIMEZONE.localize(datetime(2026, 1, 1, 8))
+
+# Leituras de Delta T a cada 5 min
+def leituras(valores):
+    return [{"timestamp": (INICIO + timedelta(minutes=5 * i)).isoformat(), "delta_t_c": valor} for i, valor in enumerate(valores)]
+
+def test_histerese_e_duracao_minima_geram_uma_unica_notificacao(servidor_local, capsys):
+    receptor = servidor_local(criar_receptor_webhook(0), "/")
+    motor = MotorAlertas(regras=regras_padrao(duracao_min=600)[:1], notificadores=[NotificadorWebhook(receptor, tentativas=1)])
+    valores = [7.0,                 # Condição inicial ADEQUADA: vale na hora, sem notificar
+               8.2, 8.3, 8.4, 8.3,  # 15 min acima de 8 °C, mas dentro da histerese de 0,5 °C
+               7.9, 9.0, 7.5,       # Passa do limite por uma leitura só: não dura os 10 min
+               9.0, 9.1, 9.0,       # Mantém-se em ATENÇÃO por 10 min: confirmada
+               7.8, 7.9, 7.7]       # 10 min abaixo de 8 °C, só dentro da histerese: continua ATENÇÃO
+    transicoes = [t for registro in leituras(valores) for t in motor.processar(registro, "estacao_teste")]
+    assert [(t["de"], t["para"], t["nivel"]) for t in transicoes] == [("ADEQUADA", "ATENÇÃO", "alerta")]
+    assert transicoes[0]["horario"] == leituras(valores)[10]["timestamp"]
+
+    recebidas, limite = [], py_time.monotonic() + 5
+    while not recebidas and py_time.monotonic() < limite: # A notificação sai numa thread própria
+        py_time.sleep(0.05)
+        recebidas = capsys.readouterr().out.splitlines()
+    py_time.sleep(0.3)
+    recebidas += capsys.readouterr().out.splitlines()
+    assert recebidas == [descrever_transicao(transicoes[0])]
+    assert motor.alertas_ativos("estacao_teste") == {"delta_t": "ATENÇÃO"}
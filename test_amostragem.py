@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from amostragem import agregar_em_baldes, lttb, reduzir_lttb
+
+# Série irregular como a do histórico (índice em ns, como em _para_dataframe): leituras a cada ~5 min, buracos de horas e NaN
+def serie_irregular(n, semente=0):
+    rng = np.random.default_rng(semente)
+    passos = rng.choice([300, 300, 300, 290, 310, 3 * 3600], size=n)
+    indice = pd.DatetimeIndex(pd.Timestamp("2026-01-01", tz="America/Sao_Paulo") + pd.to_timedelta(np.cumsum(passos), unit="s")).as_unit("ns")
+    valores = 6 + np.cumsum(rng.normal(0, 0.3, n))
+    valores[rng.random(n) < 0.02] = np.nan
+    return pd.DataFrame({"delta_t_c": valores, "outra": np.arange(n)}, index=indice)
+
+@pytest.mark.parametrize("n, n_saida", [(1000, 100), (1000, 3), (257, 200), (50, 50), (50, 80), (10, 2)])
+def test_lttb_mantem_extremos_e_limita_o_tamanho(n, n_saida):
+    y = np.random.default_rng(n).normal(size=n)
+    indices = lttb(np.arange(n) * 300, y, n_saida)
+    esperado = n if n_saida >= n or n_saida < 3 else n_saida
+    assert len(indices) == esperado
+    assert indices[0] == 0 and indices[-1] == n - 1
+    assert (np.diff(indices) > 0).all() # Um ponto por balde, em ordem
+
+def test_lttb_preserva_um_pico_isolado():
+    y = np.zeros(1000); y[637] = 15.0
+    assert 637 in lttb(np.arange(1000), y, 50)
+
+def test_reduzir_lttb_devolve_linhas_reais():
+    df = serie_irregular(2000)
+    reduzido = reduzir_lttb(df, "delta_t_c", 150)
+    validos = df.dropna(subset=["delta_t_c"])
+    assert len(reduzido) == 150
+    assert reduzido.index[0] == validos.index[0] and reduzido.index[-1] == validos.index[-1]
+    pd.testing.assert_frame_equal(reduzido, validos.loc[reduzido.index]) # Linhas inteiras, sem interpolar
+    assert reduzir_lttb(df.iloc[:100], "delta_t_c", 150).equals(df.iloc[:100].dropna(subset=["delta_t_c"]))
+
+@pytest.mark.parametrize("max_pontos", [1, 7, 120, 5000])
+def test_agregar_em_baldes_igual_ao_groupby(max_pontos):
+    df = serie_irregular(3000, semente=max_pontos)
+    agregado = agregar_em_baldes(df, "delta_t_c", max_pontos)
+    serie = df["delta_t_c"].dropna()
+    assert len(agregado) <= max_pontos
+
+    largura = pd.Timedelta((serie.index[-1] - serie.index[0]) // max_pontos + pd.Timedelta(1, "ns"))
+    grupos = serie.groupby(pd.Grouper(freq=largura, origin="start")) # Baldes de tempo iguais a partir da 1ª leitura
+    referencia = pd.DataFrame({"min": grupos.min(), "media": grupos.mean(), "max": grupos.max(),
+                               "primeira": serie.index.to_series().groupby(pd.Grouper(freq=largura, origin="start")).min()}).dropna()
+    np.testing.assert_allclose(agregado["delta_t_c_min"], referencia["min"])
+    np.testing.assert_allclose(agregado["delta_t_c"], referencia["media"])
+    np.testing.assert_allclose(agregado["delta_t_c_max"], referencia["max"])
+    assert (agregado.index == pd.DatetimeIndex(referencia["primeira"])).all() # Horário da primeira leitura de cada balde
+
+def test_agregar_em_baldes_sem_dados():
+    vazio = agregar_em_baldes(pd.DataFrame({"delta_t_c": [np.nan]}, index=pd.DatetimeIndex(["2026-01-01"])), "delta_t_c", 10)
+    assert vazio.empty and list(vazio.columns) == ["delta_t_c_min", "delta_t_c", "delta_t_c_max"]
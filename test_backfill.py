@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+
+import backfill
+from backfill import criar_api_historico_falsa, executar_backfill
+from conftest import TIMEZONE
+
+INICIO = TIMEZONE.localize(datetime(2026, 1, 1))
+DIAS = 4
+LEITURAS_POR_DIA = 288 # Ciclo de 5 min
+BUSCAR_BLOCO = backfill.buscar_bloco
+
+# Repassa para o buscar_bloco real, anotando o início de cada bloco pedido; a partir de `falhar_desde` a "conexão cai"
+def espionar_buscas(monkeypatch, falhar_desde=None):
+    pedidos = []
+    def buscar(sessao, api_url, credenciais, mac, inicio, fim, ciclo, **kwargs):
+        pedidos.append(inicio)
+        if falhar_desde is not None and inicio >= falhar_desde: raise backfill.ErroBackfill("conexão interrompida")
+        return BUSCAR_BLOCO(sessao, api_url, credenciais, mac, inicio, fim, ciclo, **kwargs)
+    monkeypatch.setattr(backfill, "buscar_bloco", buscar)
+    return pedidos
+
+def test_backfill_interrompido_retoma_do_checkpoint(tmp_path, monkeypatch, historico, servidor_local):
+    api_falsa = servidor_local(criar_api_historico_falsa(TIMEZONE), "/api/v3", em_thread=False)
+    parametros = dict(historico=historico, estacao_id="estacao_teste", mac="00:00:00:00:00:00", inicio=INICIO,
+                      fim=INICIO + timedelta(days=DIAS), credenciais={"api_key": "local", "app_key": "local"}, api_url=api_falsa,
+                      dir_checkpoints=str(tmp_path / "checkpoints"), reportar=lambda mensagem: None)
+
+    interrupcao = INICIO + timedelta(days=2)
+    espionar_buscas(monkeypatch, falhar_desde=interrupcao)
+    total, falhas = executar_backfill(**parametros)
+    assert (total, falhas) == (2 * LEITURAS_POR_DIA, 2)
+    assert (tmp_path / "checkpoints" / "estacao_teste.json").exists()
+
+    pedidos = espionar_buscas(monkeypatch)
+    total, falhas = executar_backfill(**parametros)
+    assert (total, falhas) == (2 * LEITURAS_POR_DIA, 0)
+    assert sorted(pedidos) == [interrupcao, interrupcao + timedelta(days=1)] # Só os blocos que faltavam
+    assert len(historico.consultar(estacao="estacao_teste")) == DIAS * LEITURAS_POR_DIA
+
+    pedidos = espionar_buscas(monkeypatch)
+    assert executar_backfill(**parametros) == (0, 0)
+    assert pedidos == []
@@ -0,0 +1,105 @@
+import math
+import time as py_time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from buffer_leituras import COLUNAS_FLOAT, BufferLeituras
+from conftest import TIMEZONE, leituras_aleatorias
+from historico import HistoricoIncremental
+
+def como_dataframe(leituras):
+    df = leituras.set_index("ts")
+    df.index = pd.DatetimeIndex(pd.to_datetime(df.index, unit="s", utc=True).as_unit("ns").tz_convert(TIMEZONE), name="timestamp_dt")
+    return df
+
+# Mesmo conteúdo, com as medições em float32 (como ficam no buffer) e os textos fora das categorias como NaN
+def comparar(obtido, esperado):
+    assert len(obtido) == len(esperado)
+    assert (obtido.index == esperado.index).all()
+    for coluna in COLUNAS_FLOAT:
+        if coluna in esperado:
+            np.testing.assert_allclose(obtido[coluna].to_numpy(np.float64), esperado[coluna].to_numpy(np.float64), rtol=1e-6, equal_nan=True)
+    for coluna in ("condition_text", "wind_direction"):
+        assert obtido[coluna].astype(object).where(obtido[coluna].notna(), None).tolist() == \
+               esperado[coluna].astype(object).where(esperado[coluna].notna(), None).tolist()
+
+# --- BufferLeituras ---
+def test_anexar_alem_da_capacidade_mantem_as_ultimas_em_views_contiguas():
+    capacidade = 50
+    df = como_dataframe(leituras_aleatorias(1_700_000_000, 800))
+    buffer = BufferLeituras(capacidade, folga=7)
+    rng = np.random.default_rng(1)
+    gravadas = 0
+    for tamanho in [1, 3, 49, 50, 51, 120, 7, 8, 2, 57] + rng.integers(1, 70, size=20).tolist(): # Pedaços que cruzam o fim dos slots
+        buffer.anexar_dataframe(df.iloc[gravadas:gravadas + tamanho])
+        gravadas = min(gravadas + tamanho, len(df))
+        esperado = df.iloc[:gravadas].iloc[-capacidade:]
+        assert len(buffer) == len(esperado)
+        assert (buffer.primeiro_ts, buffer.ultimo_ts) == (int(esperado.index[0].timestamp()), int(esperado.index[-1].timestamp()))
+        comparar(buffer.para_dataframe(timezone=TIMEZONE), esperado)
+
+        visao = buffer.colunas()
+        for arr in visao.values():
+            assert not arr.flags.owndata and arr.flags.c_contiguous and len(arr) == len(esperado) # Views, sem concatenar
+        tabela = buffer.para_dataframe(timezone=TIMEZONE)
+        assert np.shares_memory(tabela["delta_t_c"].to_numpy(), visao["delta_t_c"]) # Colunas numéricas sem cópia
+
+        k = int(rng.integers(1, capacidade + 5))
+        comparar(buffer.para_dataframe(ultimas=k, timezone=TIMEZONE), esperado.iloc[-k:])
+        a, b = sorted(rng.integers(int(esperado.index[0].timestamp()) - 600, int(esperado.index[-1].timestamp()) + 600, size=2).tolist())
+        segundos = esperado.index.as_unit("s").asi8
+        comparar(buffer.para_dataframe(a, b, timezone=TIMEZONE), esperado[(segundos >= a) & (segundos < b)])
+
+def test_view_entregue_continua_valida_durante_a_folga():
+    df = como_dataframe(leituras_aleatorias(1_700_000_000, 100))
+    buffer = BufferLeituras(20, folga=5)
+    buffer.anexar_dataframe(df.iloc[:37])
+    visao = buffer.colunas(ultimas=20)
+    copia = {chave: arr.copy() for chave, arr in visao.items()}
+    for i in range(37, 42): # `folga` gravações depois, uma por vez
+        buffer.anexar_dataframe(df.iloc[i:i + 1])
+    for chave, arr in visao.items():
+        np.testing.assert_array_equal(arr, copia[chave])
+
+# --- HistoricoIncremental x HistoricoEstacao.consultar_dataframe ---
+def consulta_direta(historico, inicio, fim):
+    return historico.consultar_dataframe(inicio_ts=math.ceil(inicio.timestamp()), fim_ts=math.floor(fim.timestamp()) + 1)
+
+@pytest.fixture
+def historico_recente(historico):
+    agora = int(py_time.time())
+    leituras = leituras_aleatorias(agora - 5 * 86400, 2000, semente=7)
+    historico.salvar_lote(leituras[leituras["ts"] < agora - 3600]) # Termina uma hora atrás; o resto chega depois
+    return historico, leituras[leituras["ts"] < agora]
+
+def periodos(rng, n=25):
+    agora = datetime.now(TIMEZONE)
+    for _ in range(n):
+        a, b = sorted(rng.uniform(-6 * 86400, 600, size=2))
+        yield agora + timedelta(seconds=a), agora + timedelta(seconds=b)
+    meia_noite = agora.replace(hour=0, minute=0, second=0, microsecond=0)
+    yield meia_noite - timedelta(days=1), meia_noite # Virada de dia local exata
+    yield agora - timedelta(days=2, seconds=0.5), agora
+
+def test_intervalo_igual_a_consulta_direta(historico_recente):
+    historico, leituras = historico_recente
+    janela = HistoricoIncremental(historico, janela=timedelta(days=3), capacidade=5000, verificar_a_cada=0)
+    rng = np.random.default_rng(3)
+    for inicio, fim in periodos(rng):
+        comparar(janela.intervalo(inicio, fim), consulta_direta(historico, inicio, fim))
+
+    historico.salvar_lote(leituras[leituras["ts"] >= int(py_time.time()) - 3600]) # Leituras novas: só anexa
+    lacuna = leituras_aleatorias(int(py_time.time()) - 2 * 86400 + 7, 30, semente=9)
+    historico.salvar_lote(lacuna[~lacuna["ts"].isin(leituras["ts"])]) # Backfill no meio da janela: recarrega
+    for inicio, fim in periodos(rng):
+        comparar(janela.intervalo(inicio, fim), consulta_direta(historico, inicio, fim))
+
+def test_ultimos_completa_pelo_sqlite_quando_a_janela_e_curta(historico_recente):
+    historico, _ = historico_recente
+    todas = historico.consultar_dataframe()
+    for janela in (timedelta(days=3), timedelta(minutes=30)): # Na segunda, a janela não tem leituras suficientes
+        ultimos = HistoricoIncremental(historico, janela=janela).ultimos(40)
+        comparar(ultimos, todas.iloc[::-1].iloc[:40])
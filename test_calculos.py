@@ -0,0 +1,45 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculos import arredondar_lote, calcular_delta_t_dataframe
+from conftest import TIMEZONE
+from ecowitt import montar_dados_completos
+
+COLUNAS_DERIVADAS = ["wet_bulb_c", "delta_t_c", "condition_text", "condition_description", "dew_point_c", "feels_like_c"]
+
+# Grade como a dos sensores (0,1 °C × 1 %), bordas e linhas fora da faixa, NaN e entradas que caem num empate de
+# arredondamento (ponto de orvalho e sensação térmica = 0,35, 2,675...: np.round e round() divergem nelas)
+def entradas():
+    t, rh = np.meshgrid(np.round(np.arange(-1.0, 52.0, 0.1), 1), np.arange(-2.0, 103.0, 1.0), indexing="ij")
+    extras = [(0.0, 0.0), (50.0, 100.0), (-0.1, 50.0), (50.1, 50.0), (25.0, -0.5), (25.0, 100.5), (np.nan, 50.0), (25.0, np.nan),
+              (0.35, 100.0), (2.675, 100.0), (10.35, 30.0), (1.15, 30.0), (20.45, 100.0)]
+    return pd.DataFrame({"temperature_superior_c": np.concatenate([t.ravel(), [a for a, _ in extras]]),
+                         "humidity_percent": np.concatenate([rh.ravel(), [b for _, b in extras]])})
+
+def test_lote_identico_ao_caminho_escalar():
+    df = entradas()
+    lote = calcular_delta_t_dataframe(df)
+    agora = TIMEZONE.localize(pd.Timestamp("2026-01-01 12:00").to_pydatetime())
+    escalar = pd.DataFrame([montar_dados_completos({"temperature_superior_c": t, "humidity_percent": rh}, agora)
+                            for t, rh in zip(df["temperature_superior_c"].tolist(), df["humidity_percent"].tolist())])
+    for coluna in COLUNAS_DERIVADAS:
+        esperado = escalar[coluna].tolist()
+        obtido = lote[coluna].tolist()
+        divergentes = [(i, e, o) for i, (e, o) in enumerate(zip(esperado, obtido))
+                       if not (e == o or (pd.isna(e) and pd.isna(o)))] # Inválidas: None no escalar, NaN/None no lote
+        assert divergentes[:5] == [], coluna
+    # O que o teste precisa ter coberto
+    assert set(lote["condition_text"]) == {"INADEQUADA", "ADEQUADA", "ATENÇÃO", "ARRISCADA", "ERRO CÁLCULO"}
+    assert lote.loc[lote["condition_text"] == "ATENÇÃO", "condition_description"].str.match(r"Condição limite \(Delta T \d+\.\d°C\)\.").all()
+    assert lote["condition_description"][lote["condition_text"] == "ERRO CÁLCULO"].isna().all()
+    empate = lote["dew_point_c"][(df["temperature_superior_c"] == 0.35) & (df["humidity_percent"] == 100.0)].item()
+    assert empate == round(0.35, 1) != np.round(0.35, 1) # Orvalho = 0,35 exato: aqui o np.round sozinho erraria
+
+@pytest.mark.parametrize("casas", [1, 2])
+def test_arredondar_lote_igual_ao_round(casas):
+    valores = np.array([0.35, 2.675, 1.005, 0.125, -2.675, 20.45, 7.999999, math.pi, np.nan, 0.0])
+    esperado = [round(v, casas) if v == v else v for v in valores.tolist()]
+    np.testing.assert_array_equal(arredondar_lote(valores.copy(), casas), esperado)
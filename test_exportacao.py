@@ -0,0 +1,87 @@
+import io
+from datetime import date, datetime
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+import requests
+
+from conftest import TIMEZONE, leituras_aleatorias
+from exportacao import CAMINHO_EXPORTACAO_PADRAO, criar_servidor_exportacao, limites_do_periodo, url_exportacao
+from historico import COLUNAS_REAIS, COLUNAS_TEXTO
+
+TOKEN = "segredo-de-teste"
+ESTACOES = ["estacao_a", "estacao_b"]
+INICIO, FIM = date(2026, 3, 2), date(2026, 3, 5)
+INICIO_TS = int(TIMEZONE.localize(datetime(2026, 3, 1, 18, 0)).timestamp())
+
+# Duas estações gravadas e o endpoint com lotes pequenos: a resposta sai em vários pedaços chunked
+@pytest.fixture
+def endpoint(historico, servidor_local):
+    for i, estacao in enumerate(ESTACOES):
+        historico.salvar_lote(leituras_aleatorias(INICIO_TS, 1500, semente=i), estacao=estacao)
+    servidor = criar_servidor_exportacao(historico, 0, estacoes_validas=ESTACOES, token=TOKEN, tamanho_lote=100)
+    return historico, servidor_local(servidor, CAMINHO_EXPORTACAO_PADRAO)
+
+def esperado(historico):
+    inicio_ts, fim_ts = limites_do_periodo(INICIO, FIM, TIMEZONE)
+    partes = [historico.consultar_dataframe(inicio_ts, fim_ts, e).reset_index().assign(estacao=e) for e in ESTACOES]
+    return pd.concat(partes, ignore_index=True)
+
+def comparar(obtido, referencia):
+    assert len(obtido) == len(referencia) > 0
+    assert obtido["estacao"].tolist() == referencia["estacao"].tolist() # Uma estação depois da outra, em ordem de ts
+    assert (pd.to_datetime(obtido["timestamp"], utc=True).to_numpy() == referencia["timestamp_dt"].dt.tz_convert("UTC").to_numpy()).all()
+    for coluna in COLUNAS_REAIS:
+        np.testing.assert_allclose(obtido[coluna].to_numpy(np.float64), referencia[coluna].to_numpy(np.float64), equal_nan=True)
+    for coluna in COLUNAS_TEXTO:
+        assert obtido[coluna].astype(object).where(obtido[coluna].notna(), None).tolist() == \
+               referencia[coluna].astype(object).where(referencia[coluna].notna(), None).tolist()
+
+# --- Download em fluxo pelo endpoint ---
+def test_csv_em_fluxo_igual_ao_historico(endpoint):
+    historico, url = endpoint
+    resposta = requests.get(url_exportacao(url, ESTACOES, INICIO, FIM, "csv", TOKEN), stream=True, timeout=10)
+    assert resposta.status_code == 200 and resposta.headers["Transfer-Encoding"] == "chunked"
+    pedacos = list(resposta.iter_content(chunk_size=None))
+    assert len(pedacos) > 2 # Entregue lote a lote, não num bloco só
+    csv = pd.read_csv(io.BytesIO(b"".join(pedacos)), encoding="utf-8-sig", dtype={c: object for c in COLUNAS_TEXTO})
+    comparar(csv, esperado(historico))
+
+def test_parquet_em_fluxo_igual_ao_historico(endpoint):
+    historico, url = endpoint
+    resposta = requests.get(url_exportacao(url, ESTACOES, INICIO, FIM, "parquet", TOKEN), timeout=10)
+    assert resposta.status_code == 200
+    arquivo = pq.ParquetFile(io.BytesIO(resposta.content))
+    assert arquivo.num_row_groups > 1 # Um row group por lote
+    comparar(arquivo.read().to_pandas(), esperado(historico))
+
+# --- Autorização: token puro ou link assinado, dentro da validade e sem parâmetros trocados ---
+def adulterar(url, **trocas):
+    partes = urlsplit(url)
+    params = [(chave, trocas.get(chave, valor)) for chave, valor in parse_qsl(partes.query)]
+    return partes._replace(query=urlencode(params)).geturl()
+
+def test_pedidos_sem_autorizacao_sao_recusados(endpoint):
+    _, url = endpoint
+    assinada = url_exportacao(url, ESTACOES, INICIO, FIM, "csv", TOKEN)
+    recusadas = [
+        url_exportacao(url, ESTACOES, INICIO, FIM, "csv"), # Sem token nem assinatura
+        url_exportacao(url, ESTACOES, INICIO, FIM, "csv") + "&token=errado",
+        url_exportacao(url, ESTACOES, INICIO, FIM, "csv", "outro-token"),
+        url_exportacao(url, ESTACOES, INICIO, FIM, "csv", TOKEN, agora=datetime(2020, 1, 1).timestamp()), # Vencida
+        adulterar(assinada, fim="2026-12-31"), # Outro período com a mesma assinatura
+        adulterar(assinada, expira="99999999999"), # Validade estendida
+    ]
+    for pedido in recusadas:
+        resposta = requests.get(pedido, timeout=10)
+        assert resposta.status_code == 403, pedido
+        assert "estacao_a" not in resposta.text
+    assert requests.get(url_exportacao(url, ESTACOES, INICIO, FIM, "csv") + f"&token={TOKEN}", timeout=10).status_code == 200
+    assert "token" not in dict(parse_qsl(urlsplit(assinada).query)) # O link não carrega o segredo
+
+def test_endereco_exposto_exige_token(historico):
+    with pytest.raises(ValueError):
+        criar_servidor_exportacao(historico, 0, host="0.0.0.0")
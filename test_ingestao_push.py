@@ -0,0 +1,20 @@
+import requests
+
+from ingestao_push import CAMINHO_PUSH_PADRAO, criar_servidor, simular_gateway
+
+# --- Gateway simulado -> servidor de ingestão -> histórico (sem rede externa) ---
+def test_envio_do_gateway_vira_leitura_gravada(historico, servidor_local):
+    url = servidor_local(criar_servidor(historico, 0, host="127.0.0.1", estacao_por_passkey={"GW-TESTE": "estacao_teste"}), CAMINHO_PUSH_PADRAO)
+    simular_gateway(url, envios=1, passkey="GW-TESTE")
+    leituras = historico.consultar(estacao="estacao_teste")
+    assert len(leituras) == 1
+    leitura = leituras[0]
+    assert 12.5 <= leitura["temperature_superior_c"] <= 35.1 # tempf simulado entre 55 e 95 °F, convertido para °C
+    assert 20 <= leitura["humidity_percent"] <= 95
+    assert leitura["delta_t_c"] is not None and leitura["condition_text"]
+
+def test_passkey_desconhecida_nao_grava(historico, servidor_local):
+    url = servidor_local(criar_servidor(historico, 0, host="127.0.0.1", estacao_por_passkey={"GW-TESTE": "estacao_teste"}), CAMINHO_PUSH_PADRAO)
+    resposta = requests.post(url, data={"PASSKEY": "OUTRO", "tempf": "77.0", "humidity": "50"}, timeout=10)
+    assert resposta.status_code == 403
+    assert historico.consultar(estacao="estacao_teste") == []
@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculos import CODIGO_INVALIDO, CONDICOES_VENTO, ESTADOS_INVERSAO, avaliar_inversao, classificar_vento, codigo_condicao_delta_t
+from conftest import TIMEZONE, leituras_aleatorias
+from janelas import DIMENSOES, HORAS_MADRUGADA_PADRAO, LACUNA_MAX_PADRAO, IndiceJanelas
+
+# --- Recontagem por força bruta: condição de cada segundo coberto, com as funções escalares do painel ---
+def _valor(v): return None if v is None or v != v else v
+
+def codigos_da_leitura(linha):
+    delta_t = codigo_condicao_delta_t(linha["delta_t_c"])
+    vento = CODIGO_INVALIDO if _valor(linha["wind_speed_kmh"]) is None else CONDICOES_VENTO.index(classificar_vento(linha["wind_speed_kmh"])[0])
+    estado = avaliar_inversao(_valor(linha["temperature_c"]), _valor(linha["temperature_superior_c"]), _valor(linha["wind_speed_kmh"]))[0]
+    inversao = ESTADOS_INVERSAO.index(estado) if estado in ESTADOS_INVERSAO else CODIGO_INVALIDO
+    apta = CODIGO_INVALIDO if CODIGO_INVALIDO in (delta_t, vento) else int(delta_t == 1 and vento == 1 and inversao != 1)
+    return {"delta_t": delta_t, "vento": vento, "inversao": inversao, "apta": apta}
+
+class Recontagem:
+    def __init__(self, leituras, lacuna_max=LACUNA_MAX_PADRAO):
+        ts = leituras["ts"].to_numpy()
+        self.t0 = int(ts[0])
+        self.segundos = np.arange(self.t0, int(ts[-1]))
+        self.codigos = {d: np.full(len(self.segundos), CODIGO_INVALIDO, dtype=np.int8) for d in DIMENSOES}
+        self.coberto = np.zeros(len(self.segundos), dtype=bool) # Com leitura, mesmo que o valor seja inválido
+        for i, linha in enumerate(leituras.iloc[:-1].to_dict("records")):
+            if ts[i + 1] - ts[i] > lacuna_max: continue # Lacuna: sem dados até a próxima leitura
+            self.coberto[ts[i] - self.t0:ts[i + 1] - self.t0] = True
+            for dimensao, codigo in codigos_da_leitura(linha).items():
+                self.codigos[dimensao][ts[i] - self.t0:ts[i + 1] - self.t0] = codigo
+        locais = pd.to_datetime(self.segundos, unit="s", utc=True).tz_convert(TIMEZONE).tz_localize(None).as_unit("s").asi8
+        self.hora = locais // 3600
+        self.dia, self.hora_do_dia = self.hora // 24, self.hora % 24
+
+    @staticmethod
+    def hora_local(momento):
+        return int(pd.Timestamp(momento).tz_localize(None).timestamp()) // 3600 # datetime com fuso -> hora local
+
+    def resumo(self, inicio, fim):
+        h0, h1 = self.hora_local(inicio), -(-int(pd.Timestamp(fim).tz_localize(None).timestamp()) // 3600)
+        d0, d1 = h0 // 24, self.hora_local(fim) // 24
+        sel = (self.hora >= h0) & (self.hora < h1)
+        resultado = {d: {c: np.count_nonzero(sel & (self.codigos[d] == i)) / 3600 for i, c in enumerate(condicoes)}
+                     for d, condicoes in DIMENSOES.items()}
+        dias = (self.dia >= d0) & (self.dia <= d1)
+        madrugada = (self.hora_do_dia >= HORAS_MADRUGADA_PADRAO[0]) & (self.hora_do_dia < HORAS_MADRUGADA_PADRAO[1])
+        inversao = self.codigos["inversao"] == ESTADOS_INVERSAO.index("INVERSÃO TÉRMICA")
+        resultado.update(coberto=np.count_nonzero(sel & self.coberto) / 3600,
+                         dias_com_dados=len(np.unique(self.dia[dias & self.coberto])),
+                         madrugadas_com_dados=len(np.unique(self.dia[dias & madrugada & self.coberto])),
+                         madrugadas_com_inversao=len(np.unique(self.dia[dias & madrugada & inversao])))
+        return resultado
+
+    def por_dia(self, dimensao, inicio, fim):
+        d0, d1 = self.hora_local(inicio) // 24, self.hora_local(fim) // 24
+        sel = (self.dia >= d0) & (self.dia <= d1) & self.coberto
+        dias, posicao = np.unique(self.dia[sel], return_inverse=True)
+        codigos = self.codigos[dimensao][sel]
+        tabela = pd.DataFrame({c: np.bincount(posicao[codigos == i], minlength=len(dias)) / 3600
+                               for i, c in enumerate(DIMENSOES[dimensao])})
+        tabela.insert(0, "dia", [pd.Timestamp(int(d), unit="D").date() for d in dias])
+        return tabela
+
+    def perfil_horario(self, dimensao, condicao, inicio, fim):
+        d0, d1 = self.hora_local(inicio) // 24, self.hora_local(fim) // 24
+        sel = (self.dia >= d0) & (self.dia <= d1) & self.coberto
+        na_condicao = sel & (self.codigos[dimensao] == DIMENSOES[dimensao].index(condicao))
+        cobertos = np.bincount(self.hora_do_dia[sel], minlength=24)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(cobertos > 0, np.bincount(self.hora_do_dia[na_condicao], minlength=24) / cobertos, np.nan)
+
+    # Sequências contínuas (mesmo código, sem lacuna) dentro de [inicio, fim), recortadas nas pontas
+    def sequencias(self, dimensao, inicio, fim):
+        a, b = max(int(inicio.timestamp()), self.t0) - self.t0, min(int(fim.timestamp()), self.t0 + len(self.segundos)) - self.t0
+        if a >= b: return []
+        codigos = self.codigos[dimensao][a:b]
+        quebras = np.flatnonzero(np.diff(codigos)) + 1
+        return [(self.t0 + a + i, self.t0 + a + j, int(codigos[i])) for i, j in zip(np.r_[0, quebras], np.r_[quebras, len(codigos)])
+                if codigos[i] != CODIGO_INVALIDO]
+
+# --- Cenário: ~1 semana de leituras irregulares, com lacunas e viradas de dia, em duas levas ---
+INICIO_TS = int(TIMEZONE.localize(datetime(2026, 3, 1, 21, 47, 13)).timestamp())
+
+@pytest.fixture
+def cenario(historico):
+    leituras = leituras_aleatorias(INICIO_TS, 700, semente=11)
+    historico.salvar_lote(leituras.iloc[:450])
+    indice = IndiceJanelas(historico, verificar_a_cada=0)
+    historico.salvar_lote(leituras.iloc[450:])
+    assert indice.atualizar() == 250 # Só as leituras novas
+    return indice, leituras
+
+def periodos(leituras, n=30, semente=5):
+    rng = np.random.default_rng(semente)
+    ts = leituras["ts"].to_numpy()
+    para_datetime = lambda t: datetime.fromtimestamp(float(t), TIMEZONE)
+    for _ in range(n):
+        a, b = sorted(rng.uniform(ts[0] - 7200, ts[-1] + 7200, size=2))
+        yield para_datetime(a), para_datetime(b)
+    primeiro_dia = para_datetime(ts[0]).replace(hour=0, minute=0, second=0, microsecond=0)
+    yield primeiro_dia + timedelta(days=1), primeiro_dia + timedelta(days=3) # Viradas de dia exatas
+    yield primeiro_dia + timedelta(days=1, hours=3), primeiro_dia + timedelta(days=1, hours=7) # Madrugada
+    yield para_datetime(ts[0] - 86400), para_datetime(ts[-1] + 86400) # Tudo
+
+def test_resumo_por_dia_e_perfil_iguais_a_recontagem(cenario):
+    indice, leituras = cenario
+    bruta = Recontagem(leituras)
+    for inicio, fim in periodos(leituras):
+        obtido, esperado = indice.resumo(inicio, fim), bruta.resumo(inicio, fim)
+        for dimensao in DIMENSOES:
+            assert obtido[dimensao] == pytest.approx(esperado[dimensao]), (dimensao, inicio, fim)
+        for chave in ("coberto", "dias_com_dados", "madrugadas_com_dados", "madrugadas_com_inversao"):
+            assert obtido[chave] == pytest.approx(esperado[chave]), (chave, inicio, fim)
+        for dimensao, condicoes in DIMENSOES.items():
+            pd.testing.assert_frame_equal(indice.por_dia(dimensao, inicio, fim), bruta.por_dia(dimensao, inicio, fim), check_dtype=False)
+            for condicao in condicoes:
+                np.testing.assert_allclose(indice.perfil_horario(dimensao, condicao, inicio, fim),
+                                           bruta.perfil_horario(dimensao, condicao, inicio, fim), equal_nan=True)
+
+def test_sequencias_e_mais_longa_iguais_a_recontagem(cenario):
+    indice, leituras = cenario
+    bruta = Recontagem(leituras)
+    for inicio, fim in periodos(leituras):
+        for dimensao, condicoes in DIMENSOES.items():
+            esperadas = bruta.sequencias(dimensao, inicio, fim)
+            obtidas = indice.sequencias(dimensao, inicio, fim)
+            assert list(zip((int(t.timestamp()) for t in obtidas["inicio"]), (int(t.timestamp()) for t in obtidas["fim"]),
+                            (condicoes.index(c) for c in obtidas["condicao"]))) == esperadas, (dimensao, inicio, fim)
+            for i, condicao in enumerate(condicoes):
+                da_condicao = [(a, b) for a, b, c in esperadas if c == i]
+                mais_longa = indice.mais_longa(dimensao, condicao, inicio, fim)
+                if not da_condicao:
+                    assert mais_longa is None
+                    continue
+                a, b = (int(t.timestamp()) for t in mais_longa)
+                assert (a, b) in da_condicao # Uma sequência real da condição...
+                assert b - a == max(fim_ - ini for ini, fim_ in da_condicao) # ...e a mais longa do período
+
+def test_backfill_no_passado_refaz_o_indice(historico):
+    leituras = leituras_aleatorias(INICIO_TS, 400, semente=13)
+    lacuna = leituras.index[leituras["ts"].diff() > LACUNA_MAX_PADRAO][0] # Primeira lacuna: preenchida depois
+    faltando = leituras.iloc[[lacuna - 1]].assign(ts=lambda df: df["ts"] + 600)
+    historico.salvar_lote(leituras)
+    indice = IndiceJanelas(historico, verificar_a_cada=0)
+    historico.salvar_lote(faltando)
+    indice.atualizar()
+    completas = pd.concat([leituras, faltando]).sort_values("ts", ignore_index=True)
+    inicio, fim = (datetime.fromtimestamp(float(t), TIMEZONE) for t in (completas["ts"].iloc[0], completas["ts"].iloc[-1]))
+    assert indice.resumo(inicio, fim)["coberto"] == pytest.approx(Recontagem(completas).resumo(inicio, fim)["coberto"])
@@ -0,0 +1,36 @@
+import pytest
+import requests
+
+from ingestao_push import criar_servidor
+from metricas import RegistroMetricas, criar_servidor_metricas
+
+def test_cronometrado_registra_tambem_as_chamadas_que_falham():
+    registro = RegistroMetricas()
+    @registro.cronometrado("busca", resultado=lambda dados: "sucesso" if dados is not None else "falha")
+    def buscar(falhar):
+        if falhar: raise ConnectionError("sem rede")
+        return {"ok": 1}
+
+    buscar(False)
+    with pytest.raises(ConnectionError):
+        buscar(True)
+    etapas, contagens = registro.resumo()
+    assert sorted((e["rótulos"], e["chamadas"]) for e in etapas) == [("resultado=erro", 1), ("resultado=sucesso", 1)]
+    assert sorted((c["rótulos"], c["valor"]) for c in contagens) == [("resultado=erro", 1), ("resultado=sucesso", 1)]
+
+def test_cronometrado_sem_classificacao():
+    registro = RegistroMetricas()
+    falha = registro.cronometrado("etapa")(lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        falha()
+    etapas, contagens = registro.resumo()
+    assert [(e["etapa"], e["chamadas"]) for e in etapas] == [("etapa", 1)] and contagens == []
+
+# Sem configuração, os endpoints auxiliares só escutam no loopback
+def test_servidores_escutam_no_loopback_por_padrao(historico, servidor_local):
+    metricas = criar_servidor_metricas(0)
+    push = criar_servidor(historico, 0)
+    for servidor in (metricas, push):
+        assert servidor.server_address[0] == "127.0.0.1"
+    assert requests.get(servidor_local(metricas, "/metrics"), timeout=10).status_code == 200
+    assert requests.post(servidor_local(push, "/outro"), timeout=10).status_code == 404